@@ -20,6 +20,7 @@ def init() -> argparse.Namespace:
         -a --attack:        (int) optional  default Brute-Force Attack (0),
         -d --dictionary:    (str) required if Dictionary Attach is chosen,
         -c --characterset:  (str) optional if Brute-Force Attack is chosen, default [a-z],
+        -w --workers:       (int) optional  default 1, worker processes hashing chunks of the keyspace,
 
     Accepted required mutually exclusive arguments:
         -h --hash:          (str) required if hashfile not given,
@@ -27,6 +28,7 @@ def init() -> argparse.Namespace:
 
     Usage examples:
         python hashcat -m 0 -a 1 -d somefilecontainingwords.txt -h somehashedtext
+        python hashcat -m 2 -a 0 -c '[a-z]{1,6}' -w 32 -h somehashedtext
     """
     log_msg("Initializing Hashcat Clone...")
 
@@ -60,6 +62,13 @@ def init() -> argparse.Namespace:
         default="[a-z]",
         help="Character set for Brute-Force attack",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes hashing chunks of the keyspace in parallel, e.g. one per CPU core. Default 1",
+    )
 
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument("-h", "--hash", type=str, help="Hash from direct input")
@@ -70,6 +79,9 @@ def init() -> argparse.Namespace:
     args.mode = HashModes(args.mode)
     args.attack = AttackModes(args.attack)
 
+    if args.workers < 1:
+        parser.error("The number of workers must be at least 1")
+
     if args.hashfile:
         if not os.path.exists(args.hashfile):
             parser.error(f"The Hash file {args.hashfile} does not exist.")
@@ -0,0 +1,237 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import itertools
+import math
+from typing import Iterator, NamedTuple
+import exrex
+
+# The regular expression parser exrex parses character sets with
+sre_parse = exrex.sre_parse
+
+# Unbounded repeats, e.g. [a-z]+, are cut to this many lengths, as exrex does
+REPEAT_LIMIT = 20
+
+
+class Chunk(NamedTuple):
+    """
+    Share of the keyspace hashed by one task of the worker pool.
+
+    Attributes:
+        start (int): First candidate index (Brute-Force) or byte offset in the dictionary file (Dictionary).
+        end (int): Index or byte offset after the last one of the chunk.
+    """
+
+    start: int
+    end: int
+
+
+class Alphabet:
+    """
+    Keyspace of a single character, e.g. [a-z], \\d or a literal.
+    """
+
+    def __init__(self, chars: list[str]):
+        self.chars = chars
+        self.size = len(chars)
+
+    def word(self, index: int) -> str:
+        return self.chars[index]
+
+    def words(self, start: int, end: int) -> Iterator[str]:
+        return iter(self.chars[start:end])
+
+
+class Sequence:
+    """
+    Keyspace of consecutive expressions, e.g. [a-z][0-9]. The last expression changes fastest.
+    """
+
+    def __init__(self, nodes: list):
+        self.nodes = nodes
+        self.size = math.prod(node.size for node in nodes)
+        self.rest = Sequence(nodes[1:]) if len(nodes) > 1 else None
+        self.characters = all(isinstance(node, Alphabet) for node in nodes)
+
+    def word(self, index: int) -> str:
+        parts = []
+        for node in reversed(self.nodes):
+            index, digit = divmod(index, node.size)
+            parts.append(node.word(digit))
+        return "".join(reversed(parts))
+
+    def words(self, start: int, end: int) -> Iterator[str]:
+        if not self.nodes:
+            yield from [""][start:end]
+            return
+        if self.rest is None:
+            yield from self.nodes[0].words(start, end)
+            return
+        if self.characters:
+            # Whole words of the first character, e.g. "a" to "azzz" of [a-z]{4}, are one product of the alphabets
+            full_start, full_end = -(-start // self.rest.size), end // self.rest.size
+            if full_start < full_end:
+                yield from self.prefixed_words(start, full_start * self.rest.size)
+                alphabets = [self.nodes[0].chars[full_start:full_end]] + [node.chars for node in self.rest.nodes]
+                yield from map("".join, itertools.product(*alphabets))
+                yield from self.prefixed_words(full_end * self.rest.size, end)
+                return
+        yield from self.prefixed_words(start, end)
+
+    def prefixed_words(self, start: int, end: int) -> Iterator[str]:
+        """
+        Yields the words from index start to end, each word of the first expression prefixing a range of the rest.
+        """
+        first, rest = self.nodes[0], self.rest
+        for index in range(start // rest.size, (end - 1) // rest.size + 1):
+            prefix = first.word(index)
+            offset = index * rest.size
+            for suffix in rest.words(max(start - offset, 0), min(end - offset, rest.size)):
+                yield prefix + suffix
+
+
+class Repeat:
+    """
+    Keyspace of a repeated expression, e.g. [a-z]{1,3}, the shorter words first.
+    """
+
+    def __init__(self, node, minimum: int, maximum: int):
+        self.sequences = [Sequence([node] * length) for length in range(minimum, maximum + 1)]
+        self.size = sum(sequence.size for sequence in self.sequences)
+
+    def word(self, index: int) -> str:
+        for sequence in self.sequences:
+            if index < sequence.size:
+                return sequence.word(index)
+            index -= sequence.size
+        raise IndexError("Candidate index out of range")
+
+    def words(self, start: int, end: int) -> Iterator[str]:
+        yield from iter_ranges(self.sequences, start, end)
+
+
+class Branch:
+    """
+    Keyspace of alternatives, e.g. (cat|dog), the alternatives one after the other.
+    """
+
+    def __init__(self, nodes: list):
+        self.nodes = nodes
+        self.size = sum(node.size for node in nodes)
+
+    def word(self, index: int) -> str:
+        for node in self.nodes:
+            if index < node.size:
+                return node.word(index)
+            index -= node.size
+        raise IndexError("Candidate index out of range")
+
+    def words(self, start: int, end: int) -> Iterator[str]:
+        yield from iter_ranges(self.nodes, start, end)
+
+
+def iter_ranges(nodes: list, start: int, end: int) -> Iterator[str]:
+    """
+    Yields the words from index start to end of keyspaces following each other.
+    """
+    offset = 0
+    for node in nodes:
+        if start < offset + node.size and end > offset:
+            yield from node.words(max(start - offset, 0), min(end - offset, node.size))
+        offset += node.size
+
+
+def build_keyspace(parsed: list):
+    """
+    Builds the keyspace of a parsed character set, the same candidates exrex.generate() yields.
+
+    Args:
+        parsed (list): The character set parsed by exrex.parse().
+
+    Raises:
+        ValueError: If the character set uses a construct without a countable keyspace, e.g. a backreference.
+
+    Returns:
+        Alphabet | Sequence | Repeat | Branch : keyspace, words(start, end) yields the candidates from start to end
+    """
+    nodes = []
+    for op, value in parsed:
+        if op == sre_parse.LITERAL:
+            nodes.append(Alphabet([chr(value)]))
+        elif op == sre_parse.NOT_LITERAL:
+            nodes.append(Alphabet([char for char in exrex.CATEGORIES["category_any"] if char != chr(value)]))
+        elif op == sre_parse.IN:
+            nodes.append(Alphabet(exrex._in(value)))
+        elif op == sre_parse.CATEGORY:
+            nodes.append(Alphabet(exrex.CATEGORIES.get(value, [""])))
+        elif op == sre_parse.ANY:
+            nodes.append(Alphabet(exrex.CATEGORIES["category_any"]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            minimum, maximum, subpattern = value
+            maximum = min(maximum, minimum + REPEAT_LIMIT - 1)
+            nodes.append(Repeat(build_keyspace(list(subpattern)), minimum, maximum))
+        elif op == sre_parse.BRANCH:
+            nodes.append(Branch([build_keyspace(list(alternative)) for alternative in value[1]]))
+        elif op == sre_parse.SUBPATTERN:
+            nodes.append(build_keyspace(list(value[3])))
+        elif op == sre_parse.AT:
+            # ^ and $ match no character
+            continue
+        else:
+            raise ValueError(f"Cannot split the keyspace of {op}")
+    # A single expression is its own keyspace, e.g. the [a-z] of [a-z]{4} is repeated as an alphabet
+    return nodes[0] if len(nodes) == 1 else Sequence(nodes)
+
+
+def split_range(size: int, chunks: int) -> list[Chunk]:
+    """
+    Splits the range [0, size) into at most chunks contiguous chunks of (almost) equal size.
+    """
+    chunks = max(min(chunks, size), 1)
+    bounds = [size * i // chunks for i in range(chunks + 1)]
+    return [Chunk(start, end) for start, end in zip(bounds, bounds[1:])]
+
+
+def iter_characterset_chunk(characterset: str, chunk: Chunk) -> Iterator[str]:
+    """
+    Yields the candidates of a Brute-Force chunk, the words of the character set from index chunk.start
+    to chunk.end. Character sets without a countable keyspace fall back to skipping the first candidates.
+    """
+    try:
+        keyspace = build_keyspace(exrex.parse(characterset))
+    except ValueError:
+        yield from itertools.islice(exrex.generate(characterset), chunk.start, chunk.end)
+        return
+    yield from keyspace.words(chunk.start, chunk.end)
+
+
+def count_characterset(characterset: str) -> int:
+    """
+    Returns the number of Brute-Force candidates of a character set.
+    """
+    try:
+        return build_keyspace(exrex.parse(characterset)).size
+    except ValueError:
+        return exrex.count(characterset)
+
+
+def iter_dictionary_chunk(path: str, chunk: Chunk) -> Iterator[bytes]:
+    """
+    Yields the words of a Dictionary chunk, the lines starting within the byte range of the chunk.
+    The byte ranges need not be aligned to lines: a line crossing the end of the range belongs to this chunk,
+    the next chunk skips it.
+    """
+    with open(path, "rb") as file:
+        if chunk.start:
+            # Skip the rest of the line the previous chunk ends with, nothing if it ends with a newline
+            file.seek(chunk.start - 1)
+            file.readline()
+        while file.tell() < chunk.end:
+            line = file.readline()
+            if not line:
+                break
+            yield line.rstrip(b"\r\n")
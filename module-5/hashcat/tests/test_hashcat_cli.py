@@ -51,6 +51,17 @@ class TestHashcatCLI(unittest.TestCase):
         args = init()
         self.assertEqual(args.hashfile, "hashfile.txt")
 
+    @patch("sys.argv", ["hashcat.py", "-a", "0", "-c", "[a-z]{1,4}", "-w", "4", "-h", "somehash"])
+    def test_workers(self):
+        # Test the number of worker processes hashing the keyspace
+        args = init()
+        self.assertEqual(args.workers, 4)
+
+    @patch("sys.argv", ["hashcat.py", "-a", "0", "-w", "0", "-h", "somehash"])
+    def test_invalid_workers(self):
+        with self.assertRaises(SystemExit):  # parser.error causes SystemExit
+            init()
+
 
 if __name__ == "__main__":
     unittest.main()
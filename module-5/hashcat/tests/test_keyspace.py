@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+import exrex
+from keyspace import build_keyspace, iter_characterset_chunk, iter_dictionary_chunk, split_range
+
+
+class TestKeyspace(unittest.TestCase):
+    def test_same_words_as_exrex(self):
+        # Test the keyspace yields the words of exrex.generate in the same order
+        for characterset in ["[a-c]{1,3}", "(cat|dog)[0-9]?", "a[^b-y]", "(ab|c(d|e){0,2})f"]:
+            keyspace = build_keyspace(exrex.parse(characterset))
+            words = [keyspace.word(index) for index in range(keyspace.size)]
+            self.assertEqual(words, list(exrex.generate(characterset)))
+
+    def test_characterset_chunks(self):
+        # Test the index ranges cover every word exactly once
+        chunks = split_range(exrex.count("[a-d]{1,4}"), 7)
+        words = [word for chunk in chunks for word in iter_characterset_chunk("[a-d]{1,4}", chunk)]
+        self.assertEqual(words, list(exrex.generate("[a-d]{1,4}")))
+
+    def test_dictionary_chunks(self):
+        # Test the byte ranges, not aligned to lines, cover every line exactly once
+        lines = [b"power", b"", b"weak", b"a" * 40, b"x", b"password123"]
+        with tempfile.NamedTemporaryFile(delete=False) as file:
+            file.write(b"\n".join(lines[:3]) + b"\r\n" + b"\n".join(lines[3:]))
+        try:
+            for count in range(1, 12):
+                chunks = split_range(os.path.getsize(file.name), count)
+                words = [word for chunk in chunks for word in iter_dictionary_chunk(file.name, chunk)]
+                self.assertEqual(words, lines)
+        finally:
+            os.remove(file.name)
+
+
+if __name__ == "__main__":
+    unittest.main()
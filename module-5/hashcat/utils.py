@@ -6,10 +6,25 @@ Author: Mihai-Andrei Neacsu
 """
 
 import argparse
+import functools
+import multiprocessing
+import os
+import signal
+import time
+from typing import Iterator
 from enums import AttackModes, HashModes
 import exrex
+from keyspace import Chunk, count_characterset, iter_characterset_chunk, iter_dictionary_chunk, split_range
 from logger import log_msg
 
+# Chunks of the keyspace per worker process, smaller chunks balance the load and stop sooner after a match
+CHUNKS_PER_WORKER = 16
+# Candidates a worker hashes between two checks whether another worker found a match
+STOP_CHECK_INTERVAL = 4096
+
+# Set in each worker process, tells the workers a match was found
+StopEvent = None
+
 
 def get_target_hash(args: argparse.Namespace) -> str:
     """
@@ -105,24 +120,151 @@ def exec_attack(args: argparse.Namespace):
         1. for each word, hashes it with the chosen hash object
         1. check the hashed word if it matches the target hash
 
+    With --workers greater than 1 the words are split into chunks hashed by a pool of worker processes,
+    see exec_parallel_attack().
+
     Args:
         args (argparse.Namespace): Passed args on script run
     """
     log_msg(f"Using {args.mode.name} hash object")
     target_hash = get_target_hash(args)
+    if args.workers > 1:
+        exec_parallel_attack(args, target_hash)
+        return
     words = get_words(args)
     log_msg(f"Executing {args.attack.name}...")
+    started = time.monotonic()
+    tried = 0
     try:
-        for word in words:
+        for tried, word in enumerate(words, 1):
             hash_obj = get_hash_obj(args)
             hash_obj.update(word.encode())
             hash = hash_obj.hexdigest()
             if target_hash == hash:
                 log_msg("Execution Lap finished.")
+                log_hash_rate(tried, started)
                 log_msg(f"Found match: {target_hash} -> {word}")
                 return
     except KeyboardInterrupt:
         log_msg(f"Execution Lap interrupted at {hash} -> {word}")
         return
     log_msg("Execution Lap finished.")
+    log_hash_rate(tried, started)
     log_msg("No match cloud be found!")
+
+
+def log_hash_rate(tried: int, started: float):
+    """
+    Logs the number of hashed words and the hash rate in H/s since started.
+
+    Args:
+        tried (int): Number of hashed words
+        started (float): time.monotonic() when the attack started
+    """
+    elapsed = time.monotonic() - started
+    rate = tried / elapsed if elapsed > 0 else 0.0
+    log_msg(f"Hashed {tried} combination(s) in {elapsed:.2f}s ({rate:.0f} H/s)")
+
+
+def get_chunks(args: argparse.Namespace) -> list[Chunk]:
+    """
+    Split the keyspace of the attack into chunks for the worker processes:
+        - byte ranges of the dictionary file if Dictionary Attack is chosen
+        - index ranges of the character set words if Brute-Force Attack is chosen
+
+    Args:
+        args (argparse.Namespace): Passed args on script run
+
+    Returns:
+        list[Chunk] : chunks of the keyspace
+    """
+    chunks = args.workers * CHUNKS_PER_WORKER
+    if args.attack == AttackModes.DICTIONARY_ATTACK:
+        size = os.path.getsize(args.dictionary)
+        log_msg(f"Got {size} byte(s) of dictionary words to try")
+    else:
+        size = count_characterset(args.characterset)
+        log_msg(f"Got {size} combination(s) to try")
+    return split_range(size, chunks)
+
+
+def iter_chunk_words(args: argparse.Namespace, chunk: Chunk) -> Iterator[bytes]:
+    """
+    Get the encoded words of a chunk, read from the dictionary file or generated from the character set
+    """
+    if args.attack == AttackModes.DICTIONARY_ATTACK:
+        return iter_dictionary_chunk(args.dictionary, chunk)
+    return (word.encode() for word in iter_characterset_chunk(args.characterset, chunk))
+
+
+def init_worker(stop_event):
+    """
+    Initializes a worker process with the event shared by all workers. Ctrl+C is handled by the main process.
+    """
+    global StopEvent
+    StopEvent = stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def crack_chunk(args: argparse.Namespace, target_hash: str, chunk: Chunk) -> tuple[str | None, int]:
+    """
+    Hashes the words of a chunk in a worker process until one matches the target hash.
+    The first worker finding a match stops the others, which check every STOP_CHECK_INTERVAL words.
+
+    Args:
+        args (argparse.Namespace): Passed args on script run
+        target_hash (str): The hash to find the word of
+        chunk (Chunk): The chunk of the keyspace to hash
+
+    Returns:
+        tuple: A tuple containing:
+            - str | None: The matching word, None if no word of the chunk matches
+            - int: Number of hashed words
+    """
+    if StopEvent.is_set():
+        return None, 0
+    hash_function = HashModes.get_hash_function_map()[args.mode]
+    tried = 0
+    for tried, word in enumerate(iter_chunk_words(args, chunk), 1):
+        if hash_function(word).hexdigest() == target_hash:
+            StopEvent.set()
+            return word.decode("utf-8", errors="replace"), tried
+        if not tried % STOP_CHECK_INTERVAL and StopEvent.is_set():
+            break
+    return None, tried
+
+
+def exec_parallel_attack(args: argparse.Namespace, target_hash: str):
+    """
+    Splits the keyspace into chunks and hashes them in a pool of --workers processes, each on its own core.
+    Stops all workers once one of them found a match.
+
+    Args:
+        args (argparse.Namespace): Passed args on script run
+        target_hash (str): The hash to find the word of
+    """
+    chunks = get_chunks(args)
+    log_msg(f"Executing {args.attack.name} in {args.workers} worker processes...")
+    # Spawned processes start with a fresh interpreter on every platform
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    started = time.monotonic()
+    tried = 0
+    match = None
+    with context.Pool(args.workers, initializer=init_worker, initargs=(stop_event,)) as pool:
+        try:
+            for word, count in pool.imap_unordered(functools.partial(crack_chunk, args, target_hash), chunks):
+                tried += count
+                if word is not None:
+                    match = word
+                    break
+        except KeyboardInterrupt:
+            stop_event.set()
+            log_msg(f"Execution Lap interrupted after {tried} combination(s)")
+            return
+    log_msg("Execution Lap finished.")
+    log_hash_rate(tried, started)
+    if match is None:
+        log_msg("No match cloud be found!")
+        return
+    log_msg(f"Found match: {target_hash} -> {match}")
@@ -0,0 +1,267 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from typing import Callable, NamedTuple
+import discovery
+import fingerprint
+import rate_limiter
+import timing
+from logger import init_logger, log_msg
+from planner import DEFAULT_JOINT_TECHNIQUES, PROBE_PLAN, joint_probe_port, start_joint_probes
+from rate_limiter import init_rate_limiter
+from scapy_utils import init_backend, set_transport
+from scheduler import ScanJob, ScanScheduler
+from teardown import flush_teardowns
+from utils import is_port_opened
+from benchmarks.pcap_replay import PcapReplayTransport
+from benchmarks.simulated_network import generate_network
+
+
+class BenchmarkResult(NamedTuple):
+    """
+    Measurements of one technique.
+
+    Attributes:
+        technique (str): Technique name, is_port_opened for the probe plan used by the scans
+            or joint for the joint probe of DEFAULT_JOINT_TECHNIQUES.
+        ports (int): Number of scanned (host, port) pairs.
+        seconds (float): Duration of the scan.
+        ports_per_second (float): Scanned (host, port) pairs per second.
+        packets_per_port (float): Packets sent per scanned (host, port) pair, pings included.
+        accuracy (float | None): Share of results consistent with the ground truth, None without ground truth.
+    """
+
+    technique: str
+    ports: int
+    seconds: float
+    ports_per_second: float
+    packets_per_port: float
+    accuracy: float | None
+
+
+def possible_states(result) -> set[str]:
+    """
+    Returns the ground truth states a scan result is consistent with.
+    """
+    if isinstance(result, bool):
+        return {"open"} if result else {"closed", "filtered"}
+    states = set()
+    for state in result.lower().split(" or "):
+        if state in ("open", "closed"):
+            states.add(state)
+        elif state == "unfiltered":
+            states |= {"open", "closed"}
+        elif state == "unknown":
+            states |= {"open", "closed", "filtered"}
+        else:
+            # Filtered, dropped, no response and unexpected responses
+            states.add("filtered")
+    return states
+
+
+def reset_scan_state():
+    """
+    Forgets host states, RTT estimates, fingerprints and rate backoffs, so every technique starts from a cold scan.
+    """
+    limiter = rate_limiter.Limiter
+    rate_limiter.Limiter = rate_limiter.RateLimiter(limiter.min_rate, limiter.max_rate)
+    discovery.HostStates.clear()
+    timing.HostTimings.clear()
+    fingerprint.HostFingerprints.clear()
+
+
+def run_technique(
+    technique: str,
+    scan: Callable[[str, int], object],
+    targets: list[tuple[str, int]],
+    transport,
+    truth: dict[tuple[str, int], str] | None,
+    max_parallelism: int,
+) -> BenchmarkResult:
+    """
+    Scans all targets with one technique on the scan scheduler and measures it.
+    """
+    reset_scan_state()
+    results: dict[tuple[str, int], object] = {}
+    lock = threading.Lock()
+
+    def handle_job(job: ScanJob):
+        result = scan(job.host, job.port)
+        with lock:
+            results[job.host, job.port] = result
+
+    packets_before = transport.packets
+    started = time.perf_counter()
+    scheduler = ScanScheduler(handler=handle_job, max_parallelism=max_parallelism, status_interval=3600)
+    scheduler.start()
+    for host, port in targets:
+        scheduler.submit(ScanJob(host, port, technique))
+    scheduler.join()
+    # The connection teardowns are sent in the background, they belong to the packets of the technique
+    flush_teardowns()
+    seconds = time.perf_counter() - started
+
+    accuracy = None
+    if truth is not None:
+        known = [target for target in results if target in truth]
+        correct = sum(truth[target] in possible_states(results[target]) for target in known)
+        accuracy = correct / len(known) if known else None
+    return BenchmarkResult(
+        technique,
+        len(targets),
+        seconds,
+        len(targets) / seconds if seconds else 0.0,
+        (transport.packets - packets_before) / len(targets) if targets else 0.0,
+        accuracy,
+    )
+
+
+def compare_with_baseline(results: list[BenchmarkResult], path: str, tolerance: float) -> list[str]:
+    """
+    Returns the regressions of the results compared with the results of a previous benchmark:
+    a throughput below (1 - tolerance) times the baseline, more packets per port or a lower accuracy.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        baseline = {entry["technique"]: entry for entry in json.load(file)["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.technique)
+        if previous is None:
+            continue
+        if result.ports_per_second < previous["ports_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{result.technique}: {result.ports_per_second:.1f} ports/s, "
+                f"baseline {previous['ports_per_second']:.1f} ports/s"
+            )
+        if result.packets_per_port > previous["packets_per_port"] * (1 + tolerance):
+            regressions.append(
+                f"{result.technique}: {result.packets_per_port:.2f} packets/port, "
+                f"baseline {previous['packets_per_port']:.2f} packets/port"
+            )
+        if result.accuracy is not None and previous["accuracy"] is not None:
+            if result.accuracy < previous["accuracy"]:
+                regressions.append(
+                    f"{result.technique}: accuracy {result.accuracy:.3f}, baseline {previous['accuracy']:.3f}"
+                )
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the benchmark arguments.
+
+    Usage examples:
+        $python -m benchmarks.benchmark --hosts 4 --ports 500 --latency 0.005 --loss 0.01
+        $python -m benchmarks.benchmark --pcap scan.pcap --truth truth.json
+        $python -m benchmarks.benchmark --output current.json --baseline baseline.json
+    """
+    parser = argparse.ArgumentParser(description="Nmap Clone offline benchmark")
+    parser.add_argument("--hosts", type=int, default=2, help="Simulated hosts. Default 2")
+    parser.add_argument("--ports", type=int, default=200, help="Simulated ports per host, 1 to N. Default 200")
+    parser.add_argument("--open-ratio", type=float, default=0.05, help="Share of opened ports. Default 0.05")
+    parser.add_argument("--filtered-ratio", type=float, default=0.05, help="Share of filtered ports. Default 0.05")
+    parser.add_argument("--latency", type=float, default=0.002, help="Simulated round trip time in seconds")
+    parser.add_argument("--jitter", type=float, default=0.001, help="Simulated round trip time jitter in seconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="Share of lost probes. Default 0")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the simulated network. Default 1")
+    parser.add_argument("--pcap", type=str, help="Replay the replies of a pcap file instead of simulating hosts")
+    parser.add_argument("--truth", type=str, help='Ground truth of the pcap: {"host": {"port": "open"}}')
+    parser.add_argument(
+        "--techniques",
+        nargs="+",
+        default=[step.technique for step in PROBE_PLAN] + ["is_port_opened", "joint"],
+        help="Techniques to benchmark. Default all",
+    )
+    parser.add_argument("--backend", type=str, default="scapy", choices=["scapy", "raw"], help="Packet backend")
+    parser.add_argument("-T", "--timing", type=int, default=4, choices=list(timing.TIMING_TEMPLATES))
+    parser.add_argument("--max-parallelism", type=int, default=100, help="Ports scanned at the same time")
+    parser.add_argument("--output", type=str, help="Write the results as JSON to the given file")
+    parser.add_argument("--baseline", type=str, help="Fail on regressions against the JSON results of a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Tolerated throughput loss. Default 0.2")
+    parser.add_argument("-d", "--debug", action="store_true", help="Prints debug logs")
+    args = parser.parse_args(argv)
+    args.min_rate = args.max_rate = None
+    return args
+
+
+def run_benchmark(args: argparse.Namespace) -> list[BenchmarkResult]:
+    """
+    Runs every technique against the simulated network or the pcap replay and logs the measurements.
+    """
+    init_logger(args)
+    timing.init_timing(args)
+    init_rate_limiter(args)
+
+    if args.pcap:
+        transport = PcapReplayTransport(args.pcap)
+        targets = transport.targets()
+        truth = None
+        if args.truth:
+            with open(args.truth, "r", encoding="utf-8") as file:
+                hosts = json.load(file)
+            truth = {(host, int(port)): state for host, ports in hosts.items() for port, state in ports.items()}
+    else:
+        transport = generate_network(
+            args.hosts,
+            args.ports,
+            args.open_ratio,
+            args.filtered_ratio,
+            seed=args.seed,
+            latency=args.latency,
+            jitter=args.jitter,
+            loss=args.loss,
+        )
+        targets = [(host, port) for port in range(1, args.ports + 1) for host in transport.hosts]
+        truth = {(host, port): transport.hosts[host].state(port) for host, port in targets}
+
+    set_transport(transport)
+    init_backend(args)
+    scans = {step.technique: step.scan for step in PROBE_PLAN}
+    scans["is_port_opened"] = is_port_opened
+    scans["joint"] = lambda host, port: joint_probe_port(host, port, DEFAULT_JOINT_TECHNIQUES)[2]
+    start_joint_probes(DEFAULT_JOINT_TECHNIQUES, args.max_parallelism)
+
+    results = []
+    try:
+        for technique in args.techniques:
+            result = run_technique(technique, scans[technique], targets, transport, truth, args.max_parallelism)
+            results.append(result)
+    finally:
+        set_transport(None)
+
+    log_msg(f"{'technique':<16}{'ports':>8}{'seconds':>10}{'ports/s':>10}{'packets/port':>14}{'accuracy':>10}")
+    for result in results:
+        accuracy = f"{result.accuracy:.3f}" if result.accuracy is not None else "n/a"
+        log_msg(
+            f"{result.technique:<16}{result.ports:>8}{result.seconds:>10.2f}{result.ports_per_second:>10.1f}"
+            f"{result.packets_per_port:>14.2f}{accuracy:>10}"
+        )
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    results = run_benchmark(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"arguments": vars(args), "results": [result._asdict() for result in results]}, file, indent=2)
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            log_msg(f"Regression: {regression}", "ERROR")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
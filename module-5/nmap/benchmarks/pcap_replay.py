@@ -0,0 +1,108 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import threading
+import time
+from scapy.layers.inet import IP
+from scapy.utils import rdpcap
+from logger import log_msg
+from raw_backend import RawReply, parse_ip_packet
+
+
+def probe_key(probe: RawReply) -> tuple | None:
+    """
+    Returns the key a probe is replayed by: (destination, "tcp", port, flags) or (destination, "echo").
+    """
+    if probe.haslayer("TCP"):
+        return probe["IP"].dst, "tcp", probe["TCP"].dport, probe["TCP"].flags
+    if probe.haslayer("ICMP") and probe["ICMP"].type == 8:
+        return probe["IP"].dst, "echo"
+    return None
+
+
+def reply_flow(reply: RawReply) -> tuple | None:
+    """
+    Returns the (scanner, target, scanner port, target port) flow of a reply, ports are 0 for ICMP echo replies.
+    """
+    if reply.haslayer("TCP"):
+        return reply["IP"].dst, reply["IP"].src, reply["TCP"].dport, reply["TCP"].sport
+    if reply.haslayer("TCPerror"):
+        return reply["IP"].dst, reply["IPerror"].dst, reply["TCPerror"].sport, reply["TCPerror"].dport
+    if reply.haslayer("ICMP") and reply["ICMP"].type == 0:
+        return reply["IP"].dst, reply["IP"].src, 0, 0
+    return None
+
+
+class PcapReplayTransport:
+    """
+    Replays the replies recorded in a pcap file of a previous scan, used as scapy_utils.PacketTransport.
+
+    Each probe of the capture is paired with the first reply of its flow. A probe is then answered by the reply
+    recorded for the same destination, port and TCP flags, after the recorded delay. Probes without a recorded
+    reply wait for the timeout, as they did in the capture.
+
+    Usage example:
+        transport = PcapReplayTransport("scan.pcap")
+        scapy_utils.set_transport(transport)
+        half_open_scan("192.168.1.1", 22)
+    """
+
+    def __init__(self, path: str):
+        self.src_ip = "0.0.0.0"
+        self.replies: dict[tuple, tuple[bytes, float] | None] = {}
+        self.packets = 0
+        self._lock = threading.Lock()
+        self._load(path)
+
+    def _load(self, path: str):
+        """
+        Pairs the probes of the capture with their replies.
+        """
+        pending: dict[tuple, tuple[tuple, float]] = {}
+        for captured in rdpcap(path):
+            if not captured.haslayer(IP):
+                continue
+            data = bytes(captured[IP])
+            packet = parse_ip_packet(data, float(captured.time))
+            if packet is None:
+                continue
+            flow = reply_flow(packet)
+            if flow in pending:
+                key, sent_at = pending.pop(flow)
+                self.replies[key] = (data, packet.time - sent_at)
+                continue
+            key = probe_key(packet)
+            if key is None:
+                continue
+            self.src_ip = packet["IP"].src
+            self.replies.setdefault(key, None)
+            ports = (packet["TCP"].sport, packet["TCP"].dport) if packet.haslayer("TCP") else (0, 0)
+            pending[(packet["IP"].src, packet["IP"].dst, *ports)] = (key, packet.time)
+        answered = sum(reply is not None for reply in self.replies.values())
+        log_msg(f"Loaded {len(self.replies)} probes from {path}, {answered} answered", "DEBUG")
+
+    def targets(self) -> list[tuple[str, int]]:
+        """
+        Returns the (host, port) pairs probed in the capture.
+        """
+        return sorted({(key[0], key[2]) for key in self.replies if key[1] == "tcp"})
+
+    def send(self, packet: bytes):
+        with self._lock:
+            self.packets += 1
+
+    def exchange(self, packet: bytes, timeout: float) -> bytes | None:
+        with self._lock:
+            self.packets += 1
+        probe = parse_ip_packet(packet, time.time())
+        recorded = self.replies.get(probe_key(probe)) if probe else None
+        if recorded is None or recorded[1] > timeout:
+            time.sleep(timeout)
+            return None
+        reply, delay = recorded
+        time.sleep(delay)
+        return reply
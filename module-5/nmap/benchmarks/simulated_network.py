@@ -0,0 +1,242 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+from dataclasses import dataclass, field
+import random
+import socket
+import struct
+import threading
+import time
+from raw_backend import IPPROTO_ICMP, IPPROTO_TCP, TCP_FLAGS, checksum_add, checksum_fold, parse_ip_packet
+
+# SYN+ACK options of a Linux host: MSS 1460, SACK permitted, Timestamp, NOP, Window Scale 7
+LINUX_SYN_ACK_OPTIONS = bytes.fromhex("020405b4" "0402" "080a0000000100000001" "01" "030307")
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP_DEST_UNREACHABLE = 3
+ICMP_ADMIN_PROHIBITED = 13
+
+
+def build_ip_packet(src: str, dst: str, proto: int, payload: bytes, ttl: int, df: bool = True) -> bytes:
+    """
+    Builds an IPv4 packet with a valid header checksum.
+    """
+    header = struct.pack(
+        "!BBHHHBBH4s4s",
+        0x45,
+        0,
+        20 + len(payload),
+        0,
+        0x4000 if df else 0,
+        ttl,
+        proto,
+        0,
+        socket.inet_aton(src),
+        socket.inet_aton(dst),
+    )
+    header = header[:10] + struct.pack("!H", checksum_fold(checksum_add(0, header))) + header[12:]
+    return header + payload
+
+
+def build_tcp_segment(
+    src: str, dst: str, sport: int, dport: int, seq: int, ack: int, flags: int, window: int, options: bytes = b""
+) -> bytes:
+    """
+    Builds a TCP segment with a valid checksum.
+    """
+    offset = (5 + len(options) // 4) << 4
+    segment = struct.pack("!HHIIBBHHH", sport, dport, seq, ack, offset, flags, window, 0, 0) + options
+    pseudo_header = struct.pack("!4s4sBBH", socket.inet_aton(src), socket.inet_aton(dst), 0, IPPROTO_TCP, len(segment))
+    checksum = checksum_fold(checksum_add(checksum_add(0, pseudo_header), segment))
+    return segment[:16] + struct.pack("!H", checksum) + segment[18:]
+
+
+def build_icmp_message(icmp_type: int, code: int, rest: bytes) -> bytes:
+    """
+    Builds an ICMP message with a valid checksum.
+    """
+    message = struct.pack("!BBH", icmp_type, code, 0) + rest
+    return message[:2] + struct.pack("!H", checksum_fold(checksum_add(0, message))) + message[4:]
+
+
+@dataclass
+class SimulatedHost:
+    """
+    Ground truth and TCP/IP stack behaviour of one simulated host.
+
+    Attributes:
+        open_ports (set[int]): Ports answering SYN with SYN+ACK.
+        filtered_ports (set[int]): Ports whose probes are silently dropped by a firewall.
+        rejected_ports (set[int]): Ports whose probes are rejected with ICMP administratively prohibited.
+        alive (bool): Whether the host answers ICMP Echo Requests.
+        ttl (int): Initial TTL of the replies.
+        window (int): TCP window of SYN+ACK replies.
+        syn_ack_options (bytes): TCP options of SYN+ACK replies.
+        rfc793 (bool): Closed ports answer FIN, NULL and XMAS probes with RST while opened ports stay silent.
+            Windows hosts answer every such probe with RST.
+        rst_window_leak (bool): RST replies of opened ports to ACK probes carry a non-zero window.
+    """
+
+    open_ports: set[int]
+    filtered_ports: set[int] = field(default_factory=set)
+    rejected_ports: set[int] = field(default_factory=set)
+    alive: bool = True
+    ttl: int = 64
+    window: int = 64240
+    syn_ack_options: bytes = LINUX_SYN_ACK_OPTIONS
+    rfc793: bool = True
+    rst_window_leak: bool = False
+
+    def state(self, port: int) -> str:
+        """
+        Returns the ground truth state of a port: open, closed or filtered.
+        """
+        if port in self.filtered_ports or port in self.rejected_ports:
+            return "filtered"
+        return "open" if port in self.open_ports else "closed"
+
+
+class SimulatedNetwork:
+    """
+    In-process network of simulated hosts, used as scapy_utils.PacketTransport.
+
+    Probes are answered as the simulated hosts would, after the simulated round trip time.
+    Latency, jitter and loss apply to every probe, lost probes and dropped probes wait for the timeout.
+
+    Usage example:
+        network = SimulatedNetwork({"198.51.100.1": SimulatedHost(open_ports={22, 80})}, latency=0.002)
+        scapy_utils.set_transport(network)
+        half_open_scan("198.51.100.1", 22)  # "Open"
+    """
+
+    def __init__(
+        self,
+        hosts: dict[str, SimulatedHost],
+        latency: float = 0.001,
+        jitter: float = 0.0,
+        loss: float = 0.0,
+        seed: int | None = None,
+        src_ip: str = "192.0.2.1",
+    ):
+        self.hosts = hosts
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.src_ip = src_ip
+        self.packets = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send(self, packet: bytes):
+        with self._lock:
+            self.packets += 1
+
+    def exchange(self, packet: bytes, timeout: float) -> bytes | None:
+        with self._lock:
+            self.packets += 1
+            lost = self._random.random() < self.loss
+            rtt = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        reply = None if lost else self.reply(packet)
+        if reply is None or rtt > timeout:
+            time.sleep(timeout)
+            return None
+        time.sleep(rtt)
+        return reply
+
+    def reply(self, packet: bytes) -> bytes | None:
+        """
+        Returns the reply of the simulated host to a probe, None if it does not answer.
+        """
+        probe = parse_ip_packet(packet, time.time())
+        host = self.hosts.get(probe.dst) if probe else None
+        if host is None:
+            return None
+
+        if probe.haslayer("ICMP"):
+            if not host.alive or probe["ICMP"].type != ICMP_ECHO_REQUEST:
+                return None
+            # Echo identifier, sequence and payload are returned unchanged
+            ihl = (packet[0] & 0x0F) * 4
+            message = build_icmp_message(ICMP_ECHO_REPLY, 0, packet[ihl + 4 :])
+            return build_ip_packet(probe.dst, probe.src, IPPROTO_ICMP, message, host.ttl)
+
+        if not probe.haslayer("TCP"):
+            return None
+        tcp = probe["TCP"]
+        if tcp.dport in host.filtered_ports:
+            return None
+        if tcp.dport in host.rejected_ports:
+            # ICMP errors quote the IP header and the first 8 bytes of the probe
+            ihl = (packet[0] & 0x0F) * 4
+            message = build_icmp_message(ICMP_DEST_UNREACHABLE, ICMP_ADMIN_PROHIBITED, b"\0" * 4 + packet[: ihl + 8])
+            return build_ip_packet(probe.dst, probe.src, IPPROTO_ICMP, message, host.ttl)
+
+        is_open = tcp.dport in host.open_ports
+        syn, ack, rst = tcp.flags & TCP_FLAGS["S"], tcp.flags & TCP_FLAGS["A"], tcp.flags & TCP_FLAGS["R"]
+        rst_ack = TCP_FLAGS["R"] | TCP_FLAGS["A"]
+        if rst:
+            return None
+        if syn and not ack:
+            if is_open:
+                flags, window, options = TCP_FLAGS["S"] | TCP_FLAGS["A"], host.window, host.syn_ack_options
+                seq = self._random.getrandbits(32)
+            else:
+                flags, window, options, seq = rst_ack, 0, b"", 0
+            ack_number = (tcp.seq + 1) & 0xFFFFFFFF
+        elif ack:
+            flags, window, options, seq, ack_number = TCP_FLAGS["R"], 0, b"", tcp.ack, 0
+            if is_open and host.rst_window_leak:
+                window = host.window
+        else:
+            # FIN, NULL and XMAS probes
+            if is_open and host.rfc793:
+                return None
+            flags, window, options, seq, ack_number = rst_ack, 0, b"", 0, (tcp.seq + 1) & 0xFFFFFFFF
+
+        segment = build_tcp_segment(
+            probe.dst, probe.src, tcp.dport, tcp.sport, seq, ack_number, flags, window, options
+        )
+        return build_ip_packet(probe.dst, probe.src, IPPROTO_TCP, segment, host.ttl)
+
+
+def generate_network(
+    hosts: int,
+    ports: int,
+    open_ratio: float,
+    filtered_ratio: float,
+    seed: int | None = None,
+    **network_options,
+) -> SimulatedNetwork:
+    """
+    Generates a network of hosts in 198.51.100.0/24 (TEST-NET-2) with randomly opened and filtered ports.
+
+    Args:
+        hosts (int): Number of hosts, at most 254.
+        ports (int): Ports 1 to ports are populated.
+        open_ratio (float): Share of opened ports.
+        filtered_ratio (float): Share of filtered ports, half of them dropped and half rejected.
+        seed (int, optional): Seed of the generated ports and of the simulated latency and loss.
+        **network_options: latency, jitter and loss of the SimulatedNetwork.
+
+    Returns:
+        SimulatedNetwork: The generated network.
+    """
+    generator = random.Random(seed)
+    simulated_hosts = {}
+    for index in range(1, hosts + 1):
+        host = SimulatedHost(open_ports=set())
+        for port in range(1, ports + 1):
+            draw = generator.random()
+            if draw < open_ratio:
+                host.open_ports.add(port)
+            elif draw < open_ratio + filtered_ratio / 2:
+                host.filtered_ports.add(port)
+            elif draw < open_ratio + filtered_ratio:
+                host.rejected_ports.add(port)
+        simulated_hosts[f"198.51.100.{index}"] = host
+    return SimulatedNetwork(simulated_hosts, seed=seed, **network_options)
@@ -0,0 +1,113 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from logger import init_logger, log_msg
+
+NMAP_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Command lines that must answer without loading the scan engines
+STARTUP_COMMANDS: dict[str, list[str]] = {
+    "help": ["--help"],
+    "invalid_ports": ["-p", "99999", "-a", "127.0.0.1"],
+    "missing_target": ["-p", "80"],
+    "no_ports_left": ["-p", "80", "--exclude-ports", "80", "-a", "127.0.0.1"],
+}
+
+# Packages only the scans need, loading them during the argument validation is a regression
+SCAN_PACKAGES = ("scapy",)
+
+
+def measure_startup(argv: list[str], runs: int) -> float:
+    """
+    Returns the best wall time in seconds of `python nmap.py <argv>` over the given runs.
+    """
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "nmap.py", *argv], cwd=NMAP_DIRECTORY, capture_output=True, check=False
+        )
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def startup_modules() -> set[str]:
+    """
+    Returns the modules loaded by importing the nmap entrypoint and the argument validation in a fresh interpreter.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", "import sys, nmap, init; print('\\n'.join(sys.modules))"],
+        cwd=NMAP_DIRECTORY,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return set(output.split())
+
+
+def command_modules(argv: list[str]) -> set[str]:
+    """
+    Returns the modules imported by `python nmap.py <argv>`, read from the -X importtime report on stderr.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "nmap.py", *argv],
+        cwd=NMAP_DIRECTORY,
+        capture_output=True,
+        text=True,
+        check=False,
+    ).stderr
+    # import time: self [us] | cumulative | imported package
+    return {line.rsplit("|", 1)[1].strip() for line in stderr.splitlines() if line.startswith("import time:")}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the startup benchmark arguments.
+
+    Usage examples:
+        $python -m benchmarks.startup
+        $python -m benchmarks.startup --budget 0.2 --runs 10
+    """
+    parser = argparse.ArgumentParser(description="Nmap Clone startup benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per command, the best run counts. Default 5")
+    parser.add_argument(
+        "--budget", type=float, default=0.3, help="Seconds a command may take until it answered. Default 0.3"
+    )
+    parser.add_argument("-d", "--debug", action="store_true", help="Prints debug logs")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    init_logger(args)
+    failures = []
+
+    loaded = sorted(module for module in startup_modules() if module.split(".")[0] in SCAN_PACKAGES)
+    if loaded:
+        failures.append(f"{len(loaded)} scan modules loaded before the arguments were validated: {loaded[:5]}")
+
+    for name, command in STARTUP_COMMANDS.items():
+        loaded = sorted(module for module in command_modules(command) if module.split(".")[0] in SCAN_PACKAGES)
+        if loaded:
+            failures.append(f"{name}: {len(loaded)} scan modules loaded before the arguments were validated")
+        seconds = measure_startup(command, args.runs)
+        log_msg(f"{name:<16}{seconds * 1000:>8.0f}ms (budget {args.budget * 1000:.0f}ms)")
+        if seconds > args.budget:
+            failures.append(f"{name}: {seconds * 1000:.0f}ms, budget {args.budget * 1000:.0f}ms")
+
+    for failure in failures:
+        log_msg(f"Regression: {failure}", "ERROR")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
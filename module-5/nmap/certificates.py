@@ -0,0 +1,153 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import ipaddress
+from typing import Iterator, NamedTuple
+
+# DER encoded object identifiers, without their tag and length
+OID_COMMON_NAME = bytes.fromhex("550403")  # 2.5.4.3
+OID_SUBJECT_ALT_NAME = bytes.fromhex("551d11")  # 2.5.29.17
+
+TAG_OID = 0x06
+TAG_VERSION = 0xA0  # [0] EXPLICIT, context specific constructed
+TAG_EXTENSIONS = 0xA3  # [3] EXPLICIT, context specific constructed
+TAG_DNS_NAME = 0x82  # [2] IMPLICIT IA5String of GeneralName
+TAG_IP_ADDRESS = 0x87  # [7] IMPLICIT OCTET STRING of GeneralName
+
+
+class CertificateNames(NamedTuple):
+    """
+    Names of an X.509 certificate identifying the service presenting it.
+
+    Attributes:
+        common_name (str, optional): Common name of the subject.
+        issuer (str, optional): Common name of the issuer, the subject itself for self-signed certificates.
+        alt_names (tuple[str, ...]): DNS names and IP addresses of the subject alternative name extension.
+    """
+
+    common_name: str | None = None
+    issuer: str | None = None
+    alt_names: tuple[str, ...] = ()
+
+
+def read_element(data: bytes, offset: int) -> tuple[int, bytes, int]:
+    """
+    Reads one DER element (tag, length, value).
+
+    Args:
+        data (bytes): DER encoded data.
+        offset (int): Offset of the element.
+
+    Raises:
+        ValueError: If the element is truncated or uses an indefinite length, which DER does not allow.
+
+    Returns:
+        tuple: A tuple containing:
+            - int: The tag.
+            - bytes: The value.
+            - int: The offset after the element.
+    """
+    if offset + 2 > len(data):
+        raise ValueError("Truncated DER element")
+    tag, length = data[offset], data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        size = length & 0x7F
+        if not size or offset + size > len(data):
+            raise ValueError("Invalid DER length")
+        length = int.from_bytes(data[offset : offset + size], "big")
+        offset += size
+    if offset + length > len(data):
+        raise ValueError("Truncated DER element")
+    return tag, data[offset : offset + length], offset + length
+
+
+def iter_elements(data: bytes) -> Iterator[tuple[int, bytes]]:
+    """
+    Yields the (tag, value) of the DER elements following each other in data, e.g. the content of a SEQUENCE.
+    """
+    offset = 0
+    while offset < len(data):
+        tag, value, offset = read_element(data, offset)
+        yield tag, value
+
+
+def parse_common_name(name: bytes) -> str | None:
+    """
+    Returns the last common name of a DER encoded Name, a SEQUENCE of SETs of (OID, value) SEQUENCEs.
+
+    Raises:
+        ValueError: If the Name is malformed.
+    """
+    common_name = None
+    for _, relative_name in iter_elements(name):
+        for _, attribute in iter_elements(relative_name):
+            fields = list(iter_elements(attribute))
+            if len(fields) != 2:
+                raise ValueError("Malformed Name attribute")
+            (_, oid), (_, value) = fields
+            if oid == OID_COMMON_NAME:
+                common_name = value.decode("utf-8", errors="replace")
+    return common_name
+
+
+def parse_alt_names(extensions: bytes) -> tuple[str, ...]:
+    """
+    Returns the DNS names and IP addresses of the subject alternative name extension, if present.
+
+    Raises:
+        ValueError: If the extensions are malformed.
+    """
+    _, extension_list, _ = read_element(extensions, 0)
+    for _, extension in iter_elements(extension_list):
+        # An extension is an OID, an optional critical flag and the value
+        fields = list(iter_elements(extension))
+        if len(fields) not in (2, 3):
+            raise ValueError("Malformed Extension")
+        if fields[0] != (TAG_OID, OID_SUBJECT_ALT_NAME):
+            continue
+        # The critical flag is optional, the value is always the last field
+        _, general_names, _ = read_element(fields[-1][1], 0)
+        names = []
+        for tag, value in iter_elements(general_names):
+            if tag == TAG_DNS_NAME:
+                names.append(value.decode("ascii", errors="replace"))
+            elif tag == TAG_IP_ADDRESS and len(value) in (4, 16):
+                names.append(str(ipaddress.ip_address(value)))
+        return tuple(names)
+    return ()
+
+
+def parse_certificate_names(der: bytes) -> CertificateNames:
+    """
+    Extracts the subject common name, issuer common name and subject alternative names of a DER encoded
+    X.509 certificate. Certificates of unverified connections are only available in DER form.
+
+    Args:
+        der (bytes): The certificate, e.g. from SSLObject.getpeercert(binary_form=True).
+
+    Raises:
+        ValueError: If the certificate is malformed.
+
+    Returns:
+        CertificateNames: The names found in the certificate.
+    """
+    _, certificate, _ = read_element(der, 0)
+    _, tbs_certificate, _ = read_element(certificate, 0)
+    fields = list(iter_elements(tbs_certificate))
+    # version [0] is optional, then serial number, signature algorithm, issuer, validity, subject, public key
+    if fields and fields[0][0] == TAG_VERSION:
+        fields = fields[1:]
+    if len(fields) < 6:
+        raise ValueError("Truncated TBSCertificate")
+    issuer, subject = fields[2][1], fields[4][1]
+    extensions = next((value for tag, value in fields[6:] if tag == TAG_EXTENSIONS), None)
+    return CertificateNames(
+        parse_common_name(subject),
+        parse_common_name(issuer),
+        parse_alt_names(extensions) if extensions else (),
+    )
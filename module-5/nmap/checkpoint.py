@@ -0,0 +1,173 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+import base64
+from dataclasses import astuple
+import json
+import os
+import threading
+import zlib
+from logger import log_msg
+from results import ResultWriter, ScanResult, Writers, record_result
+from port_set import PortSet
+import enums
+
+
+BITMAP_SIZE = (enums.RangeEnum.MAX_PORT.value + 1) // 8
+
+
+class CheckpointWriter(ResultWriter):
+    """
+    Result writer keeping a resumable checkpoint of the scan.
+
+    The checkpoint consists of two files:
+        - <path>: JSON with one bitmap of finished ports per host (8 KiB per host, zlib compressed),
+          rewritten atomically every flush_interval seconds and when the scan ends.
+        - <path>.results: Every result written so far as JSON lines, appended and flushed per result.
+
+    The results file is the source of truth: when resuming, ports found in it are marked as finished
+    even if the last bitmap flush did not happen before a crash.
+    """
+
+    mode = "a"
+
+    def __init__(self, path: str, flush_interval: float = 5.0):
+        self.checkpoint_path = path
+        self.results_path = f"{path}.results"
+        self.bitmaps: dict[str, bytearray] = {}
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        super().__init__(self.results_path)
+
+    def open(self):
+        threading.Thread(target=self._flush_periodically, daemon=True).start()
+
+    def is_done(self, host: str, port: int) -> bool:
+        """
+        Returns True if the port of the host was already scanned.
+        """
+        bitmap = self.bitmaps.get(host)
+        return bool(bitmap and bitmap[port >> 3] & (1 << (port & 7)))
+
+    def mark_done(self, host: str, port: int):
+        """
+        Marks the port of the host as scanned.
+        """
+        with self._lock:
+            bitmap = self.bitmaps.setdefault(host, bytearray(BITMAP_SIZE))
+            bitmap[port >> 3] |= 1 << (port & 7)
+
+    def write(self, result: ScanResult):
+        self.file.write(json.dumps(astuple(result)) + "\n")
+        self.file.flush()
+        if result.technique != "service":
+            self.mark_done(result.host, result.port)
+
+    def flush(self):
+        """
+        Atomically rewrites the bitmap file.
+        """
+        with self._lock:
+            hosts = {
+                host: base64.b64encode(zlib.compress(bytes(bitmap))).decode() for host, bitmap in self.bitmaps.items()
+            }
+        temporary_path = f"{self.checkpoint_path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump({"version": 1, "hosts": hosts}, file)
+        os.replace(temporary_path, self.checkpoint_path)
+
+    def close(self):
+        self._closed.set()
+        self.flush()
+        super().close()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def load(self) -> list[ScanResult]:
+        """
+        Loads the bitmaps and the results of a previous run of the same checkpoint.
+
+        Returns:
+            list[ScanResult]: The results written by the previous run.
+        """
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as file:
+                hosts = json.load(file)["hosts"]
+            for host, bitmap in hosts.items():
+                self.bitmaps[host] = bytearray(zlib.decompress(base64.b64decode(bitmap)))
+
+        results = []
+        if os.path.exists(self.results_path):
+            with open(self.results_path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        result = ScanResult(*json.loads(line))
+                    except (ValueError, TypeError):
+                        # The last line may be cut off by a crash
+                        continue
+                    results.append(result)
+                    if result.technique != "service":
+                        self.mark_done(result.host, result.port)
+        return results
+
+
+Checkpoint: CheckpointWriter | None = None
+ResumedResults: list[ScanResult] = []
+
+
+def init_checkpoint(args: argparse.Namespace):
+    """
+    Opens the checkpoint given by --checkpoint.
+    With --resume, the results of the previous run are loaded and replayed to the other result writers first.
+    """
+    global Checkpoint
+    if not args.checkpoint:
+        return
+    Checkpoint = CheckpointWriter(args.checkpoint)
+    if args.resume:
+        ResumedResults.extend(Checkpoint.load())
+        for result in ResumedResults:
+            record_result(result)
+        finished = sum(bin(byte).count("1") for bitmap in Checkpoint.bitmaps.values() for byte in bitmap)
+        log_msg(f"Resuming scan: {finished} port(s) on {len(Checkpoint.bitmaps)} host(s) already scanned")
+    elif os.path.exists(Checkpoint.results_path):
+        # A new scan starts from an empty checkpoint
+        Checkpoint.file.truncate(0)
+    Writers.append(Checkpoint)
+
+
+def is_port_done(host: str, port: int) -> bool:
+    """
+    Returns True if the port was scanned by the resumed run.
+    """
+    return Checkpoint is not None and Checkpoint.is_done(host, port)
+
+
+def finished_ports() -> dict[str, PortSet]:
+    """
+    Returns a snapshot of the ports already scanned per host, empty if no checkpoint is open.
+    """
+    if Checkpoint is None:
+        return {}
+    with Checkpoint._lock:
+        return {host: PortSet.from_bitmap(bitmap) for host, bitmap in Checkpoint.bitmaps.items()}
+
+
+def resumed_opened_ports() -> list[tuple[str, int]]:
+    """
+    Returns the opened ports found by the resumed run whose application was not identified yet.
+    """
+    identified = {(result.host, result.port) for result in ResumedResults if result.technique == "service"}
+    return [
+        (result.host, result.port)
+        for result in ResumedResults
+        if result.state == "Open" and result.technique != "service" and (result.host, result.port) not in identified
+    ]
@@ -0,0 +1,436 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+from array import array
+import errno
+from itertools import islice
+import random
+import socket
+import struct
+import threading
+import time
+from typing import Iterable, Iterator
+from scapy.arch import get_if_hwaddr
+from scapy.config import conf
+from scapy.layers.l2 import ARP, Ether
+from scapy.sendrecv import AsyncSniffer
+from logger import log_msg
+from metrics import Metrics
+import rate_limiter
+from raw_backend import checksum_add, checksum_fold
+from scans import ping_scan
+from timing import get_max_retries, get_probe_timeout, record_rtt
+
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMP_TIMESTAMP_REQUEST = 13
+ICMP_TIMESTAMP_REPLY = 14
+# Technique of each ICMP reply type, the scan metrics are counted per technique
+ICMP_REPLY_TECHNIQUES = {ICMP_ECHO_REPLY: "ping", ICMP_TIMESTAMP_REPLY: "timestamp"}
+ARP_IS_AT = 2
+# Seconds to back off when the send buffer of the raw socket is full
+SEND_BUFFER_BACKOFF = 0.01
+
+HostStates: dict[str, bool] = {}
+_pending: dict[str, threading.Event] = {}
+_lock = threading.Lock()
+
+
+def is_host_alive(dst_ip: str) -> bool:
+    """
+    Pings a host once per scan and caches the outcome.
+
+    Concurrent callers asking for the same host wait for the single ping in flight
+    instead of sending their own.
+
+    Args:
+        dst_ip (str): The target IP address.
+
+    Returns:
+        bool: True if the host answered the Ping Scan with "Alive".
+    """
+    with _lock:
+        if dst_ip in HostStates:
+            return HostStates[dst_ip]
+        pending = _pending.get(dst_ip)
+        is_pinging = pending is None
+        if is_pinging:
+            pending = _pending[dst_ip] = threading.Event()
+
+    if not is_pinging:
+        pending.wait()
+        return HostStates[dst_ip]
+
+    try:
+        alive = ping_scan(dst_ip) == "Alive"
+    except Exception as e:
+        log_msg(f"Ping Scan of host {dst_ip} failed: {e}", "ERROR")
+        alive = False
+    with _lock:
+        HostStates[dst_ip] = alive
+        del _pending[dst_ip]
+    pending.set()
+    log_msg(f"Host {dst_ip}: {'Alive' if alive else 'Down or Filtered'}", "DEBUG")
+    return alive
+
+
+class LiveHostBitmap:
+    """
+    Set of the live hosts of a discovery sweep, one bit per probed address indexed by its position in the sweep.
+    A /16 takes 8 KiB instead of a set of 65536 strings.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.bits = bytearray((size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def add(self, index: int) -> bool:
+        """
+        Marks a host as live.
+
+        Returns:
+            bool: True if the host was not marked before.
+        """
+        mask = 1 << (index & 7)
+        with self._lock:
+            if self.bits[index >> 3] & mask:
+                return False
+            self.bits[index >> 3] |= mask
+            return True
+
+    def __contains__(self, index: int) -> bool:
+        return bool(self.bits[index >> 3] >> (index & 7) & 1)
+
+    def __len__(self) -> int:
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def __iter__(self) -> Iterator[int]:
+        for byte_index, byte in enumerate(self.bits):
+            while byte:
+                lowest = byte & -byte
+                yield byte_index * 8 + lowest.bit_length() - 1
+                byte ^= lowest
+
+
+class HostDiscoveryEngine:
+    """
+    Batched host discovery engine.
+
+    One sender loop writes an ICMP Echo and an ICMP Timestamp Request to every routed host through one raw ICMP
+    socket, and an ARP request to every host of a directly attached subnet, which answers ARP even if it drops ICMP.
+    One listener thread reads the ICMP replies from the same raw socket and one sniffer collects the ARP replies,
+    each reply marks its host in a bitmap of live hosts. Unanswered hosts are probed again in the next round,
+    up to the retries of the timing template. Every sent probe is counted once in the scan metrics, as answered
+    by its first reply or as timed out at the end of its round.
+    The ICMP probes are built as bytes, building scapy packets would limit the sender to a few thousand per second.
+
+    Usage example:
+        engine = HostDiscoveryEngine()
+        live = engine.run(["192.168.1.1", "192.168.1.2"])
+        alive_ips = [engine.addresses[index] for index in live]
+    """
+
+    def __init__(self):
+        self.ident = random.randint(1, 0xFFFF)
+        self.addresses: list[str] = []
+        self.live = LiveHostBitmap(0)
+        self._index: dict[str, int] = {}
+        self._sent_at = array("d")
+        # (host index, technique) of the probes of the current round awaiting their first reply
+        self._pending: set[tuple[int, str]] = set()
+        self._pending_lock = threading.Lock()
+        self._round = 0
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _attached_networks() -> list[tuple[int, int, str, str]]:
+        """
+        Returns (network, netmask, interface, source address) of the directly attached subnets,
+        most specific first. Loopback has no link layer and is probed with ICMP.
+        """
+        routes = [
+            (network, netmask, iface, src_ip)
+            for network, netmask, gateway, iface, src_ip, _ in conf.route.routes
+            if gateway == "0.0.0.0" and netmask and iface != conf.loopback_name
+        ]
+        return sorted(routes, key=lambda route: route[1], reverse=True)
+
+    def _arp_routes(self) -> dict[int, tuple[str, str]]:
+        """
+        Returns the interface and source address to send the ARP request from for each host of a directly
+        attached subnet, by host index. Own addresses never answer ARP and are probed with ICMP.
+        """
+        networks = self._attached_networks()
+        own_addresses = {src_ip for _, _, _, src_ip in networks}
+        arp_routes = {}
+        for index, dst_ip in enumerate(self.addresses):
+            if dst_ip in own_addresses:
+                continue
+            address = struct.unpack("!I", socket.inet_aton(dst_ip))[0]
+            for network, netmask, iface, src_ip in networks:
+                if address & netmask == network:
+                    arp_routes[index] = (iface, src_ip)
+                    break
+        return arp_routes
+
+    def _icmp_probe(self, icmp_type: int, seq: int) -> bytes:
+        """
+        Returns the bytes of an ICMP Echo or Timestamp Request, the kernel adds the IP header.
+        """
+        body = b""
+        if icmp_type == ICMP_TIMESTAMP_REQUEST:
+            # Originate timestamp in milliseconds since midnight UT, receive and transmit timestamps are filled in
+            body = struct.pack("!III", int(time.time() * 1000) % 86_400_000, 0, 0)
+        header = struct.pack("!BBHHH", icmp_type, 0, 0, self.ident, seq)
+        checksum = checksum_fold(checksum_add(0, header + body))
+        return struct.pack("!BBHHH", icmp_type, 0, checksum, self.ident, seq) + body
+
+    @staticmethod
+    def _send_icmp(sock: socket.socket, packet: bytes, dst_ip: str) -> bool:
+        """
+        Sends an ICMP probe, backing off once if the send buffer is full.
+
+        Returns:
+            bool: False if the probe could not be sent, e.g. as the host is unreachable.
+        """
+        for attempt in range(2):
+            try:
+                sock.sendto(packet, (dst_ip, 0))
+                return True
+            except OSError as e:
+                if e.errno != errno.ENOBUFS or attempt:
+                    log_msg(f"Could not send discovery probe to {dst_ip}: {e}", "DEBUG")
+                    return False
+                time.sleep(SEND_BUFFER_BACKOFF)
+        return False
+
+    def _mark(self, dst_ip: str, technique: str, received_at: float):
+        """
+        Marks the host of a reply as live. Only the first reply to a probe of the current round is counted,
+        duplicates and replies to timed out probes are not. Only first replies of the first round are RTT samples,
+        replies to retries could answer any of the sent probes.
+        """
+        index = self._index.get(dst_ip)
+        if index is None:
+            return
+        is_first = self.live.add(index)
+        with self._pending_lock:
+            if (index, technique) not in self._pending:
+                return
+            self._pending.discard((index, technique))
+        rtt = max(0.0, received_at - self._sent_at[index]) if is_first and self._round == 0 else None
+        Metrics.probe_answered(technique, rtt)
+        if rtt is not None:
+            record_rtt(dst_ip, rtt)
+
+    def _time_out_pending(self):
+        """
+        Counts the probes still awaiting their reply as timed out, later replies to them are ignored.
+        """
+        with self._pending_lock:
+            pending, self._pending = self._pending, set()
+        for _, technique in pending:
+            Metrics.probe_timed_out(technique)
+
+    def _listen_icmp(self, sock: socket.socket):
+        """
+        Listener loop, reads every ICMP packet delivered to the raw socket and marks the hosts answering our probes.
+        """
+        while not self._stop.is_set():
+            try:
+                data = sock.recv(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            received_at = time.time()
+            ihl = (data[0] & 0x0F) * 4
+            if len(data) < ihl + 8:
+                continue
+            icmp_type, _, _, ident = struct.unpack_from("!BBHH", data, ihl)
+            technique = ICMP_REPLY_TECHNIQUES.get(icmp_type)
+            if technique and ident == self.ident:
+                self._mark(socket.inet_ntoa(data[12:16]), technique, received_at)
+
+    def _on_arp_reply(self, packet):
+        self._mark(packet[ARP].psrc, "arp", float(packet.time))
+
+    def _send_round(self, sock: socket.socket, arp_routes: dict[int, tuple[str, str]], arp_sockets: dict) -> list[int]:
+        """
+        Sends the probes of one round to every host not known to be live yet.
+
+        Returns:
+            list[int]: Indexes of the probed hosts.
+        """
+        arp_templates = {
+            iface: Ether(src=get_if_hwaddr(iface), dst="ff:ff:ff:ff:ff:ff") / ARP(hwsrc=get_if_hwaddr(iface))
+            for iface in arp_sockets
+        }
+        probed = []
+        for index, dst_ip in enumerate(self.addresses):
+            if index in self.live:
+                continue
+            self._sent_at[index] = time.time()
+            retransmit = self._round > 0
+            if index in arp_routes:
+                iface, src_ip = arp_routes[index]
+                template = arp_templates[iface]
+                template[ARP].psrc = src_ip
+                template[ARP].pdst = dst_ip
+                rate_limiter.acquire()
+                with self._pending_lock:
+                    self._pending.add((index, "arp"))
+                arp_sockets[iface].send(template)
+                Metrics.probe_sent("arp", retransmit=retransmit)
+            else:
+                for icmp_type in (ICMP_ECHO_REQUEST, ICMP_TIMESTAMP_REQUEST):
+                    technique = "ping" if icmp_type == ICMP_ECHO_REQUEST else "timestamp"
+                    rate_limiter.acquire()
+                    # Pending before it is sent, the reply can arrive before the send call returns
+                    with self._pending_lock:
+                        self._pending.add((index, technique))
+                    if self._send_icmp(sock, self._icmp_probe(icmp_type, index & 0xFFFF), dst_ip):
+                        Metrics.probe_sent(technique, retransmit)
+                    else:
+                        with self._pending_lock:
+                            self._pending.discard((index, technique))
+            probed.append(index)
+        return probed
+
+    def run(self, addresses: list[str]) -> LiveHostBitmap:
+        """
+        Probes every address in rounds until it answered or the retries of the timing template are used up.
+
+        Args:
+            addresses (list[str]): Resolved IP addresses to probe.
+
+        Returns:
+            LiveHostBitmap: The live hosts, by their index in addresses.
+        """
+        self.addresses = addresses
+        self.live = LiveHostBitmap(len(addresses))
+        self._index = {dst_ip: index for index, dst_ip in enumerate(addresses)}
+        self._sent_at = array("d", bytes(8 * len(addresses)))
+        self._stop.clear()
+        arp_routes = self._arp_routes()
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+        # A dense subnet answers with a burst of replies, the default receive buffer would drop most of them
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+        sock.settimeout(0.1)
+        listener = threading.Thread(target=self._listen_icmp, args=(sock,), daemon=True)
+        listener.start()
+
+        arp_ifaces = sorted({iface for iface, _ in arp_routes.values()})
+        sniffer = None
+        arp_sockets = {}
+        if arp_ifaces:
+            sniffing = threading.Event()
+            sniffer = AsyncSniffer(
+                iface=arp_ifaces,
+                lfilter=lambda packet: packet.haslayer(ARP) and packet[ARP].op == ARP_IS_AT,
+                prn=self._on_arp_reply,
+                store=False,
+                started_callback=sniffing.set,
+            )
+            sniffer.start()
+            sniffing.wait(2)
+            arp_sockets = {iface: conf.L2socket(iface=iface) for iface in arp_ifaces}
+
+        try:
+            for self._round in range(get_max_retries() + 1):
+                started = time.monotonic()
+                probed = self._send_round(sock, arp_routes, arp_sockets)
+                if not probed:
+                    break
+                sent_in = time.monotonic() - started
+                deadline = time.monotonic() + max(get_probe_timeout(addresses[index]) for index in probed)
+                while time.monotonic() < deadline and len(self.live) < len(addresses):
+                    time.sleep(0.01)
+                for index in probed:
+                    techniques = ("arp",) if index in arp_routes else ("ping", "timestamp")
+                    if self._round == 0:
+                        # Retries only probe the hosts left unanswered, their outcomes tell nothing of congestion
+                        for _ in techniques:
+                            rate_limiter.record_probe(index in self.live)
+                self._time_out_pending()
+                log_msg(
+                    f"Discovery round {self._round}: probed {len(probed)} hosts in {sent_in:.2f}s, "
+                    f"{len(self.live)} of {len(addresses)} alive, {rate_limiter.rate_status()}",
+                    "DEBUG",
+                )
+        finally:
+            self._stop.set()
+            listener.join()
+            self._time_out_pending()
+            sock.close()
+            for arp_socket in arp_sockets.values():
+                arp_socket.close()
+            if sniffer is not None:
+                sniffer.stop()
+        return self.live
+
+
+def ping_batch(hosts: list[str]) -> list[str]:
+    """
+    Probes a batch of hosts with the batched host discovery engine.
+    The outcome of every host is stored in the host discovery cache.
+
+    Args:
+        hosts (list[str]): IP- or DNS-Addresses to probe.
+
+    Returns:
+        list[str]: The alive hosts of the batch.
+    """
+    resolved: dict[str, list[str]] = {}
+    for host in hosts:
+        try:
+            resolved.setdefault(socket.gethostbyname(host), []).append(host)
+        except socket.gaierror as e:
+            log_msg(f"Could not resolve host {host}: {e}", "WARNING")
+            with _lock:
+                HostStates[host] = False
+
+    if not resolved:
+        return []
+
+    engine = HostDiscoveryEngine()
+    live = engine.run(list(resolved))
+    alive_ips = {engine.addresses[index] for index in live}
+
+    alive_hosts = []
+    with _lock:
+        for dst_ip, names in resolved.items():
+            for host in names:
+                HostStates[host] = dst_ip in alive_ips
+                if HostStates[host]:
+                    alive_hosts.append(host)
+    return alive_hosts
+
+
+def discover_hosts(hosts: Iterable[str], batch_size: int = 65536) -> Iterator[str]:
+    """
+    Host discovery phase: probes all targets in batches of batch_size hosts, so a /16 is swept at once.
+
+    Args:
+        hosts (Iterable[str]): IP- or DNS-Addresses, consumed lazily batch by batch.
+        batch_size (int): Number of hosts probed together.
+
+    Yields:
+        str: The alive hosts.
+    """
+    log_msg("Discovering hosts ...")
+    hosts = iter(hosts)
+    pinged = alive = 0
+    while batch := list(islice(hosts, batch_size)):
+        alive_hosts = ping_batch(batch)
+        pinged += len(batch)
+        alive += len(alive_hosts)
+        log_msg(f"Discovered {alive} alive of {pinged} pinged hosts", "DEBUG")
+        yield from alive_hosts
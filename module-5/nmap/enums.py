@@ -64,3 +64,15 @@ class FlagsEnum(NmapEnum[int], Enum):
             combined_value |= flag.value
 
         return hex(combined_value)
+
+
+class SweepTechniqueEnum(NmapEnum[str], Enum):
+    """
+    Defines the scan techniques that can run through the batched sweep engine.
+    """
+
+    HALF_OPEN = "half_open"
+    FIN = "fin"
+    NULL = "null"
+    XMAS = "xmas"
+    UDP = "udp"
@@ -0,0 +1,220 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+from functools import lru_cache
+import math
+import os
+import struct
+import threading
+from typing import Any, NamedTuple
+from logger import log_msg
+
+
+DEFAULT_DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "os-fingerprints.txt")
+INITIAL_TTLS = (32, 64, 128, 255)
+
+# TCP option kinds as letters, in the order they appear in the reply
+RAW_OPTION_LETTERS = {0: "E", 1: "N", 2: "M", 3: "W", 4: "S", 8: "T"}
+SCAPY_OPTION_LETTERS = {"EOL": "E", "NOP": "N", "MSS": "M", "WScale": "W", "SAckOK": "S", "Timestamp": "T"}
+IP_FLAG_DF = 0x2
+
+
+class Fingerprint(NamedTuple):
+    """
+    Features of a SYN+ACK reply that depend on the TCP/IP stack of the replying host.
+
+    Attributes:
+        ttl (int): Initial TTL, the received TTL rounded up to the closest common initial TTL.
+        window (int): TCP window size.
+        mss (int): Maximum segment size option, 0 if the option is missing.
+        options (str): TCP option order, one letter per option. Ex.: MSTNW
+        df (bool): Don't Fragment bit of the IP header.
+    """
+
+    ttl: int
+    window: int
+    mss: int
+    options: str
+    df: bool
+
+
+class OsSignature(NamedTuple):
+    """
+    One entry of the OS fingerprint database.
+    """
+
+    name: str
+    fingerprint: Fingerprint
+
+
+def initial_ttl(ttl: int) -> int:
+    """
+    Returns the initial TTL a received TTL most likely started from.
+    """
+    return next((initial for initial in INITIAL_TTLS if ttl <= initial), INITIAL_TTLS[-1])
+
+
+def parse_tcp_options(options: Any) -> tuple[str, int]:
+    """
+    Returns the option order letters and the MSS of TCP options, given as raw bytes (raw backend)
+    or as list of (name, value) pairs (scapy).
+    """
+    if not isinstance(options, (bytes, bytearray)):
+        letters = "".join(SCAPY_OPTION_LETTERS.get(name, "?") for name, _ in options)
+        mss = next((value for name, value in options if name == "MSS"), 0)
+        return letters, mss
+
+    letters, mss, index = "", 0, 0
+    while index < len(options):
+        kind = options[index]
+        letters += RAW_OPTION_LETTERS.get(kind, "?")
+        if kind == 2 and index + 4 <= len(options):
+            mss = struct.unpack_from("!H", options, index + 2)[0]
+        if kind in (0, 1):
+            index += 1
+        elif index + 1 < len(options) and options[index + 1] >= 2:
+            index += options[index + 1]
+        else:
+            break
+    return letters, mss
+
+
+def extract_fingerprint(response) -> Fingerprint | None:
+    """
+    Extracts the fingerprint features of a SYN+ACK reply, scapy packet or raw backend reply.
+
+    Returns:
+        Fingerprint | None: The features, None if the reply has no IP and TCP layer.
+    """
+    if response is None or not response.haslayer("IP") or not response.haslayer("TCP"):
+        return None
+    ip_layer, tcp_layer = response.getlayer("IP"), response.getlayer("TCP")
+    options, mss = parse_tcp_options(tcp_layer.options)
+    df = bool(int(ip_layer.flags) & IP_FLAG_DF)
+    return Fingerprint(initial_ttl(ip_layer.ttl), tcp_layer.window, mss, options, df)
+
+
+def parse_fingerprint_line(line: str) -> OsSignature | None:
+    """
+    Parses one line of the fingerprint database: <initial ttl> <window> <mss> <tcp options> <df> <os name>
+
+    Raises:
+        ValueError: If the line is not a valid fingerprint.
+
+    Returns:
+        OsSignature | None: The signature, None for empty lines and comments.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    fields = line.split(None, 5)
+    if len(fields) != 6:
+        raise ValueError(f"Invalid fingerprint: {line}")
+    ttl, window, mss, options, df, name = fields
+    return OsSignature(name, Fingerprint(int(ttl), int(window), int(mss), options, df == "1"))
+
+
+def fingerprint_distance(first: Fingerprint, second: Fingerprint) -> float:
+    """
+    Distance between two fingerprints with the same initial TTL. The window is compared on a log scale,
+    as stacks differ by multiples of the MSS, MSS and DF mismatches add a fixed penalty.
+    """
+    distance = abs(math.log2(first.window + 1) - math.log2(second.window + 1))
+    distance += 0.5 if first.mss != second.mss else 0.0
+    distance += 1.0 if first.df != second.df else 0.0
+    distance += 2.0 if first.options != second.options else 0.0
+    return distance
+
+
+class FingerprintDatabase:
+    """
+    OS fingerprint database indexed for nearest-match lookups.
+
+    Signatures are grouped by (initial TTL, option order), which are the most distinctive features.
+    A lookup only compares the signatures of its group, falling back to all signatures with the same
+    initial TTL if the group is empty. Results are cached per fingerprint, hosts of the same network
+    mostly share a few fingerprints.
+
+    Usage example:
+        database = FingerprintDatabase.load()
+        database.match(Fingerprint(64, 64240, 1460, "MSTNW", True))  # "Linux 4.x - 6.x"
+    """
+
+    def __init__(self, signatures: list[OsSignature]):
+        self.signatures = signatures
+        self.index: dict[tuple[int, str], list[OsSignature]] = {}
+        self.by_ttl: dict[int, list[OsSignature]] = {}
+        for signature in signatures:
+            self.index.setdefault((signature.fingerprint.ttl, signature.fingerprint.options), []).append(signature)
+            self.by_ttl.setdefault(signature.fingerprint.ttl, []).append(signature)
+        self.match = lru_cache(maxsize=4096)(self._match)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_DATABASE) -> "FingerprintDatabase":
+        """
+        Loads a fingerprint database file.
+
+        Raises:
+            ValueError: If a line is not a valid fingerprint.
+        """
+        with open(path, "r", encoding="utf-8") as file:
+            signatures = [signature for signature in map(parse_fingerprint_line, file) if signature]
+        log_msg(f"Loaded {len(signatures)} OS fingerprints from {path}", "DEBUG")
+        return cls(signatures)
+
+    def _match(self, fingerprint: Fingerprint) -> str | None:
+        """
+        Returns the OS name of the nearest signature, None if no signature has the same initial TTL.
+        """
+        candidates = self.index.get((fingerprint.ttl, fingerprint.options)) or self.by_ttl.get(fingerprint.ttl)
+        if not candidates:
+            return None
+        nearest = min(candidates, key=lambda signature: fingerprint_distance(fingerprint, signature.fingerprint))
+        return nearest.name
+
+
+Database: FingerprintDatabase | None = None
+HostFingerprints: dict[str, Fingerprint] = {}
+_lock = threading.Lock()
+
+
+def init_fingerprints(args: argparse.Namespace):
+    """
+    Loads the fingerprint database given by the --os-db argument.
+    """
+    global Database
+    Database = FingerprintDatabase.load(args.os_db)
+
+
+def record_fingerprint(dst_ip: str, response):
+    """
+    Keeps the fingerprint features of a SYN+ACK reply received by a scan, the first one per host.
+    """
+    if dst_ip in HostFingerprints:
+        return
+    fingerprint = extract_fingerprint(response)
+    if fingerprint:
+        with _lock:
+            HostFingerprints.setdefault(dst_ip, fingerprint)
+        log_msg(f"Host {dst_ip} fingerprint: {fingerprint}", "DEBUG")
+
+
+def guess_os(dst_ip: str) -> str | None:
+    """
+    Guesses the OS of a host from the fingerprint features recorded by its scans, without sending probes.
+
+    Returns:
+        str | None: The OS name, None if no SYN+ACK of the host was received or nothing matched.
+    """
+    global Database
+    fingerprint = HostFingerprints.get(dst_ip)
+    if fingerprint is None:
+        return None
+    if Database is None:
+        Database = FingerprintDatabase.load()
+    return Database.match(fingerprint)
@@ -6,110 +6,85 @@ Author: Mihai-Andrei Neacsu
 """
 
 import argparse
+import os
 from logger import init_logger, log_msg
-import re
+from timing import init_timing, TIMING_TEMPLATES
+from rate_limiter import init_rate_limiter
+from targets import validate_target_expression
+from signatures import init_signatures, DEFAULT_DATABASE
+from fingerprint import init_fingerprints, DEFAULT_DATABASE as DEFAULT_OS_DATABASE
+from results import init_results
+from checkpoint import init_checkpoint
+from state_cache import init_state_cache
+from metrics import init_metrics
+from progress import init_progress, PROGRESS_MODES
+from port_set import PortSet
 import enums
 
 
-def validate_port_range(
-    ports: str,
-) -> tuple[str | None, str | None, str | None, str | None]:
+def validate_ports(ports: str) -> PortSet:
     """
-    Validates given ports range format using a regex expression
-    and returns the matched groups.
+    Validates a port specification and converts it into a port set.
 
-    Accepted formats:
-        - One number from 1 to maximal 5 digits (\\d{1,5}).
-            Ex.: 8, 22, 443, 5000, 65535
-        - Two numbers from 1 to maximal 5 digits separated by a hyphen (\\d{1,5})-(\\d{1,5}).
-            Ex.: 22-2222
-        - A hyphen (-)
+    Accepted formats, separated by commas:
+        - One number from 1 to maximal 5 digits. Ex.: 8, 22, 443, 5000, 65535
+        - Two numbers separated by a hyphen. Ex.: 22-2222
+        - One number with a leading or trailing hyphen, a range from 0 or to MAX_PORT. Ex.: -1024, 1024-
+        - A hyphen (-) for all ports
 
     Args:
-        ports (str): Ports format to validate.
+        ports (str): Port specification to validate. Ex.: 22,80,443,8000-8100
 
     Raises:
         argparse.ArgumentTypeError: If validation fails.
 
     Returns:
-        tuple : Matched groups: start, end, single_port, hyphen
-
+        PortSet: The specified ports.
     """
     log_msg(f"PORTS Range: {ports}", level="DEBUG")
-    port_range_regex = re.compile(r"^(?:(\d{1,5})-(\d{1,5})|(\d{1,5})|(-))$")
-    match = port_range_regex.match(ports)
-    if not match:
-        raise argparse.ArgumentTypeError(f"Invalid port range format: {ports}")
-    return match.groups()
+    try:
+        return PortSet.parse(ports)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
 
-def validate_ports_list(start: str, end: str, single_port: str, hyphen: str, ports: str) -> list[int]:
+def validate_targets(targets: str) -> str:
     """
-    Validates ports list by given start and end ports or single port or hyphen:
-        - If hyphen is defined returns list range of ports from 0 to (MAX_PORT + 1) value.
-        - Else if single_port is defined but not greater then MAX_PORT,
-          a list of one element containing single_port value is returned.
-        - Else if start and end ports are defined but start port not greater then end
-          and end not greater then MAX_PORT
-          a list range of port from start port value to end port value + 1 is returned.
+    Validates a comma separated list of target expressions without expanding them.
 
     Args:
-        start (str) : starting port
-        end (str) : ending port
-        single_port (str): single port value
-        ports (str): original ports format
-
-    Returns:
-        list[int] : A list of ports numbers.
-        Possible outcomes:
-            - [0, MAX_PORT + 1]
-            - [start, end + 1]
-            - [single_port]
+        targets (str): Target expressions like 192.168.1.1,10.0.0.0/24,10.0.0.1-50,your-domain.com
 
     Raises:
-        ValueError:
-            - If single_port greater then MAX_PORT
-            - If start is greater then end and end greater then MAX_PORT
-        argparse.ArgumentTypeError: If no list of ports could be created from the given values.
+        argparse.ArgumentTypeError: If any expression is not valid.
+
+    Returns:
+        str: The validated targets.
     """
-    MAX_PORT = enums.RangeEnum.MAX_PORT.value
-    if hyphen:
-        ports_list = list(range(MAX_PORT + 1))
-    elif single_port:
-        single_port = int(single_port)
-        if single_port > MAX_PORT:
-            raise ValueError(f"Invalid port: {single_port}. Max allowed is {MAX_PORT}.")
-        ports_list = [int(single_port)]
-    elif start and end:
-        start, end = int(start), int(end)
-        if start > end:
-            raise ValueError(f"Invalid port range: Start port {start} can be greater then end port {end}")
-        if end > MAX_PORT:
-            raise ValueError(f"Invalid port range: {end}. Max allowed is {MAX_PORT}.")
-        ports_list = list(range(start, end + 1))
-    else:
-        raise argparse.ArgumentTypeError(f"Invalid port range format: {ports}")
-    return ports_list
-
-
-def validate_args(args: argparse.Namespace):
+    for expression in filter(None, targets.split(",")):
+        validate_target_expression(expression)
+    return targets
+
+
+def validate_args(parser: argparse.ArgumentParser, args: argparse.Namespace):
     """
     Validates Command-Line arguments.
-        1. validates given ports range format
-        1. validates ports list range
+        1. builds the port set from the ports, or all ports if only --top-ports is given
+        2. removes the excluded ports
+        3. keeps the --top-ports most frequently open ports, at most the ports of the frequency table
     """
-    start, end, single_port, hyphen = validate_port_range(args.ports)
-
-    log_msg(f"Start PORT {start}", level="DEBUG")
-    log_msg(f"End PORT {end}", level="DEBUG")
-    log_msg(f"Single PORT {single_port}", level="DEBUG")
-    log_msg(f"Hyphen {hyphen}", level="DEBUG")
-
-    args.ports_list = validate_ports_list(start, end, single_port, hyphen, args.ports)
-
-    log_msg(f"ARGS PORTS_LIST LENGTH {len(args.ports_list)}", "DEBUG")
-    log_msg(f"ARGS PORTS_LIST START {args.ports_list[0]}", "DEBUG")
-    log_msg(f"ARGS PORTS_LIST END {args.ports_list[-1]}", "DEBUG")
+    args.port_set = args.ports if args.ports is not None else PortSet.parse("-")
+    if args.exclude_ports is not None:
+        args.port_set.difference_update(args.exclude_ports)
+    if args.top_ports is not None:
+        args.port_set = args.port_set.top(args.top_ports)
+        if len(args.port_set) < args.top_ports:
+            log_msg(
+                f"Only {len(args.port_set)} of the {args.top_ports} top ports are known from the port frequency table",
+                "WARNING",
+            )
+    if not args.port_set:
+        parser.error("No ports left to scan")
 
 
 def init() -> argparse.Namespace:
@@ -117,22 +92,212 @@ def init() -> argparse.Namespace:
     Initializes Command-line arguments.
 
     Accepted arguments:
-        -p --ports: (str) Ports range 0-65535
-        -a --address: (str) IP- or DNS-Address
+        -p --ports: (str) Ports and port ranges 0-65535 separated by commas, required if --top-ports is not given
+        --exclude-ports: (str) Ports and port ranges not to scan
+        --top-ports: (int) Scans the given number of most frequently open ports
+        -a --address: (str) One or more targets: IP- or DNS-Addresses, CIDR networks or IP ranges
+        -iL --input-file: (str) File with targets, required if no address is given
         -d --debug: (bool) Prints debug logs
+        -s --sweep: (str) Batched sweep technique: half_open, fin, null, xmas or udp
+        --joint: (list[str]) Techniques probed at once per port and classified jointly, default half_open ack
+        --max-parallelism: (int) Maximal number of ports scanned at the same time, default 100
+        --workers: (int) Number of processes the (host, port) pairs are split into, default 1
+        -T --timing: (int) Timing template 0-5 (paranoid to insane), default 3
+        --min-rate: (float) Lowest packets per second the congestion backoff may go down to
+        --max-rate: (float) Highest packets per second, unlimited by default
+        --service-db: (str) Service signature database, default service-signatures.txt
+        --os-db: (str) OS fingerprint database, default os-fingerprints.txt
+        --backend: (str) Packet backend of the TCP probes scapy or raw, default scapy
+        -oJ --output-jsonl: (str) Streams results as JSON lines to the given file
+        -oC --output-csv: (str) Streams results as CSV to the given file
+        -oX --output-xml: (str) Streams results as nmap-style XML to the given file
+        --checkpoint: (str) Checkpoint file saving the scan progress
+        --resume: (bool) Resumes the scan saved in the checkpoint file
+        --cache: (str) SQLite state cache of the previous scans
+        --cache-ttl: (float) Seconds a cached port state stays valid, default 86400
+        --incremental: (bool) Re-verifies the cached opened ports before scanning the other ports
+        --diff-output: (str) Writes the state changes since the previous scans as JSON lines to the given file
+        --progress: (str) Progress reports tty, json, auto or off, default auto
+        --progress-interval: (float) Seconds between two progress reports, default 1
 
     Usage examples:
         $python nmap.py -p your-port -a your-domain.com
+        $python nmap.py -p your-port -a 192.168.1.0/24 10.0.0.1-50
+        $python nmap.py -p 1-1024,8080 --exclude-ports 25 -a your-domain.com
+        $python nmap.py --top-ports 100 -a your-domain.com
+        $python nmap.py -p 1-1024 -a 192.168.1.0/24 --cache scans.db --incremental --diff-output changes.jsonl
+        $python nmap.py -p - -a 10.0.0.0/16 --workers 16 -oJ results.jsonl
     """
     parser = argparse.ArgumentParser(description="Nmap Clone")
 
-    parser.add_argument("-p", "--ports", required=True, type=str, help="Ports range 0-65535")
-    parser.add_argument("-a", "--address", required=True, type=str, help="IP- or DNS-Address")
+    parser.add_argument(
+        "-p",
+        "--ports",
+        type=validate_ports,
+        help="Ports and port ranges 0-65535 separated by commas. Ex.: 22,80,1000-2000",
+    )
+    parser.add_argument("--exclude-ports", type=validate_ports, help="Ports and port ranges not to scan")
+    parser.add_argument("--top-ports", type=int, help="Scan the given number of most frequently open ports")
+    parser.add_argument(
+        "-a",
+        "--address",
+        nargs="+",
+        default=[],
+        type=validate_targets,
+        help="IP- or DNS-Addresses, CIDR networks (10.0.0.0/24) or IP ranges (10.0.0.1-50)",
+    )
+    parser.add_argument("-iL", "--input-file", type=str, help="File with one or more targets per line")
     parser.add_argument("-d", "--debug", action="store_true", help="Prints debug logs")
+    parser.add_argument(
+        "-s",
+        "--sweep",
+        type=str,
+        choices=enums.SweepTechniqueEnum.list(),
+        help="Scan all ports in one batched sweep with the given technique",
+    )
+    parser.add_argument(
+        "--joint",
+        nargs="*",
+        choices=["half_open", "connect", "ack", "window", "null", "fin", "xmas"],
+        help="Send the probes of the given techniques to each port at once and classify the port from all replies. "
+        "Default half_open ack",
+    )
+    parser.add_argument(
+        "--max-parallelism",
+        type=int,
+        default=100,
+        help="Maximal number of ports scanned at the same time. Default 100",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Split the (host, port) pairs into the given number of shards, each scanned in its own process. Default 1",
+    )
+    parser.add_argument(
+        "-T",
+        "--timing",
+        type=int,
+        default=3,
+        choices=list(TIMING_TEMPLATES),
+        help="Timing template paranoid (0), sneaky (1), polite (2), normal (3), aggressive (4) and insane (5). "
+        "Default normal (3)",
+    )
+    parser.add_argument(
+        "--min-rate", type=float, help="Lowest packets per second the congestion backoff may go down to"
+    )
+    parser.add_argument("--max-rate", type=float, help="Highest packets per second. Default unlimited")
+    parser.add_argument(
+        "--service-db",
+        type=str,
+        default=DEFAULT_DATABASE,
+        help="Service signature database used to identify applications. Default service-signatures.txt",
+    )
+    parser.add_argument(
+        "--os-db",
+        type=str,
+        default=DEFAULT_OS_DATABASE,
+        help="OS fingerprint database matched against the replies of opened ports. Default os-fingerprints.txt",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        default="scapy",
+        choices=["scapy", "raw"],
+        help=(
+            "Packet backend of the TCP probes and teardowns: scapy packet objects or raw sockets with byte templates "
+            "(Linux only). ICMP ping and UDP probes always use scapy. Default scapy"
+        ),
+    )
+    parser.add_argument("-oJ", "--output-jsonl", type=str, help="Stream results as JSON lines to the given file")
+    parser.add_argument("-oC", "--output-csv", type=str, help="Stream results as CSV to the given file")
+    parser.add_argument("-oX", "--output-xml", type=str, help="Stream results as nmap-style XML to the given file")
+    parser.add_argument("--checkpoint", type=str, help="Checkpoint file saving the scan progress every few seconds")
+    parser.add_argument("--resume", action="store_true", help="Resume the scan saved in the checkpoint file")
+    parser.add_argument("--cache", type=str, help="SQLite state cache keeping the port states of previous scans")
+    parser.add_argument(
+        "--cache-ttl", type=float, default=86400, help="Seconds a cached port state stays valid. Default 86400"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true", help="Re-verify the cached opened ports before scanning the other ports"
+    )
+    parser.add_argument(
+        "--diff-output", type=str, help="Write the state changes since the previous scans as JSON lines"
+    )
+    parser.add_argument("--metrics-file", type=str, help="Write the scan metrics in Prometheus text format")
+    parser.add_argument("--metrics-json", type=str, help="Write a JSON summary of the scan metrics at exit")
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between two status lines and --metrics-file updates. Default 5",
+    )
+    parser.add_argument(
+        "--progress",
+        type=str,
+        choices=PROGRESS_MODES,
+        default="auto",
+        help="Progress reports: tty status line, json lines for job runners, auto (tty on a terminal) or off",
+    )
+    parser.add_argument(
+        "--progress-interval", type=float, default=1.0, help="Seconds between two progress reports. Default 1"
+    )
 
     args = parser.parse_args()
+    if args.ports is None and args.top_ports is None:
+        parser.error("The ports to scan must be provided with --ports or --top-ports")
+    if args.top_ports is not None and args.top_ports < 1:
+        parser.error(f"Invalid top ports: {args.top_ports}. Min allowed is 1.")
+    if not args.address and not args.input_file:
+        parser.error("At least one target must be provided with --address or --input-file")
+    if args.input_file and not os.path.exists(args.input_file):
+        parser.error(f"The targets file {args.input_file} does not exist.")
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires the --checkpoint file of the scan to resume")
+    if (args.incremental or args.diff_output) and not args.cache:
+        parser.error("--incremental and --diff-output require the --cache of the previous scans")
+    if args.cache_ttl <= 0:
+        parser.error(f"Invalid cache TTL: {args.cache_ttl}. The TTL must be greater then 0.")
+    if not os.path.exists(args.service_db):
+        parser.error(f"The service signature database {args.service_db} does not exist.")
+    if not os.path.exists(args.os_db):
+        parser.error(f"The OS fingerprint database {args.os_db} does not exist.")
+    if args.metrics_interval <= 0:
+        parser.error(f"Invalid metrics interval: {args.metrics_interval}. The interval must be greater then 0.")
+    if args.progress_interval <= 0:
+        parser.error(f"Invalid progress interval: {args.progress_interval}. The interval must be greater then 0.")
+    if args.joint is not None and args.sweep:
+        parser.error("--joint probes each port on its own and can not be combined with --sweep")
+    if args.max_parallelism < 1:
+        parser.error(f"Invalid max parallelism: {args.max_parallelism}. Min allowed is 1.")
+    if args.workers < 1:
+        parser.error(f"Invalid workers: {args.workers}. Min allowed is 1.")
+    for rate in (args.min_rate, args.max_rate):
+        if rate is not None and rate <= 0:
+            parser.error(f"Invalid rate: {rate}. Rates must be greater then 0.")
+    if args.min_rate and args.max_rate and args.min_rate > args.max_rate:
+        parser.error(f"Invalid rates: --min-rate {args.min_rate} can not be greater then --max-rate {args.max_rate}.")
+    validate_args(parser, args)
+
     init_logger(args)
+    log_msg(f"ARGS PORT_SET LENGTH {len(args.port_set)}", "DEBUG")
+    log_msg(f"ARGS PORT_SET FIRST {next(iter(args.port_set))}", "DEBUG")
+    init_timing(args)
+    init_rate_limiter(args)
+    init_signatures(args)
+    init_fingerprints(args)
+    # scapy takes longer to import than the whole argument validation, so it is only loaded for a valid scan
+    from scapy_utils import init_backend
+    from planner import init_planner
+
+    init_backend(args)
+    init_planner(args)
+    # The output files are truncated when opened, so they are only opened once all arguments are valid
+    init_results(args)
+    init_checkpoint(args)
+    init_state_cache(args)
+    init_metrics(args)
+    init_progress(args)
     log_msg("Initializing Nmap Clone...")
-    validate_args(args)
 
     return args
@@ -29,3 +29,15 @@ TcpNullScanResult = Literal["Open or Filtered", "Closed", "Filtered or Unexpecte
 TcpXmasScanResult = Literal["Open or Filtered", "Closed", "Filtered or Unexpected Response"]
 
 TcpFinScan = Literal["Open or Filtered", "Closed", "Filtered or Unexpected Response"]
+
+UdpScanResult = Literal["Open", "Closed", "Filtered", "Open or Filtered", "Filtered or Unexpected Response"]
+
+JointScanResult = Literal[
+    "Open",
+    "Closed",
+    "Filtered",
+    "Unfiltered",
+    "Open or Filtered",
+    "Closed or Filtered",
+    "Unknown",
+]
@@ -0,0 +1,252 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+import bisect
+import json
+import os
+import threading
+import time
+from logger import log_msg
+import rate_limiter
+
+
+# Upper bounds in seconds, from loopback round trips to the slowest timing templates
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed buckets, as exported in the Prometheus text format.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: dict):
+        """
+        Adds the observations of a histogram snapshot.
+        """
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other["counts"])]
+        self.sum += other["sum"]
+        self.count += other["count"]
+
+    def quantile(self, quantile: float) -> float | None:
+        """
+        Returns the upper bound of the bucket holding the quantile, None without observations.
+        """
+        if not self.count:
+            return None
+        rank, seen = quantile * self.count, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+
+class ScanMetrics:
+    """
+    Counters and histograms of the probes sent by the scans, per technique.
+
+    Attributes:
+        probes (dict[str, int]): Probes sent per technique, retransmits included.
+        replies (dict[str, int]): Probes answered by a matching reply per technique.
+        retransmits (dict[str, int]): Probes resent after a timeout per technique.
+        timeouts (dict[str, int]): Probes that timed out per technique.
+        in_flight (int): Probes waiting for their reply right now.
+        rtt (Histogram): Round trip times of the answered probes.
+        decision_latency (Histogram): Time from the first probe of a port until its state is decided.
+    """
+
+    COUNTERS = {
+        "probes": "Probes sent per technique, retransmits included.",
+        "replies": "Probes answered by a matching reply per technique.",
+        "retransmits": "Probes resent after a timeout per technique.",
+        "timeouts": "Probes that timed out per technique.",
+    }
+
+    def __init__(self):
+        self.probes: dict[str, int] = {}
+        self.replies: dict[str, int] = {}
+        self.retransmits: dict[str, int] = {}
+        self.timeouts: dict[str, int] = {}
+        self.in_flight = 0
+        self.rtt = Histogram()
+        self.decision_latency = Histogram()
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def probe_sent(self, technique: str, retransmit: bool = False):
+        with self._lock:
+            self.probes[technique] = self.probes.get(technique, 0) + 1
+            if retransmit:
+                self.retransmits[technique] = self.retransmits.get(technique, 0) + 1
+            self.in_flight += 1
+
+    def probe_answered(self, technique: str, rtt: float | None):
+        with self._lock:
+            self.replies[technique] = self.replies.get(technique, 0) + 1
+            self.in_flight -= 1
+            if rtt is not None:
+                self.rtt.observe(rtt)
+
+    def probe_timed_out(self, technique: str):
+        with self._lock:
+            self.timeouts[technique] = self.timeouts.get(technique, 0) + 1
+            self.in_flight -= 1
+
+    def port_decided(self, seconds: float):
+        with self._lock:
+            self.decision_latency.observe(seconds)
+
+    def snapshot(self) -> dict:
+        """
+        Returns all metrics as a JSON serializable dict.
+        """
+        with self._lock:
+            snapshot = {name: dict(getattr(self, name)) for name in self.COUNTERS}
+            snapshot.update(
+                in_flight=self.in_flight,
+                send_rate=rate_limiter.Limiter.achieved_rate(),
+                elapsed=time.time() - self.started_at,
+                rtt=self.rtt.snapshot(),
+                decision_latency=self.decision_latency.snapshot(),
+            )
+        return snapshot
+
+    def merge(self, snapshot: dict):
+        """
+        Adds the counters and histograms of a snapshot, e.g. of a shard process.
+        """
+        with self._lock:
+            for name in self.COUNTERS:
+                counters = getattr(self, name)
+                for technique, value in snapshot[name].items():
+                    counters[technique] = counters.get(technique, 0) + value
+            self.rtt.merge(snapshot["rtt"])
+            self.decision_latency.merge(snapshot["decision_latency"])
+
+    def status_line(self) -> str:
+        """
+        Returns a one line summary: probes, replies, retransmits, timeouts, in-flight probes and RTT.
+        The send rate is reported by the rate limiter status line.
+        """
+        with self._lock:
+            totals = {name: sum(getattr(self, name).values()) for name in self.COUNTERS}
+            in_flight, rtt_p50, rtt_p90 = self.in_flight, self.rtt.quantile(0.5), self.rtt.quantile(0.9)
+        rtt = f"rtt p50 <={rtt_p50 * 1000:.0f}ms p90 <={rtt_p90 * 1000:.0f}ms" if rtt_p50 is not None else "rtt n/a"
+        return (
+            f"Probes: {totals['probes']} sent, {totals['replies']} answered, {totals['retransmits']} retransmitted, "
+            f"{totals['timeouts']} timed out, {in_flight} in flight, {rtt}"
+        )
+
+    def prometheus(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name in self.COUNTERS:
+            metric = f"nmap_clone_{name}_total"
+            lines += [f"# HELP {metric} {self.COUNTERS[name]}", f"# TYPE {metric} counter"]
+            lines += [f'{metric}{{technique="{technique}"}} {value}' for technique, value in snapshot[name].items()]
+        lines += ["# TYPE nmap_clone_in_flight_probes gauge", f"nmap_clone_in_flight_probes {snapshot['in_flight']}"]
+        lines += ["# TYPE nmap_clone_send_rate_pps gauge", f"nmap_clone_send_rate_pps {snapshot['send_rate']:.3f}"]
+        for name in ("rtt", "decision_latency"):
+            metric, histogram = f"nmap_clone_{name}_seconds", snapshot[name]
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram["buckets"] + ["+Inf"], histogram["counts"]):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines += [f"{metric}_sum {histogram['sum']:.6f}", f"{metric}_count {histogram['count']}"]
+        return "\n".join(lines) + "\n"
+
+
+Metrics = ScanMetrics()
+MetricsFile: str | None = None
+SummaryFile: str | None = None
+_stopped = threading.Event()
+_writer: threading.Thread | None = None
+
+
+def write_metrics_file():
+    """
+    Atomically rewrites the Prometheus metrics file, so a node exporter textfile collector never reads half a file.
+    """
+    temporary_path = f"{MetricsFile}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        file.write(Metrics.prometheus())
+    os.replace(temporary_path, MetricsFile)
+
+
+def status_line() -> str:
+    """
+    Returns the status line of the whole scanner: send rate, probes, replies, retransmits, timeouts and RTT.
+    """
+    return f"{rate_limiter.rate_status()}. {Metrics.status_line()}"
+
+
+def _write_periodically(interval: float, label: str):
+    while not _stopped.wait(interval):
+        log_msg(f"{label}{status_line()}")
+        if MetricsFile:
+            write_metrics_file()
+
+
+def start_status_reports(interval: float, label: str = ""):
+    """
+    Starts the writer thread logging the status line every interval seconds, whatever engine is scanning,
+    and rewriting the Prometheus text file if one is set.
+
+    Args:
+        interval (float): Seconds between two status lines.
+        label (str): Prefix of the status lines, e.g. the shard of a shard process.
+    """
+    global _writer
+    _writer = threading.Thread(target=_write_periodically, args=(interval, label), daemon=True)
+    _writer.start()
+
+
+def init_metrics(args: argparse.Namespace):
+    """
+    Sets the metrics outputs given by --metrics-file and --metrics-json. The status line is logged
+    and the Prometheus text file is rewritten every --metrics-interval seconds and at exit,
+    the JSON summary is written at exit.
+    """
+    global MetricsFile, SummaryFile
+    MetricsFile = args.metrics_file
+    SummaryFile = args.metrics_json
+    start_status_reports(args.metrics_interval)
+
+
+def close_metrics():
+    """
+    Stops the periodic writes, logs the final status line and writes the metrics files.
+    The periodic writer is joined first, as both write the same temporary file.
+    """
+    _stopped.set()
+    if _writer is not None:
+        _writer.join()
+    log_msg(status_line())
+    if MetricsFile:
+        write_metrics_file()
+    if SummaryFile:
+        with open(SummaryFile, "w", encoding="utf-8") as file:
+            json.dump(Metrics.snapshot(), file, indent=2)
@@ -7,12 +7,24 @@ Author: Mihai-Andrei Neacsu
 
 from init import init
 from logger import log_msg
-from utils import find_opened_ports
+from results import close_results
+from metrics import close_metrics
+from teardown import flush_teardowns
+from progress import close_progress
 
 
 def nmap_entrypoint():
     args = init()
-    find_opened_ports(args)
+    # The scan engines import scapy, loaded once the arguments are valid so --help and argument errors are instant
+    from utils import find_opened_ports
+
+    try:
+        find_opened_ports(args)
+    finally:
+        close_progress()
+        flush_teardowns()
+        close_results()
+        close_metrics()
 
 
 if __name__ == "__main__":
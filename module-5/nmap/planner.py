@@ -0,0 +1,270 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, NamedTuple
+from logger import log_msg
+from literals import JointScanResult
+from scapy.layers.inet import TCP
+from scapy_utils import send_tcp_package
+from teardown import Teardown, queue_teardown
+from scans import (
+    classify_half_open_response,
+    classify_tcp_ack_response,
+    classify_tcp_connect_response,
+    classify_tcp_fin_response,
+    classify_tcp_null_response,
+    classify_tcp_window_response,
+    classify_tcp_xmas_response,
+    half_open_scan,
+    tcp_ack_scan,
+    tcp_connect_scan,
+    tcp_fin_scan,
+    tcp_null_scan,
+    tcp_window_scan,
+    tcp_xmas_scan,
+)
+
+
+class PlanStep(NamedTuple):
+    """
+    One technique of the probe plan.
+
+    Attributes:
+        technique (str): Name of the scan technique.
+        scan (Callable[[str, int], str]): Scan function from scans.py.
+        decisions (dict[str, bool]): Results that settle the port state, mapped to "is open".
+        Any other result lets the plan continue with the next step.
+    """
+
+    technique: str
+    scan: Callable[[str, int], str]
+    decisions: dict[str, bool]
+
+
+# Ordered from the cheapest and most decisive technique to the most expensive or least decisive one
+PROBE_PLAN: list[PlanStep] = [
+    PlanStep("half_open", half_open_scan, {"Open": True, "Closed": False}),
+    PlanStep("ack", tcp_ack_scan, {"Filtered": False, "Filtered or No Response": False}),
+    PlanStep("window", tcp_window_scan, {"Open": True}),
+    PlanStep("null", tcp_null_scan, {"Closed": False}),
+    PlanStep("fin", tcp_fin_scan, {"Closed": False}),
+    PlanStep("xmas", tcp_xmas_scan, {"Closed": False}),
+    PlanStep("connect", tcp_connect_scan, {"Open": True, "Closed": False}),
+]
+
+
+def probe_port(dst_ip: str, dst_port: int, plan: list[PlanStep] = PROBE_PLAN) -> tuple[bool, str, str]:
+    """
+    Runs the probe plan on a port and stops at the first technique giving a definite answer.
+    With --joint, the joint probe replaces the probe plan.
+
+    Args:
+        dst_ip (str): The target IP address.
+        dst_port (int): The target port number.
+        plan (list[PlanStep]): Techniques to try in order.
+
+    Returns:
+        tuple: A tuple containing:
+            - bool: True if the port is open.
+            - str: The technique that decided the port state.
+            - str: The result of that technique.
+    """
+    if JointTechniques:
+        return joint_probe_port(dst_ip, dst_port)
+    technique, result = "", ""
+    for step in plan:
+        technique, result = step.technique, step.scan(dst_ip, dst_port)
+        if result in step.decisions:
+            log_msg(f"Host {dst_ip} Port {dst_port}: {result} decided by {technique} scan", "DEBUG")
+            return step.decisions[result], technique, result
+    log_msg(f"Host {dst_ip} Port {dst_port}: All scans exhausted, last result {result}", "DEBUG")
+    return False, technique, result
+
+
+class JointTechnique(NamedTuple):
+    """
+    One technique of a joint probe.
+
+    Attributes:
+        flags (str): TCP flags of the probe, techniques with the same flags share one probe.
+        classify (Callable): Classifier from scans.py turning a reply (or None) into a technique result.
+        evidence (dict[str, frozenset[str]]): Port states each technique result is consistent with.
+        Results missing from the table are consistent with every state.
+        no_reply (str): Result of the technique when no reply arrived.
+    """
+
+    flags: str
+    classify: Callable
+    evidence: dict[str, frozenset[str]]
+    no_reply: str
+
+
+OPEN, CLOSED, FILTERED = frozenset({"open"}), frozenset({"closed"}), frozenset({"filtered"})
+OPEN_OR_FILTERED = OPEN | FILTERED
+UNFILTERED = OPEN | CLOSED
+
+# Ordered from the most to the least reliable evidence, a contradicting less reliable technique is ignored.
+# A missing reply is weaker evidence than any reply, e.g. an unanswered SYN contradicted by an ACK reply was lost.
+# Hosts ignoring RFC 793 (Windows) reset FIN, NULL and XMAS probes of opened ports too, most hosts reset
+# ACK probes with a zero window whether the port is opened or not.
+JOINT_TECHNIQUES: dict[str, JointTechnique] = {
+    "half_open": JointTechnique(
+        "S",
+        classify_half_open_response,
+        {"Open": OPEN, "Closed": CLOSED, "Filtered or Dropped": FILTERED},
+        "Filtered or Dropped",
+    ),
+    "connect": JointTechnique(
+        "S",
+        classify_tcp_connect_response,
+        {"Open": OPEN, "Closed": CLOSED, "Filtered or Dropped": FILTERED},
+        "Filtered or Dropped",
+    ),
+    "ack": JointTechnique(
+        "A",
+        classify_tcp_ack_response,
+        {"Unfiltered": UNFILTERED, "Filtered": FILTERED, "Filtered or No Response": FILTERED},
+        "Filtered or No Response",
+    ),
+    "null": JointTechnique(
+        "", classify_tcp_null_response, {"Open or Filtered": OPEN_OR_FILTERED, "Closed": CLOSED}, "Open or Filtered"
+    ),
+    "fin": JointTechnique(
+        "F", classify_tcp_fin_response, {"Open or Filtered": OPEN_OR_FILTERED, "Closed": CLOSED}, "Open or Filtered"
+    ),
+    "xmas": JointTechnique(
+        "FPU", classify_tcp_xmas_response, {"Open or Filtered": OPEN_OR_FILTERED, "Closed": CLOSED}, "Open or Filtered"
+    ),
+    "window": JointTechnique(
+        "A", classify_tcp_window_response, {"Open": OPEN, "Closed": UNFILTERED}, "Filtered or No Response"
+    ),
+}
+
+# Joint port state of every set of states the replies are consistent with, as nmap reports them
+DECISION_TABLE: dict[frozenset[str], JointScanResult] = {
+    OPEN: "Open",
+    CLOSED: "Closed",
+    FILTERED: "Filtered",
+    UNFILTERED: "Unfiltered",
+    OPEN_OR_FILTERED: "Open or Filtered",
+    CLOSED | FILTERED: "Closed or Filtered",
+    OPEN | CLOSED | FILTERED: "Unknown",
+}
+
+# A SYN tells opened from closed ports, the ACK tells filtered ports from lost SYNs
+DEFAULT_JOINT_TECHNIQUES = ["half_open", "ack"]
+
+JointTechniques: list[str] = []
+_executor: ThreadPoolExecutor | None = None
+
+
+def start_joint_probes(techniques: list[str], max_parallelism: int):
+    """
+    Starts the thread pool sending the probes of max_parallelism ports at once, one thread per probe.
+    """
+    global _executor
+    probes = len({JOINT_TECHNIQUES[technique].flags for technique in techniques})
+    _executor = ThreadPoolExecutor(max_workers=max_parallelism * probes, thread_name_prefix="joint-probe")
+    log_msg(f"Joint probing with {', '.join(techniques)} ({probes} probes per port)", "DEBUG")
+
+
+def init_planner(args: argparse.Namespace):
+    """
+    Enables the joint probing given by the --joint argument, an empty list selects DEFAULT_JOINT_TECHNIQUES.
+    """
+    global JointTechniques
+    if args.joint is None:
+        return
+    JointTechniques = args.joint or DEFAULT_JOINT_TECHNIQUES
+    start_joint_probes(JointTechniques, args.max_parallelism)
+
+
+def classify_jointly(results: dict[str, str], pending: Iterable[str] = ()) -> JointScanResult | None:
+    """
+    Combines the results of several techniques for one port through the decision table.
+    The answered results are combined first, then the results of unanswered probes,
+    each from the most to the least reliable technique.
+
+    Args:
+        results (dict[str, str]): Result per technique, e.g. {"half_open": "Filtered or Dropped", "fin": "Closed"}.
+        pending (Iterable[str]): Techniques whose replies are still awaited.
+
+    Returns:
+        JointScanResult: The port state all results are consistent with, None if a pending technique
+        could still change it. A single state settled by the replies of more reliable techniques
+        can not change anymore.
+    """
+    pending = set(pending)
+    states = OPEN | CLOSED | FILTERED
+    answered = [
+        technique
+        for technique in JOINT_TECHNIQUES
+        if technique in pending or (technique in results and results[technique] != JOINT_TECHNIQUES[technique].no_reply)
+    ]
+    unanswered = [technique for technique in JOINT_TECHNIQUES if technique in results and technique not in answered]
+    for technique in answered + unanswered:
+        if technique in pending:
+            return DECISION_TABLE[states] if len(states) == 1 else None
+        evidence = JOINT_TECHNIQUES[technique].evidence.get(results[technique], states)
+        if states & evidence:
+            states &= evidence
+        else:
+            log_msg(f"Ignored {technique} result {results[technique]}, it contradicts the more reliable ones", "DEBUG")
+    return DECISION_TABLE[states]
+
+
+def joint_probe_port(dst_ip: str, dst_port: int, techniques: list[str] | None = None) -> tuple[bool, str, str]:
+    """
+    Sends the probes of all given techniques to a port at once and classifies the port from all replies.
+    Techniques sharing TCP flags share one probe, e.g. ack and window classify the same RST.
+    The port is decided as soon as the replies so far settle its state, e.g. by a SYN+ACK,
+    so a port takes about one RTT whatever the number of techniques.
+
+    Args:
+        dst_ip (str): The target IP address.
+        dst_port (int): The target port number.
+        techniques (list[str], optional): JOINT_TECHNIQUES keys. Defaults to the --joint techniques.
+
+    Returns:
+        tuple: A tuple containing:
+            - bool: True if the port is open.
+            - str: "joint".
+            - str: The joint port state.
+    """
+    techniques = techniques or JointTechniques or DEFAULT_JOINT_TECHNIQUES
+    probes: dict[str, list[str]] = {}
+    for technique in techniques:
+        probes.setdefault(JOINT_TECHNIQUES[technique].flags, []).append(technique)
+
+    def send_probe(flags: str):
+        # Labelled after the first technique of the probe in the scan metrics
+        response, src_port = send_tcp_package(dst_ip, dst_port, flags=flags, technique=probes[flags][0])
+        if response is not None and response.haslayer(TCP) and response.getlayer(TCP).flags == 0x12:
+            # A SYN+ACK opened the connection, closed in the background as by half_open_scan
+            tcp_layer = response.getlayer(TCP)
+            queue_teardown(Teardown(dst_ip, dst_port, tcp_layer.dport, tcp_layer.ack, tcp_layer.seq + 1))
+        return flags, response
+
+    results: dict[str, str] = {}
+    pending = set(techniques)
+    if _executor is None:
+        replies = map(send_probe, probes)
+    else:
+        futures = [_executor.submit(send_probe, flags) for flags in probes]
+        replies = (future.result() for future in as_completed(futures))
+    state = None
+    for flags, response in replies:
+        for technique in probes[flags]:
+            results[technique] = JOINT_TECHNIQUES[technique].classify(dst_ip, dst_port, response)
+            pending.discard(technique)
+        state = classify_jointly(results, pending)
+        if state is not None:
+            break
+    log_msg(f"Host {dst_ip} Port {dst_port}: {state} from {results}", "DEBUG")
+    return state == "Open", "joint", state
@@ -0,0 +1,179 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+from itertools import islice
+import os
+import re
+from typing import Iterable, Iterator
+import enums
+
+
+MAX_PORT = enums.RangeEnum.MAX_PORT.value
+FREQUENCY_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "port-frequencies.txt")
+
+# 22, 22-2222, -22 (from 0), 22- (to MAX_PORT) or - (all ports)
+PORT_RANGE_REGEX = re.compile(r"^(\d{1,5})?(-)?(\d{1,5})?$")
+
+
+def load_port_frequencies(path: str = FREQUENCY_TABLE) -> list[int]:
+    """
+    Loads the port frequency table.
+
+    Args:
+        path (str): Path of the table, one "<port> <frequency>" pair per line. Lines starting with # are ignored.
+
+    Returns:
+        list[int]: The ports of the table, most frequently open first.
+    """
+    frequencies = []
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.split("#", 1)[0].split()
+            if line:
+                frequencies.append((float(line[1]), int(line[0])))
+    return [port for _, port in sorted(frequencies, key=lambda entry: -entry[0])]
+
+
+PortsByFrequency: list[int] = load_port_frequencies()
+_frequent_ports = frozenset(PortsByFrequency)
+
+
+class PortSet:
+    """
+    Set of ports backed by a 65,536 bit bitmap (8 KiB), whatever the number of ports.
+
+    Membership checks are O(1) and iteration is lazy. Ports are iterated in probability order:
+    first the ports of the frequency table, most frequently open first, then the remaining ports ascending,
+    so the likely-open ports are found in the first seconds of a scan.
+
+    Usage example:
+        ports = PortSet.parse("1-1024,8080")
+        ports.difference_update(PortSet.parse("25"))
+        80 in ports  # True
+        list(ports)[:3]  # [80, 23, 443]
+    """
+
+    def __init__(self, ports: Iterable[int] = ()):
+        self.bitmap = bytearray((MAX_PORT + 1) // 8)
+        self.count = 0
+        for port in ports:
+            self.add(port)
+
+    @classmethod
+    def from_bitmap(cls, bitmap: bytes) -> "PortSet":
+        """
+        Creates a port set from a bitmap with the same layout, e.g. a checkpoint bitmap.
+        """
+        ports = cls()
+        ports.bitmap[:] = bitmap
+        ports.count = sum(bin(byte).count("1") for byte in bitmap)
+        return ports
+
+    @classmethod
+    def parse(cls, spec: str) -> "PortSet":
+        """
+        Parses a port specification.
+
+        Accepted formats, separated by commas:
+            - One port. Ex.: 22
+            - A range of ports. Ex.: 22-2222
+            - An open range from port 0 or to MAX_PORT. Ex.: -1024, 1024-
+            - A hyphen for all ports (-)
+
+        Args:
+            spec (str): Port specification like 22,80,1000-2000.
+
+        Raises:
+            ValueError: If the specification is not valid.
+
+        Returns:
+            PortSet: The specified ports.
+        """
+        ports = cls()
+        for part in spec.split(","):
+            match = PORT_RANGE_REGEX.match(part.strip())
+            if not part.strip() or not match:
+                raise ValueError(f"Invalid port range format: {part}")
+            start, hyphen, end = match.groups()
+            if not hyphen:
+                end = start
+            start = int(start) if start else enums.RangeEnum.MIN_PORT.value
+            end = int(end) if end else MAX_PORT
+            if end > MAX_PORT:
+                raise ValueError(f"Invalid port range: {end}. Max allowed is {MAX_PORT}.")
+            if start > end:
+                raise ValueError(f"Invalid port range: Start port {start} can not be greater then end port {end}")
+            ports.add_range(start, end)
+        return ports
+
+    def add(self, port: int):
+        """
+        Adds a port to the set.
+        """
+        if not 0 <= port <= MAX_PORT:
+            raise ValueError(f"Invalid port: {port}. Max allowed is {MAX_PORT}.")
+        if port not in self:
+            self.bitmap[port >> 3] |= 1 << (port & 7)
+            self.count += 1
+
+    def discard(self, port: int):
+        """
+        Removes a port from the set if it is present.
+        """
+        if port in self:
+            self.bitmap[port >> 3] &= ~(1 << (port & 7)) & 0xFF
+            self.count -= 1
+
+    def add_range(self, start: int, end: int):
+        """
+        Adds all ports from start to end, both included.
+        """
+        for port in range(start, end + 1):
+            self.add(port)
+
+    def difference_update(self, other: "PortSet"):
+        """
+        Removes all ports of the other set.
+        """
+        for index, byte in enumerate(other.bitmap):
+            if byte and self.bitmap[index] & byte:
+                self.count -= bin(self.bitmap[index] & byte).count("1")
+                self.bitmap[index] &= ~byte & 0xFF
+
+    def intersection_size(self, other: "PortSet") -> int:
+        """
+        Returns the number of ports in both sets.
+        """
+        return sum((a & b).bit_count() for a, b in zip(self.bitmap, other.bitmap) if a and b)
+
+    def top(self, count: int) -> "PortSet":
+        """
+        Returns the count most frequently open ports of this set.
+        Only the ports of the frequency table are ranked, so fewer ports are returned for a larger count.
+        """
+        return PortSet(islice((port for port in PortsByFrequency if port in self), count))
+
+    def __contains__(self, port: int) -> bool:
+        return 0 <= port <= MAX_PORT and bool(self.bitmap[port >> 3] & (1 << (port & 7)))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[int]:
+        for port in PortsByFrequency:
+            if port in self:
+                yield port
+        for index, byte in enumerate(self.bitmap):
+            if not byte:
+                continue
+            for bit in range(8):
+                port = (index << 3) | bit
+                if byte & (1 << bit) and port not in _frequent_ports:
+                    yield port
+
+    def __repr__(self) -> str:
+        return f"PortSet({len(self)} ports)"
@@ -0,0 +1,205 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+from collections import deque
+import datetime
+import json
+import sys
+import threading
+import time
+from typing import TextIO
+from metrics import Metrics
+
+PROGRESS_MODES = ("auto", "tty", "json", "off")
+# Seconds of recent progress the current rate is measured over
+RATE_WINDOW = 10.0
+BAR_WIDTH = 30
+
+
+class ProgressReporter:
+    """
+    Reports the progress of the port scan every interval seconds: ports completed and remaining,
+    probes sent, current rate, ETA and opened ports found so far.
+
+    In tty mode one status line is redrawn in place, in json mode one JSON object is written per report,
+    for job runners following the scan. Either way nothing is written per port.
+
+    Usage example:
+        progress = ProgressReporter(total=65536, mode="json")
+        progress.start()
+        progress.advance(opened=True)
+        progress.close()
+        # {"completed": 1, "total": 65536, "remaining": 65535, "percent": 0.0, "rate": 1.0, "eta": 65535.0, ...}
+    """
+
+    def __init__(
+        self, total: int, completed: int = 0, interval: float = 1.0, mode: str = "tty", stream: TextIO = sys.stderr
+    ):
+        """
+        Args:
+            total (int): Ports to scan.
+            completed (int): Ports already scanned, e.g. by the resumed scan.
+            interval (float): Seconds between two reports.
+            mode (str): tty to redraw one status line, json to write one JSON object per report.
+            stream (TextIO): Stream the reports are written to.
+        """
+        self.total = total
+        self.completed = completed
+        self.opened = 0
+        self.interval = interval
+        self.mode = mode
+        self.stream = stream
+        self.started_at = time.monotonic()
+        self._samples: deque[tuple[float, int]] = deque([(self.started_at, completed)])
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._report_periodically, daemon=True)
+
+    def start(self):
+        """
+        Starts the periodic reports.
+        """
+        self._thread.start()
+
+    def advance(self, completed: int = 1, opened: int = 0):
+        """
+        Counts scanned ports and the opened ones among them.
+        """
+        with self._lock:
+            self.completed += completed
+            self.opened += opened
+
+    def snapshot(self) -> dict:
+        """
+        Returns the progress as a JSON serializable dict. The rate is measured over the last RATE_WINDOW seconds,
+        so the ETA follows rate changes, e.g. the congestion backoff, instead of the average since the start.
+        """
+        now = time.monotonic()
+        with self._lock:
+            completed, opened = self.completed, self.opened
+            self._samples.append((now, completed))
+            while len(self._samples) > 2 and now - self._samples[1][0] >= RATE_WINDOW:
+                self._samples.popleft()
+            since, completed_since = self._samples[0]
+        rate = (completed - completed_since) / (now - since) if now > since else 0.0
+        remaining = max(self.total - completed, 0)
+        return {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "completed": completed,
+            "total": self.total,
+            "remaining": remaining,
+            "percent": round(100 * completed / self.total, 1) if self.total else 100.0,
+            "rate": round(rate, 1),
+            "eta": round(remaining / rate, 1) if rate > 0 else None,
+            "elapsed": round(now - self.started_at, 1),
+            "opened": opened,
+            "probes": sum(Metrics.snapshot()["probes"].values()),
+        }
+
+    @staticmethod
+    def format_status(snapshot: dict) -> str:
+        """
+        Returns the progress as a one line status with a progress bar.
+        """
+        done = int(BAR_WIDTH * snapshot["percent"] / 100)
+        bar = "=" * done + (">" if done < BAR_WIDTH else "") + " " * (BAR_WIDTH - done - 1)
+        eta = str(datetime.timedelta(seconds=int(snapshot["eta"]))) if snapshot["eta"] is not None else "n/a"
+        return (
+            f"[{bar}] {snapshot['percent']:5.1f}% {snapshot['completed']}/{snapshot['total']} ports, "
+            f"{snapshot['remaining']} remaining, {snapshot['rate']:.1f} ports/s, ETA {eta}, "
+            f"{snapshot['opened']} open, {snapshot['probes']} probes"
+        )
+
+    def report(self):
+        """
+        Writes one progress report.
+        """
+        snapshot = self.snapshot()
+        if self.mode == "json":
+            self.stream.write(json.dumps(snapshot) + "\n")
+        else:
+            # Carriage return and erase line redraw the status line in place
+            self.stream.write(f"\r{self.format_status(snapshot)}\x1b[K")
+        self.stream.flush()
+
+    def close(self):
+        """
+        Stops the periodic reports and writes the final one.
+        """
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.report()
+        if self.mode == "tty":
+            self.stream.write("\n")
+            self.stream.flush()
+
+    def _report_periodically(self):
+        while not self._stopped.wait(self.interval):
+            self.report()
+
+
+Progress: ProgressReporter | None = None
+Mode = "off"
+Interval = 1.0
+
+
+def init_progress(args: argparse.Namespace):
+    """
+    Sets the progress mode given by --progress, auto reports on a terminal only.
+    The reporter is started once the number of ports to scan is known.
+    """
+    global Mode, Interval
+    Mode = args.progress
+    if Mode == "auto":
+        Mode = "tty" if sys.stderr.isatty() else "off"
+    Interval = args.progress_interval
+
+
+def start_progress(total: int, completed: int = 0) -> ProgressReporter | None:
+    """
+    Starts reporting the progress of a port scan, if enabled.
+
+    Args:
+        total (int): Ports to scan.
+        completed (int): Ports already scanned, e.g. by the resumed scan.
+
+    Returns:
+        ProgressReporter | None: The started reporter, None if progress reports are off.
+    """
+    global Progress
+    if Mode == "off":
+        return None
+    Progress = ProgressReporter(total, completed, Interval, Mode)
+    Progress.start()
+    return Progress
+
+
+def get_progress() -> ProgressReporter | None:
+    """
+    Returns the started progress reporter, None if progress reports are off or no scan is running.
+    """
+    return Progress
+
+
+def advance_progress(completed: int = 1, opened: int = 0):
+    """
+    Counts scanned ports on the started reporter, if any.
+    """
+    if Progress is not None:
+        Progress.advance(completed, opened)
+
+
+def close_progress():
+    """
+    Writes the final progress report and stops the reporter.
+    """
+    global Progress
+    if Progress is not None:
+        Progress.close()
+        Progress = None
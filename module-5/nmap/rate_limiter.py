@@ -0,0 +1,145 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+import threading
+import time
+from logger import log_msg
+
+
+class RateLimiter:
+    """
+    Token bucket pacing the probes sent per second, with congestion-aware backoff.
+
+    Probe outcomes are counted in windows of window_size probes. When the share of unanswered
+    probes in a window rises noticeably above the share of the previous window, the rate is
+    halved (never below min_rate). When it stays the same or drops, the rate grows by 10%
+    (never above max_rate).
+
+    Usage example:
+        limiter = RateLimiter(min_rate=100, max_rate=1000)
+        limiter.acquire()           # blocks until a token is available
+        limiter.record(answered=True)
+    """
+
+    WINDOW_SIZE = 50
+    LOSS_TOLERANCE = 0.1
+    DECREASE_FACTOR = 0.5
+    INCREASE_FACTOR = 1.1
+
+    def __init__(self, min_rate: float | None = None, max_rate: float | None = None):
+        """
+        Args:
+            min_rate (float, optional): Lowest packets per second the backoff may go down to.
+            max_rate (float, optional): Highest packets per second, unlimited if not given.
+        """
+        self.min_rate = min_rate or 1.0
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self._tokens = 1.0
+        self._refilled_at = time.monotonic()
+        self._started_at = time.monotonic()
+        self._sent = 0
+        self._window_sent = 0
+        self._window_unanswered = 0
+        self._previous_loss: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """
+        True as soon as the sender is paced, either by --max-rate or by a backoff.
+        """
+        return self.rate is not None
+
+    def acquire(self):
+        """
+        Blocks until the bucket holds a token for the next probe and takes it.
+        """
+        while True:
+            with self._lock:
+                if not self.enabled:
+                    self._sent += 1
+                    return
+                now = time.monotonic()
+                self._tokens = min(max(self.rate / 10, 1.0), self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self._sent += 1
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def record(self, answered: bool):
+        """
+        Records the outcome of a probe and adapts the rate at the end of each window.
+        """
+        with self._lock:
+            self._window_sent += 1
+            self._window_unanswered += not answered
+            if self._window_sent < self.WINDOW_SIZE:
+                return
+            loss = self._window_unanswered / self._window_sent
+            self._window_sent = self._window_unanswered = 0
+            previous_loss, self._previous_loss = self._previous_loss, loss
+            if previous_loss is None:
+                return
+            if loss > previous_loss + self.LOSS_TOLERANCE:
+                rate = self.rate if self.enabled else self.achieved_rate()
+                self.rate = max(self.min_rate, rate * self.DECREASE_FACTOR)
+                log_msg(f"Unanswered probes rose to {loss:.0%}, slowing down to {self.rate:.0f} pps", "DEBUG")
+            elif self.enabled and loss <= previous_loss:
+                self.rate *= self.INCREASE_FACTOR
+                if self.max_rate:
+                    self.rate = min(self.rate, self.max_rate)
+
+    def achieved_rate(self) -> float:
+        """
+        Returns the average packets per second sent since the limiter was created.
+        """
+        return self._sent / max(time.monotonic() - self._started_at, 1e-6)
+
+    def status(self) -> str:
+        """
+        Returns a one line summary of the current and achieved rate.
+        """
+        current = f"{self.rate:.0f} pps" if self.enabled else "unlimited"
+        return f"Rate: {current} current, {self.achieved_rate():.0f} pps achieved"
+
+
+Limiter = RateLimiter()
+
+
+def init_rate_limiter(args: argparse.Namespace):
+    """
+    Creates the rate limiter from the --min-rate and --max-rate arguments.
+    """
+    global Limiter
+    Limiter = RateLimiter(min_rate=args.min_rate, max_rate=args.max_rate)
+    log_msg(f"Rate limits: min {args.min_rate} pps, max {args.max_rate} pps", "DEBUG")
+
+
+def acquire():
+    """
+    Blocks until the rate limiter allows the next probe.
+    """
+    Limiter.acquire()
+
+
+def record_probe(answered: bool):
+    """
+    Reports whether a probe got an answer to the rate limiter.
+    """
+    Limiter.record(answered)
+
+
+def rate_status() -> str:
+    """
+    Returns the rate limiter status line.
+    """
+    return Limiter.status()
@@ -0,0 +1,360 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import ctypes
+import random
+import socket
+import struct
+import threading
+import time
+from logger import log_msg
+
+
+ETH_P_IP = 0x0800
+SO_ATTACH_FILTER = 26
+PACKET_OUTGOING = 4
+IPPROTO_ICMP = 1
+IPPROTO_TCP = 6
+
+TCP_FLAGS = {"F": 0x01, "S": 0x02, "R": 0x04, "P": 0x08, "A": 0x10, "U": 0x20, "E": 0x40, "C": 0x80}
+
+# Options of SYN probes, same as scapy_utils.SYN_OPTIONS: MSS 1460, SACK permitted, Timestamp, NOP, Window Scale 10.
+# Replies only carry the options they were offered, so SYN probes offer all of them for OS fingerprinting.
+SYN_OPTIONS = bytes.fromhex("020405b4" "0402" "080a0000000100000000" "01" "03030a")
+
+# Source ports of the probes, a random block of SRC_PORT_COUNT ports so the BPF filter can drop the traffic
+# of all other connections in the kernel
+SRC_PORT_COUNT = 4096
+
+
+def bpf_probe_replies(first_port: int, last_port: int) -> list[tuple[int, int, int, int]]:
+    """
+    Returns the classic BPF program for an AF_PACKET SOCK_DGRAM socket, where offsets start at the IP header,
+    accepting only replies to the probes: TCP segments to the source ports and ICMP errors quoting a TCP probe
+    from the source ports. All other packets never reach user space.
+
+        ldb [9]; ldxb 4*([0]&0xf)
+        jeq #6, tcp, icmp
+        tcp:  ldh [x+2]; ja ports                  TCP destination port
+        icmp: jeq #1, quoted, drop
+        quoted: ldb [x+17]; jeq #6, sport, drop    protocol of the quoted probe (without IP options)
+        sport: ldh [x+28]                          source port of the quoted probe
+        ports: jge #first_port, high, drop
+        high: jgt #last_port, drop, accept
+        accept: ret #65535
+        drop: ret #0
+
+    Args:
+        first_port (int): First source port of the probes.
+        last_port (int): Last source port of the probes, included.
+
+    Returns:
+        list[tuple[int, int, int, int]]: The (code, jt, jf, k) instructions.
+    """
+    return [
+        (0x30, 0, 0, 9),
+        (0xB1, 0, 0, 0),
+        (0x15, 0, 2, IPPROTO_TCP),
+        (0x48, 0, 0, 2),
+        (0x05, 0, 0, 4),
+        (0x15, 0, 6, IPPROTO_ICMP),
+        (0x50, 0, 0, 17),
+        (0x15, 0, 4, IPPROTO_TCP),
+        (0x48, 0, 0, 28),
+        (0x35, 0, 2, first_port),
+        (0x25, 1, 0, last_port),
+        (0x06, 0, 0, 0xFFFF),
+        (0x06, 0, 0, 0),
+    ]
+
+
+def parse_tcp_flags(flags: str) -> int:
+    """
+    Converts scapy style TCP flags like "SA" or "FPU" to their bit value.
+    """
+    value = 0
+    for flag in flags:
+        value |= TCP_FLAGS[flag]
+    return value
+
+
+def checksum_add(total: int, data: bytes) -> int:
+    """
+    Adds the 16 bit words of data to a one's complement sum, without folding.
+    """
+    if len(data) % 2:
+        data += b"\0"
+    return total + sum(struct.unpack(f"!{len(data) // 2}H", data))
+
+
+def checksum_fold(total: int) -> int:
+    """
+    Folds a one's complement sum into the final 16 bit internet checksum.
+    """
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+class TcpProbeTemplate:
+    """
+    Precomputed IPv4/TCP header bytes for probes from one source to one destination address.
+
+    Only source port, destination port, sequence number, flags and checksum change between probes.
+    The checksum of the constant parts (pseudo header, window, ...) is summed once, so each probe
+    only adds its variable words instead of checksumming the whole segment.
+    """
+
+    def __init__(self, src_ip: str, dst_ip: str, window: int = 1024, ttl: int = 64, options: bytes = b""):
+        src, dst = socket.inet_aton(src_ip), socket.inet_aton(dst_ip)
+        # Total length, identification and IP checksum are filled in by the kernel (IP_HDRINCL)
+        ip_header = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 0, 0, 0x4000, ttl, IPPROTO_TCP, 0, src, dst)
+        self.offset = (5 + len(options) // 4) << 4
+        tcp_header = struct.pack("!HHIIBBHHH", 0, 0, 0, 0, self.offset, 0, window, 0, 0) + options
+        self.packet = bytearray(ip_header + tcp_header)
+        pseudo_header = struct.pack("!4s4sBBH", src, dst, 0, IPPROTO_TCP, len(tcp_header))
+        self.base_sum = checksum_add(checksum_add(0, pseudo_header), tcp_header)
+
+    def build(self, src_port: int, dst_port: int, seq: int, flags: int, ack: int = 0) -> bytes:
+        """
+        Patches the variable fields into the template and returns the probe bytes.
+        """
+        total = self.base_sum + src_port + dst_port + (seq >> 16) + (seq & 0xFFFF)
+        total += (ack >> 16) + (ack & 0xFFFF) + flags
+        struct.pack_into("!HHII", self.packet, 20, src_port, dst_port, seq, ack)
+        struct.pack_into("!BB", self.packet, 32, self.offset, flags)
+        struct.pack_into("!H", self.packet, 36, checksum_fold(total))
+        return bytes(self.packet)
+
+
+class RawLayer:
+    """
+    Parsed header fields of one layer, accessed like the fields of a scapy layer.
+    """
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.__dict__})"
+
+
+class RawReply:
+    """
+    A received packet parsed into only the fields scans.py needs.
+
+    Mimics the parts of the scapy packet API the scans use: haslayer(), getlayer(), indexing by layer
+    and attribute lookup falling through the layers. Layers are given by scapy class or by name.
+    """
+
+    def __init__(self, time_received: float, layers: dict[str, RawLayer]):
+        self.time = time_received
+        self.sent_time: float | None = None
+        self.layers = layers
+
+    @staticmethod
+    def _name(layer) -> str:
+        return layer if isinstance(layer, str) else layer.__name__
+
+    def haslayer(self, layer) -> bool:
+        return self._name(layer) in self.layers
+
+    def getlayer(self, layer) -> RawLayer | None:
+        return self.layers.get(self._name(layer))
+
+    def __getitem__(self, layer) -> RawLayer:
+        return self.layers[self._name(layer)]
+
+    def __getattr__(self, name: str):
+        for layer in self.__dict__.get("layers", {}).values():
+            if name in layer.__dict__:
+                return layer.__dict__[name]
+        raise AttributeError(name)
+
+    def __repr__(self) -> str:
+        return f"RawReply({list(self.layers.values())})"
+
+
+def parse_ip_packet(data: bytes, time_received: float) -> RawReply | None:
+    """
+    Parses IP, TCP and ICMP fields of a received IPv4 packet, None if it is truncated.
+    """
+    if len(data) < 20:
+        return None
+    ihl = (data[0] & 0x0F) * 4
+    flags_fragment, ttl, proto = struct.unpack_from("!HBB", data, 6)
+    src, dst = socket.inet_ntoa(data[12:16]), socket.inet_ntoa(data[16:20])
+    layers = {"IP": RawLayer(src=src, dst=dst, ttl=ttl, proto=proto, flags=flags_fragment >> 13)}
+
+    if proto == IPPROTO_TCP and len(data) >= ihl + 20:
+        sport, dport, seq, ack, offset, flags, window = struct.unpack_from("!HHIIBBH", data, ihl)
+        options = data[ihl + 20 : ihl + (offset >> 4) * 4]
+        layers["TCP"] = RawLayer(
+            sport=sport, dport=dport, seq=seq, ack=ack, flags=flags, window=window, options=options
+        )
+    elif proto == IPPROTO_ICMP and len(data) >= ihl + 8:
+        icmp_type, code = struct.unpack_from("!BB", data, ihl)
+        layers["ICMP"] = RawLayer(type=icmp_type, code=code)
+        quoted = data[ihl + 8 :]
+        if len(quoted) >= 28 and quoted[9] == IPPROTO_TCP:
+            quoted_ihl = (quoted[0] & 0x0F) * 4
+            layers["IPerror"] = RawLayer(dst=socket.inet_ntoa(quoted[16:20]))
+            sport, dport, seq = struct.unpack_from("!HHI", quoted, quoted_ihl)
+            layers["TCPerror"] = RawLayer(sport=sport, dport=dport, seq=seq)
+    return RawReply(time_received, layers)
+
+
+class RawSocketBackend:
+    """
+    Sends TCP probes built from byte templates on a raw socket and receives replies through
+    an AF_PACKET socket with a BPF filter, without building scapy packet objects.
+
+    A single receiver thread parses the replies and hands them to the probe waiting for the
+    matching (address, source port, destination port). The probes use the source ports of one random block,
+    so the kernel drops all unrelated traffic before it is copied to user space.
+
+    Usage example:
+        backend = RawSocketBackend()
+        reply = backend.send_tcp_probe("192.168.1.1", 80, "S", src_port=40000, timeout=1.0)
+        if reply and reply.haslayer("TCP"):
+            print(reply.getlayer("TCP").flags)
+    """
+
+    def __init__(self, transport=None):
+        """
+        Args:
+            transport (scapy_utils.PacketTransport, optional): Exchanges the probes instead of the sockets.
+        """
+        self.transport = transport
+        self._templates: dict[tuple[str, bytes], TcpProbeTemplate] = {}
+        self._waiters: dict[tuple[str, int, int], list] = {}
+        self._lock = threading.Lock()
+        self.first_port = random.randint(1024, 65536 - SRC_PORT_COUNT)
+        self.last_port = self.first_port + SRC_PORT_COUNT - 1
+        if transport is not None:
+            return
+        self._send_socket = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_RAW)
+        self._receive_socket = socket.socket(socket.AF_PACKET, socket.SOCK_DGRAM, socket.htons(ETH_P_IP))
+        self._attach_filter(self._receive_socket, bpf_probe_replies(self.first_port, self.last_port))
+        threading.Thread(target=self._receive, daemon=True).start()
+
+    @staticmethod
+    def _attach_filter(sock: socket.socket, program: list[tuple[int, int, int, int]]):
+        """
+        Attaches a classic BPF program to a socket (struct sock_fprog).
+        """
+        instructions = b"".join(struct.pack("HBBI", *instruction) for instruction in program)
+        # The buffer must outlive the setsockopt call, the kernel copies it
+        buffer = ctypes.create_string_buffer(instructions)
+        fprog = struct.pack("HL", len(program), ctypes.addressof(buffer))
+        sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+
+    def random_src_port(self) -> int:
+        """
+        Returns a random source port of the block the BPF filter accepts replies for.
+        """
+        return random.randint(self.first_port, self.last_port)
+
+    def _template(self, dst_ip: str, options: bytes = b"") -> TcpProbeTemplate:
+        """
+        Returns the probe template of a destination and TCP options, creating it on first use.
+        """
+        with self._lock:
+            if (dst_ip, options) not in self._templates:
+                if self.transport is not None:
+                    src_ip = self.transport.src_ip
+                else:
+                    # Connecting a UDP socket sends nothing but reveals the source address of the route
+                    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+                        probe.connect((dst_ip, 9))
+                        src_ip = probe.getsockname()[0]
+                self._templates[dst_ip, options] = TcpProbeTemplate(src_ip, dst_ip, options=options)
+            return self._templates[dst_ip, options]
+
+    def _build(self, dst_ip: str, dst_port: int, flags: str, src_port: int, seq: int, ack: int) -> bytes:
+        """
+        Builds a TCP segment from the template of its destination. SYN probes carry the SYN_OPTIONS.
+        """
+        template = self._template(dst_ip, SYN_OPTIONS if flags == "S" else b"")
+        with self._lock:
+            return template.build(src_port, dst_port, seq, parse_tcp_flags(flags), ack)
+
+    def send_tcp_segment(self, dst_ip: str, dst_port: int, flags: str, src_port: int, seq: int = 0, ack: int = 0):
+        """
+        Sends a TCP segment without waiting for a reply.
+        """
+        dst_ip = socket.gethostbyname(dst_ip)
+        packet = self._build(dst_ip, dst_port, flags, src_port, seq, ack)
+        if self.transport is not None:
+            self.transport.send(packet)
+        else:
+            self._send_socket.sendto(packet, (dst_ip, 0))
+
+    def send_tcp_probe(self, dst_ip: str, dst_port: int, flags: str, src_port: int, timeout: float) -> RawReply | None:
+        """
+        Sends a TCP probe and waits for the matching TCP reply or ICMP error.
+
+        Returns:
+            RawReply | None: The reply, or `None` if none arrived before the timeout.
+        """
+        dst_ip = socket.gethostbyname(dst_ip)
+        if self.transport is not None:
+            packet = self._build(dst_ip, dst_port, flags, src_port, random.getrandbits(32), 0)
+            reply = self.transport.exchange(packet, timeout)
+            return parse_ip_packet(reply, time.time()) if reply else None
+
+        key = (dst_ip, dst_port, src_port)
+        waiter = [threading.Event(), None]
+        with self._lock:
+            self._waiters[key] = waiter
+        try:
+            sent_time = time.time()
+            self.send_tcp_segment(dst_ip, dst_port, flags, src_port, seq=random.getrandbits(32))
+            waiter[0].wait(timeout)
+            if waiter[1] is not None:
+                waiter[1].sent_time = sent_time
+            return waiter[1]
+        finally:
+            with self._lock:
+                self._waiters.pop(key, None)
+
+    def _receive(self):
+        """
+        Receiver loop, parses every filtered packet and wakes up the matching probe.
+        """
+        while True:
+            data, address = self._receive_socket.recvfrom(65535)
+            if address[2] == PACKET_OUTGOING:
+                continue
+            reply = parse_ip_packet(data, time.time())
+            if reply is None:
+                continue
+            if reply.haslayer("TCP"):
+                key = (reply["IP"].src, reply["TCP"].sport, reply["TCP"].dport)
+            elif reply.haslayer("TCPerror"):
+                key = (reply["IPerror"].dst, reply["TCPerror"].dport, reply["TCPerror"].sport)
+            else:
+                continue
+            with self._lock:
+                waiter = self._waiters.get(key)
+                if waiter and waiter[1] is None:
+                    waiter[1] = reply
+                    waiter[0].set()
+
+
+Backend: RawSocketBackend | None = None
+
+
+def get_backend() -> RawSocketBackend:
+    """
+    Returns the raw socket backend, opening its sockets on first use.
+    """
+    global Backend
+    if Backend is None:
+        Backend = RawSocketBackend()
+        log_msg("Using raw socket packet backend", "DEBUG")
+    return Backend
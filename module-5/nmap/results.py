@@ -0,0 +1,170 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+import csv
+from dataclasses import asdict, dataclass, fields
+import datetime
+import json
+import threading
+from typing import TextIO
+from html import escape
+from logger import log_msg
+
+
+def quoteattr(value: str) -> str:
+    """
+    Returns the value escaped and quoted as an XML attribute value.
+    Same as xml.sax.saxutils.quoteattr, which imports urllib and http.client at startup.
+    """
+    return f'"{escape(value, quote=True)}"'
+
+
+@dataclass(slots=True)
+class ScanResult:
+    """
+    Result of one scanned port.
+
+    Attributes:
+        host (str): Scanned IP- or DNS-Address.
+        port (int): Scanned port.
+        technique (str): Technique that decided the state, "service" for service detection results.
+        state (str): Port state reported by the technique, e.g. "Open" or "Closed".
+        rtt (float, optional): Smoothed round trip time of the host in seconds.
+        service (str, optional): Identified application.
+        os (str, optional): Guessed operating system.
+    """
+
+    host: str
+    port: int
+    technique: str
+    state: str
+    rtt: float | None = None
+    service: str | None = None
+    os: str | None = None
+
+
+class ResultWriter:
+    """
+    Base class of the result writers. Each result is written and flushed as soon as it is decided,
+    so writers keep constant memory and the output can be read while the scan is running.
+    """
+
+    mode = "w"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file: TextIO = open(path, self.mode, encoding="utf-8", newline="")
+        self.open()
+
+    def open(self):
+        """
+        Writes the file header, if the format has one.
+        """
+
+    def write(self, result: ScanResult):
+        """
+        Writes one result.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Writes the file footer, if the format has one, and closes the file.
+        """
+        self.file.close()
+
+
+class JsonlResultWriter(ResultWriter):
+    """
+    Writes one JSON object per line.
+    """
+
+    def write(self, result: ScanResult):
+        self.file.write(json.dumps(asdict(result)) + "\n")
+        self.file.flush()
+
+
+class CsvResultWriter(ResultWriter):
+    """
+    Writes one CSV row per result, with a header row.
+    """
+
+    def open(self):
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([field.name for field in fields(ScanResult)])
+
+    def write(self, result: ScanResult):
+        self.writer.writerow(["" if value is None else value for value in asdict(result).values()])
+        self.file.flush()
+
+
+class XmlResultWriter(ResultWriter):
+    """
+    Writes nmap-style XML. As results are streamed, every result becomes its own <host> element.
+    """
+
+    def open(self):
+        started = datetime.datetime.now()
+        self.file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.file.write(f'<nmaprun scanner="nmap-clone" start="{int(started.timestamp())}">\n')
+
+    def write(self, result: ScanResult):
+        service = f"<service name={quoteattr(result.service)}/>" if result.service else ""
+        os = f"<os><osmatch name={quoteattr(result.os)}/></os>" if result.os else ""
+        times = f'<times srtt="{int(result.rtt * 1_000_000)}"/>' if result.rtt is not None else ""
+        protocol = "udp" if result.technique == "udp" else "tcp"
+        self.file.write(
+            f"<host><address addr={quoteattr(result.host)}/><ports>"
+            f'<port protocol="{protocol}" portid="{result.port}">'
+            f"<state state={quoteattr(result.state)} reason={quoteattr(result.technique)}/>{service}</port>"
+            f"</ports>{os}{times}</host>\n"
+        )
+        self.file.flush()
+
+    def close(self):
+        self.file.write("</nmaprun>\n")
+        super().close()
+
+
+RESULT_WRITERS: dict[str, type[ResultWriter]] = {
+    "jsonl": JsonlResultWriter,
+    "csv": CsvResultWriter,
+    "xml": XmlResultWriter,
+}
+
+Writers: list[ResultWriter] = []
+_lock = threading.Lock()
+
+
+def init_results(args: argparse.Namespace):
+    """
+    Opens one result writer for each of the -oJ, -oC and -oX arguments.
+    """
+    outputs = {"jsonl": args.output_jsonl, "csv": args.output_csv, "xml": args.output_xml}
+    for output_format, path in outputs.items():
+        if path:
+            Writers.append(RESULT_WRITERS[output_format](path))
+            log_msg(f"Writing {output_format} results to {path}", "DEBUG")
+
+
+def record_result(result: ScanResult):
+    """
+    Writes a result to all opened result writers.
+    """
+    with _lock:
+        for writer in Writers:
+            writer.write(result)
+
+
+def close_results():
+    """
+    Closes all opened result writers.
+    """
+    with _lock:
+        while Writers:
+            Writers.pop().close()
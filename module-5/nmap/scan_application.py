@@ -5,24 +5,12 @@ Any practical use of this script outside of educational or supervised demonstrat
 Author: Mihai-Andrei Neacsu
 """
 
-from functools import wraps
-import socket
-import time
+import asyncio
+import ssl
+from typing import Iterable, NamedTuple
 from logger import log_msg
-
-# Sample mapping of known banners to applications
-BANNER_SIGNATURES = {
-    "nginx": "Nginx Web Server",
-    "apache": "Apache HTTP Server",
-    "IIS": "Microsoft IIS Server",
-    "Postfix": "Postfix Mail Server",
-    "Exim": "Exim Mail Server",
-    "OpenSSH": "OpenSSH Server",
-    "vsftpd": "vsftpd FTP Server",
-    "ProFTPD": "ProFTPD FTP Server",
-    "SMTP": "SMTP Server",
-    # Add more known banners and applications here
-}
+from signatures import match_signature
+from certificates import CertificateNames, parse_certificate_names
 
 PROB_MESSAGES = [
     b"\n",
@@ -31,84 +19,344 @@ PROB_MESSAGES = [
     b"HELO example.com\r\n",
 ]
 
+CONNECT_TIMEOUT = 3.0
+READ_TIMEOUT = 2.0
 
-# Decorator to retry on timeout and change the probe message
-def retry_on_timeout(max_retries=3):
-    def decorator(func):
-        @wraps(func)
-        def wrapper(dst_ip, dst_port, *args, **kwargs):
-
-            retries = 0
-            while retries < max_retries:
-                try:
-                    # Use the retry number to select a probe message
-                    probe_message = PROB_MESSAGES[retries] if retries < len(PROB_MESSAGES) else b"\n"
-                    return func(dst_ip, dst_port, probe_message, *args, **kwargs)
-                except socket.timeout:
-                    retries += 1
-                    log_msg(
-                        f"Timeout on port {dst_port}, retrying... ({max_retries - retries} retries left)",
-                        "WARNING",
-                    )
-                except Exception as e:
-                    log_msg(f"Failed on port {dst_port}: {e}", "ERROR")
-                    break
-            log_msg(
-                f"Max retries reached on port {dst_port}. Could not identify the application.",
-                "ERROR",
-            )
+# Ports usually wrapped in TLS from the first byte, tried with a TLS handshake before the plaintext probes
+TLS_PORTS = {443, 465, 563, 636, 853, 989, 990, 992, 993, 994, 995, 2376, 5061, 6443, 8443, 9443}
+# Replies of TLS services to plaintext probes: a TLS alert record or the complaint of an HTTPS server
+TLS_HINTS = ("\x15\x03", "HTTPS port", "speak plain HTTP to an SSL", "TLS handshake")
+ALPN_PROTOCOLS = ["http/1.1"]
+HTTP_PROBES = ["HEAD", "GET"]
+
+
+class TlsInfo(NamedTuple):
+    """
+    Outcome of the TLS handshake with a service.
+
+    Attributes:
+        version (str): Negotiated protocol version, e.g. TLSv1.3.
+        cipher (str): Negotiated cipher suite.
+        alpn (str, optional): Application protocol selected by the server via ALPN.
+        certificate (CertificateNames): Names of the certificate presented by the server.
+    """
+
+    version: str
+    cipher: str
+    alpn: str | None
+    certificate: CertificateNames
+
+    def banner(self) -> str:
+        """
+        Returns the certificate names as a banner for the signature database,
+        e.g. "TLS certificate CN=example.com; issuer CN=R3; SAN example.com www.example.com".
+        """
+        names = self.certificate
+        alt_names = " ".join(names.alt_names)
+        return f"TLS certificate CN={names.common_name or ''}; issuer CN={names.issuer or ''}; SAN {alt_names}"
+
+    def __str__(self) -> str:
+        details = [self.version]
+        if self.alpn:
+            details.append(f"ALPN {self.alpn}")
+        if self.certificate.common_name:
+            details.append(f"CN {self.certificate.common_name}")
+        return f"TLS: {', '.join(details)}"
 
-        return wrapper
 
-    return decorator
+# Handshake outcome per (address, port): TlsInfo, or None if the service does not speak TLS
+TlsSessions: dict[tuple[str, int], TlsInfo | None] = {}
+_tls_context: ssl.SSLContext | None = None
+
+
+def get_tls_context() -> ssl.SSLContext:
+    """
+    Returns the TLS client context shared by all handshakes, created on first use.
+    Certificates are not verified, the scan wants to see them, not trust them,
+    and legacy protocol versions and ciphers are accepted to identify old services too.
+    """
+    global _tls_context
+    if _tls_context is None:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        context.minimum_version = ssl.TLSVersion.MINIMUM_SUPPORTED
+        try:
+            context.set_ciphers("ALL:@SECLEVEL=0")
+        except ssl.SSLError:
+            pass
+        context.set_alpn_protocols(ALPN_PROTOCOLS)
+        _tls_context = context
+    return _tls_context
 
 
 def match_application_signature(banner: str) -> str | None:
     """
-    Match the banner against known signatures to identify the application.
+    Match the banner against the service signature database to identify the application.
 
     Args:
         banner (str) : received decoded banner from send probe message
+
+    Returns:
+        str | None : Application name and version, None if no signature matched
     """
-    for signature, app_name in BANNER_SIGNATURES.items():
-        if signature.lower() in banner.lower():
-            return app_name
-    return None  # No match found
+    service_match = match_signature(banner)
+    return str(service_match) if service_match else None
 
 
-# Decorated function to scan for applications
-@retry_on_timeout(max_retries=2)
-def scan_application(dst_ip: str, dst_port: str, probe_message: bytes = b"\n"):
+async def read_banner(reader: asyncio.StreamReader, read_timeout: float) -> bytes:
     """
-    Identifies application listening on given address and port.
+    Reads whatever the server sends, returning as soon as data arrives.
+
+    Args:
+        reader (asyncio.StreamReader) : Reader of the open connection
+        read_timeout (float) : Deadline in seconds for this read
+
+    Returns:
+        bytes : Received data, empty if the deadline passed or the connection was closed
+    """
+    try:
+        return await asyncio.wait_for(reader.read(4096), read_timeout)
+    except asyncio.TimeoutError:
+        return b""
+
+
+async def read_http_response(reader: asyncio.StreamReader, read_timeout: float) -> bytes:
+    """
+    Reads the status line and headers of an HTTP response, the body is left unread.
+
+    Args:
+        reader (asyncio.StreamReader) : Reader of the open connection
+        read_timeout (float) : Deadline in seconds for this read
+
+    Returns:
+        bytes : Received status line and headers, whatever arrived if the headers did not end before the deadline
+    """
+    try:
+        return await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), read_timeout)
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except (asyncio.LimitOverrunError, asyncio.TimeoutError):
+        return await read_banner(reader, 0.1)
+
+
+async def grab_plain_banner(dst_ip: str, dst_port: int, read_timeout: float = READ_TIMEOUT) -> str:
+    """
+    Grabs the banner of the application listening on given address and port.
+
+    First waits for a greeting, as SSH, FTP or SMTP servers talk first.
+    Then sends the PROB_MESSAGES in order on the same connection until one triggers a response.
+    If the server closes the connection, a new one is opened for the next probe.
+
+    Args:
+        dst_ip (str) : Target Address
+        dst_port (int) : Target port
+        read_timeout (float) : Deadline in seconds for each read
+
+    Returns:
+        str : Banner decoded byte by byte (latin-1) so binary signatures still match,
+              empty if no probe triggered a response
+    """
+    probes = [None, *PROB_MESSAGES]
+    reader = writer = None
+    try:
+        for probe in probes:
+            if writer is None or reader.at_eof():
+                if writer is not None:
+                    writer.close()
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(dst_ip, dst_port), CONNECT_TIMEOUT)
+            if probe is not None:
+                writer.write(probe)
+                await writer.drain()
+            banner = await read_banner(reader, read_timeout)
+            if banner:
+                return banner.decode("latin-1")
+        return ""
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def grab_tls_banner(dst_ip: str, dst_port: int, read_timeout: float = READ_TIMEOUT) -> tuple[str, TlsInfo] | None:
+    """
+    Grabs the banner of an application behind TLS, with one TLS handshake per port.
+
+    The handshake outcome, certificate names and ALPN protocol, is cached in TlsSessions.
+    Services wrapped in TLS that talk first, e.g. IMAPS or SMTPS, greet right after the handshake.
+    Unless the server selected HTTP via ALPN, the greeting is awaited first.
+    Then the HTTP_PROBES are sent over the same keep-alive connection until a response names its server.
+
+    Args:
+        dst_ip (str) : Target Address
+        dst_port (int) : Target port
+        read_timeout (float) : Deadline in seconds for each read
+
+    Returns:
+        tuple[str, TlsInfo] | None : Banner and handshake outcome, None if the service does not speak TLS
+    """
+    if TlsSessions.get((dst_ip, dst_port), True) is None:
+        return None
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(dst_ip, dst_port, ssl=get_tls_context(), server_hostname=dst_ip),
+            CONNECT_TIMEOUT,
+        )
+    except (OSError, asyncio.TimeoutError) as e:
+        log_msg(f"No TLS handshake with host {dst_ip} port {dst_port}: {e}", "DEBUG")
+        TlsSessions[dst_ip, dst_port] = None
+        return None
+
+    try:
+        tls_object = writer.get_extra_info("ssl_object")
+        if (dst_ip, dst_port) not in TlsSessions:
+            try:
+                certificate = parse_certificate_names(tls_object.getpeercert(binary_form=True) or b"")
+            except ValueError as e:
+                log_msg(f"Could not parse the certificate of host {dst_ip} port {dst_port}: {e}", "DEBUG")
+                certificate = CertificateNames()
+            TlsSessions[dst_ip, dst_port] = TlsInfo(
+                tls_object.version(), tls_object.cipher()[0], tls_object.selected_alpn_protocol(), certificate
+            )
+        tls = TlsSessions[dst_ip, dst_port]
+
+        if tls.alpn is None:
+            banner = await read_banner(reader, read_timeout)
+            if banner:
+                return banner.decode("latin-1"), tls
+
+        banner = b""
+        for method in HTTP_PROBES:
+            if reader.at_eof():
+                break
+            writer.write(f"{method} / HTTP/1.1\r\nHost: {dst_ip}\r\nConnection: keep-alive\r\n\r\n".encode())
+            await writer.drain()
+            response = await read_http_response(reader, read_timeout)
+            if response:
+                banner = response
+            # A HEAD response without a Server header may still get one from a GET, e.g. on frameworks
+            if b"\r\nserver:" in response.lower() or not response.startswith(b"HTTP/"):
+                break
+        return banner.decode("latin-1"), tls
+    except OSError as e:
+        log_msg(f"TLS connection to host {dst_ip} port {dst_port} failed: {e}", "DEBUG")
+        return "", TlsSessions[dst_ip, dst_port]
+    finally:
+        writer.close()
+
+
+async def grab_banner(dst_ip: str, dst_port: int, read_timeout: float = READ_TIMEOUT) -> tuple[str, TlsInfo | None]:
+    """
+    Grabs the banner of the application listening on given address and port, behind TLS or in plaintext.
+
+    Ports in TLS_PORTS are tried with TLS first. Other ports get the plaintext probes first
+    and are tried with TLS only if no probe triggered a response, the connection was reset or the response hints at TLS.
 
     Args:
         dst_ip (str) : Target Address
-        dst_port (str) : Target port
-        probe_message (bytes) : Message to send via client socket
-        A newline (b"\n") is often sufficient to trigger a banner
+        dst_port (int) : Target port
+        read_timeout (float) : Deadline in seconds for each read
+
+    Returns:
+        tuple[str, TlsInfo | None] : Banner decoded byte by byte (latin-1), empty if no probe triggered a response,
+                                     and the TLS handshake outcome, None for plaintext services
     """
+    tls_first = dst_port in TLS_PORTS
+    if tls_first:
+        tls_banner = await grab_tls_banner(dst_ip, dst_port, read_timeout)
+        if tls_banner is not None:
+            return tls_banner
 
-    log_msg("Scanning APPLICATION...")
-    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    client_socket.settimeout(3)
-    client_socket.connect((dst_ip, dst_port))
+    try:
+        banner = await grab_plain_banner(dst_ip, dst_port, read_timeout)
+    except ConnectionResetError as e:
+        # TLS servers may reset the connection on a plaintext probe
+        log_msg(f"Plaintext probes of host {dst_ip} port {dst_port} failed: {e}", "DEBUG")
+        banner = ""
+    if not tls_first and (not banner or any(hint in banner for hint in TLS_HINTS)):
+        tls_banner = await grab_tls_banner(dst_ip, dst_port, read_timeout)
+        if tls_banner is not None:
+            return tls_banner
+    return banner, None
 
-    # Send a generic message to probe the service
-    client_socket.sendall(probe_message)
 
-    time.sleep(2)  # Allow some time for the server to respond
+async def detect_service(
+    dst_ip: str, dst_port: int, semaphore: asyncio.Semaphore, read_timeout: float
+) -> str | None:
+    """
+    Identifies the application listening on given address and port, limited by the semaphore.
 
-    banner = client_socket.recv(4096)
-    log_msg(f"Banner from port {dst_port}: {banner.decode().strip()}", "DEBUG")
+    Args:
+        dst_ip (str) : Target Address
+        dst_port (int) : Target port
+        semaphore (asyncio.Semaphore) : Limits the number of open connections
+        read_timeout (float) : Deadline in seconds for each read
+
+    Returns:
+        str | None : Detected application, None if it could not be identified
+    """
+    async with semaphore:
+        try:
+            banner, tls = await grab_banner(dst_ip, dst_port, read_timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            log_msg(f"Failed on host {dst_ip} port {dst_port}: {e}", "ERROR")
+            return None
 
-    response = banner.decode(errors="ignore")
+    log_msg(f"Banner from host {dst_ip} port {dst_port}: {banner.strip()}", "DEBUG")
 
-    # Try to match the banner to a known application
-    detected_application = match_application_signature(response)
+    # Try to match the banner to a known application, behind TLS the certificate names may identify it too
+    detected_application = match_application_signature(banner) if banner else None
+    if tls is not None:
+        log_msg(f"Host {dst_ip} port {dst_port} {tls}, {tls.banner()}", "DEBUG")
+        detected_application = detected_application or match_application_signature(tls.banner()) or "Unknown"
+        detected_application = f"{detected_application} ({tls})"
     if detected_application:
-        log_msg(f"Port {dst_port} runs: {detected_application} APPLICATION")
+        log_msg(f"Host {dst_ip} Port {dst_port} runs: {detected_application} APPLICATION")
     else:
-        log_msg(f"Could not identify the application from the banner on port {dst_port}.")
+        log_msg(f"Could not identify the application from the banner on host {dst_ip} port {dst_port}.")
+    return detected_application
 
-    client_socket.close()
+
+async def detect_services_async(
+    targets: Iterable[tuple[str, int]], concurrency: int, read_timeout: float
+) -> dict[tuple[str, int], str | None]:
+    """
+    Identifies the applications of all targets concurrently.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    targets = list(targets)
+    detected = await asyncio.gather(
+        *(detect_service(dst_ip, dst_port, semaphore, read_timeout) for dst_ip, dst_port in targets)
+    )
+    return dict(zip(targets, detected))
+
+
+def detect_services(
+    targets: Iterable[tuple[str, int]], concurrency: int = 200, read_timeout: float = READ_TIMEOUT
+) -> dict[tuple[str, int], str | None]:
+    """
+    Identifies the applications listening on many addresses and ports at once.
+
+    Args:
+        targets (Iterable[tuple[str, int]]) : (address, port) pairs of open ports
+        concurrency (int) : Maximal number of connections open at the same time
+        read_timeout (float) : Deadline in seconds for each read
+
+    Returns:
+        dict[tuple[str, int], str | None] : Detected application per (address, port) pair
+    """
+    log_msg("Scanning APPLICATIONS...")
+    return asyncio.run(detect_services_async(targets, concurrency, read_timeout))
+
+
+def scan_application(dst_ip: str, dst_port: int) -> str | None:
+    """
+    Identifies application listening on given address and port.
+
+    Args:
+        dst_ip (str) : Target Address
+        dst_port (int) : Target port
+
+    Returns:
+        str | None : Detected application, None if it could not be identified
+    """
+    return detect_services([(dst_ip, dst_port)])[(dst_ip, dst_port)]
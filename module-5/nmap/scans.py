@@ -1,6 +1,10 @@
-import time
-from scapy.all import IP, TCP, sr1, send, ICMP
-from scapy_utils import send_tcp_package, send_rst
+from scapy.layers.inet import IP, TCP, UDP, ICMP
+from scapy.packet import Raw
+from scapy.volatile import RandShort
+from scapy_utils import send_tcp_package, send_timed_package
+from teardown import Teardown, queue_teardown
+from fingerprint import record_fingerprint
+from udp_payloads import get_udp_payload
 from logger import log_msg
 from literals import (
     PingScanResult,
@@ -11,8 +15,13 @@ from literals import (
     TcpWindowScanResult,
     TcpNullScanResult,
     TcpXmasScanResult,
+    UdpScanResult,
 )
 
+# ICMP destination unreachable codes of filtering routers and hosts: host, protocol,
+# network administratively prohibited, host administratively prohibited and communication administratively prohibited
+ICMP_FILTERED_CODES = (1, 2, 9, 10, 13)
+
 
 def ping_scan(
     dst_ip: str,
@@ -28,7 +37,7 @@ def ping_scan(
     """
     # Step 1: Send an ICMP Echo Request to the target IP
     icmp_packet = IP(dst=dst_ip) / ICMP()
-    response = sr1(icmp_packet, timeout=2, verbose=0)
+    response = send_timed_package(icmp_packet, dst_ip, technique="ping")
 
     # Step 2: Analyze the response
     if response is None:
@@ -46,19 +55,18 @@ def ping_scan(
     return "Unexpected Response"
 
 
-def tcp_ack_scan(dst_ip: str, dst_port: int) -> TcpAckScanResult:
+def classify_tcp_ack_response(dst_ip: str, dst_port: int, response) -> TcpAckScanResult:
     """
-    Perform a TCP ACK Scan on the specified port.
+    Classify the reply to a TCP ACK probe.
 
     Args:
         dst_ip (str): The target IP address.
         dst_port (int): The target port number.
+        response: The received reply, or `None` if no reply arrived.
 
     Returns:
         TcpAckScanResult : The state of the host.
     """
-    response, src_port = send_tcp_package(dst_ip, dst_port, flags="A")
-
     if response is None:
         log_msg(f"Host {dst_ip} Port {dst_port}: Filtered or No Response", "DEBUG")
         return "Filtered or No Response"
@@ -72,8 +80,8 @@ def tcp_ack_scan(dst_ip: str, dst_port: int) -> TcpAckScanResult:
 
     if response.haslayer(ICMP):
         icmp_layer = response.getlayer(ICMP)
-        log_msg(f"ICMP Layer types: {tcp_layer.types}", "DEBUG")
-        log_msg(f"ICMP Layer code: {tcp_layer.code}", "DEBUG")
+        log_msg(f"ICMP Layer type: {icmp_layer.type}", "DEBUG")
+        log_msg(f"ICMP Layer code: {icmp_layer.code}", "DEBUG")
 
         if int(icmp_layer.type) == 3 and int(icmp_layer.code) in [1, 2, 3, 9, 10, 13]:
             log_msg(f"Host {dst_ip} Port {dst_port}: Filtered", "DEBUG")
@@ -83,19 +91,33 @@ def tcp_ack_scan(dst_ip: str, dst_port: int) -> TcpAckScanResult:
     return "Filtered or Unexpected Response"
 
 
-def half_open_scan(dst_ip: str, dst_port: int) -> HalfOpenScanResult:
+def tcp_ack_scan(dst_ip: str, dst_port: int) -> TcpAckScanResult:
     """
-    Perform a Half-Open Scan on the specified port.
+    Perform a TCP ACK Scan on the specified port.
 
     Args:
         dst_ip (str): The target IP address.
         dst_port (int): The target port number.
 
     Returns:
-        HalfOpenScanResult : The state of the host.
+        TcpAckScanResult : The state of the host.
+    """
+    response, src_port = send_tcp_package(dst_ip, dst_port, flags="A", technique="ack")
+    return classify_tcp_ack_response(dst_ip, dst_port, response)
+
+
+def classify_half_open_response(dst_ip: str, dst_port: int, response) -> HalfOpenScanResult:
     """
-    response, src_port = send_tcp_package(dst_ip, dst_port, flags="A")
+    Classify the reply to a Half-Open (SYN) probe.
+
+    Args:
+        dst_ip (str): The target IP address.
+        dst_port (int): The target port number.
+        response: The received reply, or `None` if no reply arrived.
 
+    Returns:
+        HalfOpenScanResult : The state of the port.
+    """
     if not response:
         log_msg(f"Host {dst_ip} Port {dst_port}: Filtered or Dropped", "DEBUG")
         return "Filtered or Dropped"
@@ -112,27 +134,47 @@ def half_open_scan(dst_ip: str, dst_port: int) -> HalfOpenScanResult:
 
     if response.getlayer(TCP).flags == 0x12:  # SYN+ACK
         log_msg(f"Host {dst_ip} Port {dst_port}: Open")
-        time.sleep(2)
-        send_rst(dst_ip, dst_port, src_port)
+        # The SYN+ACK carries the OS fingerprint features, no extra probe needed
+        record_fingerprint(dst_ip, response)
         return "Open"
 
     log_msg(f"Host {dst_ip} Port {dst_port}: Filtered or Unexpected Response", "DEBUG")
     return "Filtered or Unexpected Response"
 
 
-def tcp_window_scan(dst_ip: str, dst_port: int) -> TcpWindowScanResult:
+def half_open_scan(dst_ip: str, dst_port: int) -> HalfOpenScanResult:
     """
-    Perform a TCP Window Scan on the specified port.
+    Perform a Half-Open Scan on the specified port.
 
     Args:
         dst_ip (str): The target IP address.
         dst_port (int): The target port number.
 
     Returns:
-        TcpWindowScanResult : The state of the port.
+        HalfOpenScanResult : The state of the host.
+    """
+    response, src_port = send_tcp_package(dst_ip, dst_port, flags="S", technique="half_open")
+
+    result = classify_half_open_response(dst_ip, dst_port, response)
+    if result == "Open":
+        # The RST is sent in the background, the reply carries the source port and the sequence number it expects
+        tcp_layer = response.getlayer(TCP)
+        queue_teardown(Teardown(dst_ip, dst_port, tcp_layer.dport, tcp_layer.ack, tcp_layer.seq + 1))
+    return result
+
+
+def classify_tcp_window_response(dst_ip: str, dst_port: int, response) -> TcpWindowScanResult:
     """
-    response, src_port = send_tcp_package(dst_ip, dst_port, flags="A")
+    Classify the reply to a TCP ACK probe by the window of the RST reply.
 
+    Args:
+        dst_ip (str): The target IP address.
+        dst_port (int): The target port number.
+        response: The received reply, or `None` if no reply arrived.
+
+    Returns:
+        TcpWindowScanResult : The state of the port.
+    """
     if response is None:
         log_msg(f"Host {dst_ip} Port {dst_port}: Filtered or No response", "DEBUG")
         return "Filtered or No Response"  # No response indicates the port might be filtered or dropped
@@ -156,19 +198,33 @@ def tcp_window_scan(dst_ip: str, dst_port: int) -> TcpWindowScanResult:
     return "Filtered or Unexpected Response"
 
 
-def tcp_connect_scan(dst_ip: str, dst_port: int) -> TcpConnectScanResult:
+def tcp_window_scan(dst_ip: str, dst_port: int) -> TcpWindowScanResult:
     """
-    Perform a TCP Connect Scan on the specified port.
+    Perform a TCP Window Scan on the specified port.
 
     Args:
         dst_ip (str): The target IP address.
         dst_port (int): The target port number.
 
     Returns:
-        TcpConnectScanResult : The state of the port
+        TcpWindowScanResult : The state of the port.
+    """
+    response, src_port = send_tcp_package(dst_ip, dst_port, flags="A", technique="window")
+    return classify_tcp_window_response(dst_ip, dst_port, response)
+
+
+def classify_tcp_connect_response(dst_ip: str, dst_port: int, response) -> TcpConnectScanResult:
     """
-    response, src_port = send_tcp_package(dst_ip, dst_port, flags="S")
+    Classify the reply to the SYN of a TCP connect.
 
+    Args:
+        dst_ip (str): The target IP address.
+        dst_port (int): The target port number.
+        response: The received reply, or `None` if no reply arrived.
+
+    Returns:
+        TcpConnectScanResult : The state of the port
+    """
     if response is None:
         log_msg(f"Host {dst_ip} Port {dst_port}: Filtered or Dropped", "DEBUG")
         return "Filtered or Dropped"
@@ -178,26 +234,7 @@ def tcp_connect_scan(dst_ip: str, dst_port: int) -> TcpConnectScanResult:
         log_msg(f"TCP Layer flags: {tcp_layer.flags}", "DEBUG")
 
         if tcp_layer.flags == 0x12:  # SYN-ACK received, port is open
-            # Send an ACK packet to complete the handshake
-            ack_packet = IP(dst=dst_ip) / TCP(
-                sport=src_port,
-                dport=dst_port,
-                flags="A",
-                seq=response.ack,
-                ack=tcp_layer.seq + 1,
-            )
-            send(ack_packet, verbose=0)
-
-            # Optional: Send an RST packet to close the connection
-            rst_packet = IP(dst=dst_ip) / TCP(
-                sport=src_port,
-                dport=dst_port,
-                flags="R",
-                seq=response.ack,
-                ack=tcp_layer.seq + 1,
-            )
-            send(rst_packet, verbose=0)
-
+            record_fingerprint(dst_ip, response)
             log_msg(f"Host {dst_ip} Port {dst_port}: Open")
             return "Open"
 
@@ -209,19 +246,40 @@ def tcp_connect_scan(dst_ip: str, dst_port: int) -> TcpConnectScanResult:
     return "Filtered or Unexpected Response"
 
 
-def tcp_null_scan(dst_ip: str, dst_port: int) -> TcpNullScanResult:
+def tcp_connect_scan(dst_ip: str, dst_port: int) -> TcpConnectScanResult:
     """
-    Perform a TCP NULL Scan on the specified port.
+    Perform a TCP Connect Scan on the specified port.
 
     Args:
         dst_ip (str): The target IP address.
         dst_port (int): The target port number.
 
     Returns:
-        TcpNullScanResult : The state of the port.
+        TcpConnectScanResult : The state of the port
+    """
+    response, src_port = send_tcp_package(dst_ip, dst_port, flags="S", technique="connect")
+    result = classify_tcp_connect_response(dst_ip, dst_port, response)
+
+    if result == "Open":
+        # Complete the handshake with an ACK, then close the connection with a RST, both sent in the background
+        tcp_layer = response.getlayer(TCP)
+        queue_teardown(Teardown(dst_ip, dst_port, tcp_layer.dport, tcp_layer.ack, tcp_layer.seq + 1, handshake=True))
+
+    return result
+
+
+def classify_tcp_null_response(dst_ip: str, dst_port: int, response) -> TcpNullScanResult:
     """
-    response, src_port = send_tcp_package(dst_ip, dst_port, flags="")
+    Classify the reply to a TCP NULL probe.
 
+    Args:
+        dst_ip (str): The target IP address.
+        dst_port (int): The target port number.
+        response: The received reply, or `None` if no reply arrived.
+
+    Returns:
+        TcpNullScanResult : The state of the port.
+    """
     if response is None:
         log_msg(f"Host {dst_ip} Port {dst_port}: Open or Filtered", "DEBUG")
         return "Open or Filtered"
@@ -238,19 +296,33 @@ def tcp_null_scan(dst_ip: str, dst_port: int) -> TcpNullScanResult:
     return "Filtered or Unexpected Response"
 
 
-def tcp_xmas_scan(dst_ip: str, dst_port: int) -> TcpXmasScanResult:
+def tcp_null_scan(dst_ip: str, dst_port: int) -> TcpNullScanResult:
     """
-    Perform a TCP XMAS Scan on the specified port.
+    Perform a TCP NULL Scan on the specified port.
 
     Args:
         dst_ip (str): The target IP address.
         dst_port (int): The target port number.
 
     Returns:
-        TcpXmasScanResult : The state of the port.
+        TcpNullScanResult : The state of the port.
+    """
+    response, src_port = send_tcp_package(dst_ip, dst_port, flags="", technique="null")
+    return classify_tcp_null_response(dst_ip, dst_port, response)
+
+
+def classify_tcp_xmas_response(dst_ip: str, dst_port: int, response) -> TcpXmasScanResult:
     """
-    response, src_port = send_tcp_package(dst_ip, dst_port, flags="FPU")
+    Classify the reply to a TCP XMAS probe.
 
+    Args:
+        dst_ip (str): The target IP address.
+        dst_port (int): The target port number.
+        response: The received reply, or `None` if no reply arrived.
+
+    Returns:
+        TcpXmasScanResult : The state of the port.
+    """
     if response is None:
         log_msg(f"Host {dst_ip} Port {dst_port}: Open or Filtered", "DEBUG")
         return "Open or Filtered"
@@ -267,19 +339,33 @@ def tcp_xmas_scan(dst_ip: str, dst_port: int) -> TcpXmasScanResult:
     return "Filtered or Unexpected Response"
 
 
-def tcp_fin_scan(dst_ip: str, dst_port: int) -> TcpFinScan:
+def tcp_xmas_scan(dst_ip: str, dst_port: int) -> TcpXmasScanResult:
     """
-    Perform a TCP FIN Scan on the specified port.
+    Perform a TCP XMAS Scan on the specified port.
 
     Args:
         dst_ip (str): The target IP address.
         dst_port (int): The target port number.
 
     Returns:
-        TcpFinScan : The state of the port.
+        TcpXmasScanResult : The state of the port.
+    """
+    response, src_port = send_tcp_package(dst_ip, dst_port, flags="FPU", technique="xmas")
+    return classify_tcp_xmas_response(dst_ip, dst_port, response)
+
+
+def classify_tcp_fin_response(dst_ip: str, dst_port: int, response) -> TcpFinScan:
     """
-    response, src_port = send_tcp_package(dst_ip, dst_port, flags="F")
+    Classify the reply to a TCP FIN probe.
 
+    Args:
+        dst_ip (str): The target IP address.
+        dst_port (int): The target port number.
+        response: The received reply, or `None` if no reply arrived.
+
+    Returns:
+        TcpFinScan : The state of the port.
+    """
     if response is None:
         log_msg(f"Host {dst_ip} Port {dst_port}: Open or Filtered", "DEBUG")
         return "Open or Filtered"
@@ -296,54 +382,69 @@ def tcp_fin_scan(dst_ip: str, dst_port: int) -> TcpFinScan:
     return "Filtered or Unexpected Response"
 
 
-def os_fingerprint(dst_ip: str, dst_port: int) -> dict:
+def tcp_fin_scan(dst_ip: str, dst_port: int) -> TcpFinScan:
     """
-    Perform a basic OS fingerprinting scan by analyzing the TTL and TCP window size.
+    Perform a TCP FIN Scan on the specified port.
 
     Args:
         dst_ip (str): The target IP address.
-        dst_port (int): The target port number (should be open).
+        dst_port (int): The target port number.
 
     Returns:
-        dict: A dictionary containing the inferred OS characteristics.
+        TcpFinScan : The state of the port.
     """
-    log_msg("Scanning OS...")
-    os_info = {}
+    response, src_port = send_tcp_package(dst_ip, dst_port, flags="F", technique="fin")
+    return classify_tcp_fin_response(dst_ip, dst_port, response)
 
-    # Step 1: Send a SYN packet to the target IP and port
-    syn_packet = IP(dst=dst_ip) / TCP(dport=dst_port, flags="S")
-    response = sr1(syn_packet, timeout=2, verbose=0)
 
+def classify_udp_response(dst_ip: str, dst_port: int, response) -> UdpScanResult:
+    """
+    Classify the reply to a UDP probe.
+
+    Args:
+        dst_ip (str): The target IP address.
+        dst_port (int): The target port number.
+        response: The received reply, or `None` if no reply arrived.
+
+    Returns:
+        UdpScanResult : The state of the port.
+    """
     if response is None:
-        os_info["OS"] = "No response (Host might be down or filtered)"
-        return os_info
+        log_msg(f"Host {dst_ip} Port {dst_port}: Open or Filtered", "DEBUG")
+        return "Open or Filtered"
 
-    if response.haslayer(IP) and response.haslayer(TCP):
-        ip_layer = response.getlayer(IP)
-        tcp_layer = response.getlayer(TCP)
+    if response.haslayer(UDP):
+        log_msg(f"Host {dst_ip} Port {dst_port}: Open")
+        return "Open"
+
+    if response.haslayer(ICMP) and response.getlayer(ICMP).type == 3:
+        icmp_layer = response.getlayer(ICMP)
+        log_msg(f"ICMP Layer type: {icmp_layer.type}, code: {icmp_layer.code}", "DEBUG")
 
-        # Analyze TTL (Time to Live)
-        ttl = ip_layer.ttl
-        if ttl <= 64:
-            os_info["TTL"] = ttl
-            os_info["OS"] = "Linux/Unix"
-        elif ttl <= 128:
-            os_info["TTL"] = ttl
-            os_info["OS"] = "Windows"
-        elif ttl <= 255:
-            os_info["TTL"] = ttl
-            os_info["OS"] = "Cisco or Solaris"
-
-        # Analyze TCP Window Size
-        window_size = tcp_layer.window
-        os_info["TCP Window Size"] = window_size
-        if window_size == 5840:
-            os_info["OS"] += " (Linux)"
-        elif window_size == 8192:
-            os_info["OS"] += " (Windows XP/2000)"
-        elif window_size == 65535:
-            os_info["OS"] += " (Windows 7/Server 2008 R2)"
-        else:
-            os_info["OS"] += " (Unknown OS)"
-
-    return os_info
+        if icmp_layer.code == 3:  # Port unreachable, port is closed
+            log_msg(f"Host {dst_ip} Port {dst_port}: Closed", "DEBUG")
+            return "Closed"
+
+        if icmp_layer.code in ICMP_FILTERED_CODES:
+            log_msg(f"Host {dst_ip} Port {dst_port}: Filtered", "DEBUG")
+            return "Filtered"
+
+    log_msg(f"Host {dst_ip} Port {dst_port}: Filtered or Unexpected Response", "DEBUG")
+    return "Filtered or Unexpected Response"
+
+
+def udp_scan(dst_ip: str, dst_port: int) -> UdpScanResult:
+    """
+    Perform a UDP Scan on the specified port. The probe carries the request of the service
+    usually listening on the port, so an opened port answers instead of silently dropping it.
+
+    Args:
+        dst_ip (str): The target IP address.
+        dst_port (int): The target port number.
+
+    Returns:
+        UdpScanResult : The state of the port.
+    """
+    udp_packet = IP(dst=dst_ip) / UDP(sport=RandShort(), dport=dst_port) / Raw(get_udp_payload(dst_port))
+    response = send_timed_package(udp_packet, dst_ip, technique="udp")
+    return classify_udp_response(dst_ip, dst_port, response)
@@ -5,24 +5,184 @@ Any practical use of this script outside of educational or supervised demonstrat
 Author: Mihai-Andrei Neacsu
 """
 
-from typing import Any
-from scapy.all import IP, TCP, RandShort, sr1, send
-from logger import log_msg
+import argparse
+import time
+from typing import Any, Callable, Literal, Protocol
+from scapy.layers.inet import IP, TCP
+from scapy.sendrecv import sr1, send
+from scapy.volatile import RandShort
+from timing import get_max_retries, get_probe_timeout, record_rtt, wait_scan_delay
+from metrics import Metrics
+import rate_limiter
+import raw_backend
 
 
-def send_rst(dst_ip: str, dst_port: int, src_port: RandShort):
+PacketBackend = Literal["scapy", "raw"]
+Backend: PacketBackend = "scapy"
+
+
+class PacketTransport(Protocol):
     """
-    Send RST to reset the connection (stealthy behavior)
+    Replaces the network for the packets of the scans, e.g. with a simulated network in benchmarks.
+    Packets are exchanged as IPv4 bytes, so both packet backends build and parse them as on the wire.
+
+    Attributes:
+        src_ip (str): Source address of the probes.
     """
-    rst_packet = IP(dst=dst_ip) / TCP(sport=src_port, dport=dst_port, flags="R")
-    send(rst_packet, verbose=0)
-    log_msg(
-        f"Sent RST to {dst_ip}:{dst_port} from port {src_port} to close the connection.",
-        "DEBUG",
-    )
+
+    src_ip: str
+
+    def exchange(self, packet: bytes, timeout: float) -> bytes | None:
+        """
+        Sends a packet and returns its reply, or `None` if none arrived before the timeout.
+        """
+
+    def send(self, packet: bytes):
+        """
+        Sends a packet without waiting for a reply.
+        """
+
+
+Transport: PacketTransport | None = None
+
+# Replies only carry the TCP options they were offered, so SYN probes offer the common ones for OS fingerprinting
+SYN_OPTIONS = [("MSS", 1460), ("SAckOK", b""), ("Timestamp", (1, 0)), ("NOP", None), ("WScale", 10)]
+
+
+def init_backend(args: argparse.Namespace):
+    """
+    Selects the packet backend given by the --backend argument:
+        - scapy: Builds and parses scapy packet objects.
+        - raw: Builds probes from byte templates on a raw socket and parses only the needed reply fields.
+    """
+    global Backend
+    Backend = args.backend
+    if Backend == "raw":
+        raw_backend.get_backend()
+
+
+def set_transport(transport: PacketTransport | None):
+    """
+    Sends the packets of both backends through the given transport instead of the network, None restores the network.
+    """
+    global Transport
+    Transport = transport
+    raw_backend.Backend = raw_backend.RawSocketBackend(transport) if transport else None
+
+
+def send_segment(packet):
+    """
+    Sends a scapy packet without waiting for a reply.
+    """
+    if Transport is None:
+        send(packet, verbose=0)
+    else:
+        Transport.send(bytes(packet))
+
+
+def exchange_package(packet, timeout: float) -> Any:
+    """
+    Sends a scapy packet and returns its reply, or `None` if none arrived before the timeout.
+    """
+    if Transport is None:
+        response = sr1(packet, timeout=timeout, verbose=0)
+        if response is not None:
+            # sr1 stamps the probe as it leaves the socket, after the socket setup
+            response.sent_time = packet.sent_time
+        return response
+    reply = Transport.exchange(bytes(packet), timeout)
+    return IP(reply) if reply else None
 
 
-def send_tcp_package(dst_ip: str, dst_port: int, flags: str, src_port=None) -> tuple[Any, RandShort | int]:
+def send_teardowns(teardowns: list):
+    """
+    Sends the segments closing the given connections, the ACK completing the handshake if requested and the RST,
+    with one socket for the whole batch.
+
+    Args:
+        teardowns (list[teardown.Teardown]): Connections to close.
+    """
+    if Backend == "raw":
+        backend = raw_backend.get_backend()
+        for teardown in teardowns:
+            flags = ("A", "R") if teardown.handshake else ("R",)
+            for flag in flags:
+                backend.send_tcp_segment(
+                    teardown.dst_ip, teardown.dst_port, flag, teardown.src_port, teardown.seq, teardown.ack
+                )
+        return
+
+    packets = []
+    for teardown in teardowns:
+        flags = ("A", "R") if teardown.handshake else ("R",)
+        for flag in flags:
+            packets.append(
+                IP(dst=teardown.dst_ip)
+                / TCP(sport=teardown.src_port, dport=teardown.dst_port, flags=flag, seq=teardown.seq, ack=teardown.ack)
+            )
+    if Transport is None:
+        send(packets, verbose=0)
+    else:
+        for packet in packets:
+            Transport.send(bytes(packet))
+
+
+def send_timed(dst_ip: str, send_probe: Callable[[float], Any], technique: str) -> Any:
+    """
+    Sends a probe paced by the rate limiter with the adaptive probe timeout of its destination host,
+    then feeds the measured round trip time back into the host RTT estimates
+    and the probe outcome back into the rate limiter and the scan metrics.
+    Unanswered probes are retransmitted up to the retries of the timing template. As in Karn's algorithm,
+    replies to retransmits are not RTT samples, they could answer any of the sent probes.
+
+    Args:
+        dst_ip (str): The destination IP address of the probe.
+        send_probe (Callable[[float], Any]): Sends the probe and waits up to the given timeout for its reply.
+        The reply carries the send time of the probe as sent_time, if the backend knows it.
+        technique (str): Scan technique of the probe, the scan metrics are counted per technique.
+
+    Returns:
+        The response packet, or `None` if no response is received before the timeout.
+    """
+    for attempt in range(get_max_retries() + 1):
+        wait_scan_delay()
+        rate_limiter.acquire()
+        Metrics.probe_sent(technique, retransmit=attempt > 0)
+        sent_at = time.time()
+        response = send_probe(get_probe_timeout(dst_ip))
+        rate_limiter.record_probe(response is not None)
+        if response is None:
+            Metrics.probe_timed_out(technique)
+            continue
+        # The send time stamped by the backend excludes the socket setup, which would inflate SRTT and RTO
+        sent_at = getattr(response, "sent_time", None) or sent_at
+        rtt = max(0.0, float(response.time) - float(sent_at)) if attempt == 0 else None
+        Metrics.probe_answered(technique, rtt)
+        if rtt is not None:
+            record_rtt(dst_ip, rtt)
+        return response
+    return None
+
+
+def send_timed_package(packet, dst_ip: str, technique: str) -> Any:
+    """
+    Sends a scapy packet through send_timed(). Used by the ICMP ping and UDP probes,
+    which are sent with scapy whatever the --backend, the raw backend only builds TCP probes.
+
+    Args:
+        packet: The scapy packet to send.
+        dst_ip (str): The destination IP address of the packet.
+        technique (str): Scan technique of the packet.
+
+    Returns:
+        The response packet, or `None` if no response is received before the timeout.
+    """
+    return send_timed(dst_ip, lambda timeout: exchange_package(packet, timeout), technique)
+
+
+def send_tcp_package(
+    dst_ip: str, dst_port: int, flags: str, technique: str, src_port=None
+) -> tuple[Any, RandShort | int]:
     """
     Sends a TCP packet to a specified destination and returns the response and source port.
 
@@ -31,8 +191,10 @@ def send_tcp_package(dst_ip: str, dst_port: int, flags: str, src_port=None) -> t
         dst_port (int): The destination port number to send the TCP packet to.
         flags (str): The TCP flags to include in the packet (e.g., "S" for SYN, "A" for ACK).
                      Multiple flags can be combined (e.g., "SA" for SYN-ACK).
+                     SYN probes carry the SYN_OPTIONS, so the reply reveals the OS fingerprint features.
+        technique (str): Scan technique of the packet, e.g. "syn", the scan metrics are counted per technique.
         src_port (int, optional): The source port number to use for sending the packet.
-        If not provided, a random source port will be generated.
+        If not provided, a random source port will be generated, of the raw backend source ports with --backend raw.
 
     Returns:
         tuple: A tuple containing:
@@ -40,13 +202,22 @@ def send_tcp_package(dst_ip: str, dst_port: int, flags: str, src_port=None) -> t
             - src_port: The source port number used for sending the packet.
 
     Example:
-        response, src_port = send_tcp_package("192.168.1.1", 80, flags="A")
+        response, src_port = send_tcp_package("192.168.1.1", 80, flags="A", technique="ack")
     """
+    if Backend == "raw":
+        backend = raw_backend.get_backend()
+        src_port = src_port or backend.random_src_port()
+        response = send_timed(
+            dst_ip, lambda timeout: backend.send_tcp_probe(dst_ip, dst_port, flags, src_port, timeout), technique
+        )
+        return response, src_port
+
     if not src_port:
         src_port = RandShort()
 
-    packet = IP(dst=dst_ip) / TCP(sport=src_port, dport=dst_port, flags=flags)
-    response = sr1(packet, timeout=2, verbose=0)
+    options = SYN_OPTIONS if flags == "S" else []
+    packet = IP(dst=dst_ip) / TCP(sport=src_port, dport=dst_port, flags=flags, options=options)
+    response = send_timed_package(packet, dst_ip, technique)
     return response, src_port
 
 
@@ -0,0 +1,164 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+from queue import Queue
+import threading
+from typing import Callable, NamedTuple
+from logger import log_msg
+from rate_limiter import rate_status
+from metrics import Metrics
+from progress import ProgressReporter
+
+
+class ScanJob(NamedTuple):
+    """
+    One unit of work for the scheduler.
+
+    Attributes:
+        host (str): Target IP- or DNS-Address.
+        port (int): Target port.
+        technique (str): Scan technique to run, "auto" lets the handler choose.
+    """
+
+    host: str
+    port: int
+    technique: str = "auto"
+
+
+class ScanScheduler:
+    """
+    Runs scan jobs on a bounded pool of worker threads.
+
+    Jobs are put on a bounded work queue. When the queue is full, submit() blocks
+    until a worker frees a slot, so producers can never run ahead of the pool.
+    Every finished job advances the progress reporter, if one is given.
+
+    Usage example:
+        scheduler = ScanScheduler(handler=lambda job: scan_port(job.host, job.port), max_parallelism=100)
+        scheduler.start()
+        for port in ports:
+            scheduler.submit(ScanJob("192.168.1.1", port))
+        scheduler.join()
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[ScanJob], bool | None],
+        max_parallelism: int = 100,
+        status_interval: float = 0.0,
+        progress: ProgressReporter | None = None,
+    ):
+        """
+        Args:
+            handler (Callable[[ScanJob], bool | None]): Function executed for each job,
+            returns True if the job found an opened port.
+            max_parallelism (int): Number of worker threads, i.e. jobs running at the same time.
+            status_interval (float): Seconds between two status log lines, 0 disables them.
+            The status line of the whole scanner is logged by metrics.py, this one adds the job counts.
+            progress (ProgressReporter, optional): Reporter advanced by every finished job.
+        """
+        if max_parallelism < 1:
+            raise ValueError(f"Invalid max parallelism: {max_parallelism}. Min allowed is 1.")
+        self.handler = handler
+        self.max_parallelism = max_parallelism
+        self.status_interval = status_interval
+        self.progress = progress
+        self._queue: Queue[ScanJob | None] = Queue(maxsize=max_parallelism * 2)
+        self._workers: list[threading.Thread] = []
+        self._running = 0
+        self._completed = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def queued(self) -> int:
+        """
+        Number of jobs waiting for a free worker.
+        """
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> int:
+        """
+        Number of jobs currently executed by workers.
+        """
+        with self._lock:
+            return self._running
+
+    @property
+    def completed(self) -> int:
+        """
+        Number of finished jobs.
+        """
+        with self._lock:
+            return self._completed
+
+    def status(self) -> str:
+        """
+        Returns a one line summary of the scheduler state.
+        """
+        return (
+            f"Jobs: {self.queued} queued, {self.running} running, {self.completed} completed. "
+            f"{rate_status()}. {Metrics.status_line()}"
+        )
+
+    def start(self):
+        """
+        Starts the worker threads and, if enabled, the status reporter.
+        """
+        for _ in range(self.max_parallelism):
+            worker = threading.Thread(target=self._work, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        if self.status_interval:
+            threading.Thread(target=self._report_status, daemon=True).start()
+
+    def submit(self, job: ScanJob):
+        """
+        Puts a job on the work queue, blocks while the queue is full.
+        """
+        self._queue.put(job)
+
+    def join(self):
+        """
+        Waits for all submitted jobs to finish and stops the workers.
+        """
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._done.set()
+        log_msg(self.status(), "DEBUG")
+
+    def _work(self):
+        """
+        Worker loop, executes jobs until it receives the stop sentinel.
+        """
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                self._running += 1
+            opened = False
+            try:
+                opened = self.handler(job) is True
+            except Exception as e:
+                log_msg(f"Job {job.host}:{job.port} ({job.technique}) failed: {e}", "ERROR")
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                if self.progress is not None:
+                    self.progress.advance(opened=opened)
+
+    def _report_status(self):
+        """
+        Logs the scheduler state every status_interval seconds until all jobs are done.
+        """
+        while not self._done.wait(self.status_interval):
+            log_msg(self.status())
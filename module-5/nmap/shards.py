@@ -0,0 +1,156 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+import multiprocessing
+import queue
+from typing import Callable, NamedTuple
+from logger import init_logger, log_msg
+from timing import init_timing
+from rate_limiter import init_rate_limiter
+from scapy_utils import init_backend
+from fingerprint import init_fingerprints
+from planner import init_planner
+from discovery import HostStates
+from checkpoint import finished_ports
+from port_set import PortSet
+from metrics import Metrics, start_status_reports
+from results import ResultWriter, ScanResult, Writers, record_result
+from teardown import flush_teardowns
+from progress import advance_progress
+
+
+class Shard(NamedTuple):
+    """
+    Share of the (host, port) pairs scanned by one shard process.
+
+    Attributes:
+        index (int): Shard index, the shard scans every workers-th pair starting at this index.
+        workers (int): Number of shards.
+        args (argparse.Namespace): Command-line arguments, with the rate limits divided by the number of shards.
+        hosts (list[str]): Alive hosts found by the parent process.
+        first (list[tuple[str, int]]): (host, port) pairs to scan before all others.
+        finished (dict[str, PortSet]): Ports per host already scanned by a resumed run.
+    """
+
+    index: int
+    workers: int
+    args: argparse.Namespace
+    hosts: list[str]
+    first: list[tuple[str, int]]
+    finished: dict[str, PortSet]
+
+
+class ShardWriter(ResultWriter):
+    """
+    Result writer of a shard process, sends the results to the parent process,
+    which writes the results of all shards to the output files.
+    """
+
+    def __init__(self, results: multiprocessing.Queue):
+        self.results = results
+
+    def write(self, result: ScanResult):
+        self.results.put(result)
+
+    def close(self):
+        pass
+
+
+def run_shard(shard: Shard, scan: Callable, results: multiprocessing.Queue):
+    """
+    Entry point of a shard process. Initializes the process state from the command-line arguments,
+    then scans its shard with its own sender and receiver and sends the results to the parent process.
+    The scan metrics of the shard, sent last, tell the parent the shard is done.
+    """
+    args = shard.args
+    init_logger(args)
+    init_timing(args)
+    init_rate_limiter(args)
+    init_backend(args)
+    init_fingerprints(args)
+    init_planner(args)
+    # The parent process only merges the metrics of a shard once it is done, so each shard logs its own status
+    start_status_reports(args.metrics_interval, f"Shard {shard.index}: ")
+    # The hosts were discovered by the parent process, no need to ping them again
+    HostStates.update(dict.fromkeys(shard.hosts, True))
+    Writers.append(ShardWriter(results))
+    try:
+        scan(
+            args,
+            shard.hosts,
+            shard.first,
+            shard=shard.index,
+            workers=shard.workers,
+            skip=lambda host, port: port in shard.finished.get(host, ()),
+        )
+    finally:
+        flush_teardowns()
+        results.put(Metrics.snapshot())
+
+
+def scan_sharded(
+    args: argparse.Namespace, hosts: list[str], first: list[tuple[str, int]], scan: Callable
+) -> list[tuple[str, int]]:
+    """
+    Splits the (host, port) pairs into --workers shards by interleaved stride, so every shard gets
+    the same mix of hosts and likely-open ports, and scans each shard in its own process.
+    The results and scan metrics of all shards are merged into the result writers and metrics of this process.
+
+    Args:
+        args (argparse.Namespace): Command-line arguments.
+        hosts (list[str]): Alive hosts.
+        first (list[tuple[str, int]]): (host, port) pairs to scan before all others.
+        scan (Callable): Scans one shard, called as scan(args, hosts, first, shard=, workers=, skip=).
+
+    Returns:
+        list[tuple[str, int]]: The opened (host, port) pairs found by all shards.
+    """
+    workers = args.workers
+    log_msg(f"Scanning in {workers} shard processes ...")
+    # Each shard has its own rate limiter, together they keep to the given rates
+    shard_args = argparse.Namespace(**vars(args))
+    shard_args.min_rate = args.min_rate / workers if args.min_rate else None
+    shard_args.max_rate = args.max_rate / workers if args.max_rate else None
+    finished = finished_ports()
+
+    # Spawned processes start with a fresh interpreter, without threads or sockets of this process
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=run_shard,
+            args=(Shard(index, workers, shard_args, hosts, first, finished), scan, results),
+            daemon=True,
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    opened_ports = []
+    running = workers
+    while running:
+        try:
+            result = results.get(timeout=1.0)
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                log_msg("Shard processes exited without finishing their scans", "ERROR")
+                break
+            continue
+        if isinstance(result, dict):
+            Metrics.merge(result)
+            running -= 1
+            continue
+        record_result(result)
+        advance_progress(opened=result.state == "Open")
+        if result.state == "Open":
+            opened_ports.append((result.host, result.port))
+
+    for process in processes:
+        process.join()
+    return opened_ports
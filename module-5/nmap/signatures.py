@@ -0,0 +1,253 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from typing import NamedTuple
+from logger import log_msg
+
+DEFAULT_DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "service-signatures.txt")
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "nmap-clone")
+
+MATCH_LINE_REGEX = re.compile(r"^match\s+(?P<service>[\w.+-]+)\s+m(?P<delimiter>\S)(?P<rest>.*)$")
+TEMPLATE_FIELD_REGEX = re.compile(r"\s*([pvi])/([^/]*)/")
+BACKREFERENCE_REGEX = re.compile(r"\\[1-9]|\(\?P=")
+REGEX_FLAGS = {"i": re.IGNORECASE, "s": re.DOTALL}
+
+
+class Signature(NamedTuple):
+    """
+    One entry of the service signature database.
+
+    Attributes:
+        service (str): Service name, e.g. ssh or http.
+        pattern (str): Regex matched against the banner.
+        flags (str): Regex flags: i (ignore case), s (dot matches newline).
+        product (str): Product template, may reference capture groups as $1, $2, ...
+        version (str): Version template.
+        info (str): Extra info template.
+    """
+
+    service: str
+    pattern: str
+    flags: str
+    product: str
+    version: str
+    info: str
+
+
+class ServiceMatch(NamedTuple):
+    """
+    A banner matched to a signature, with the capture groups filled into the templates.
+    """
+
+    service: str
+    product: str
+    version: str
+    info: str
+
+    def __str__(self) -> str:
+        name = " ".join(filter(None, (self.product or self.service, self.version)))
+        return f"{name} ({self.info})" if self.info else name
+
+
+def parse_signature_line(line: str, line_number: int) -> Signature | None:
+    """
+    Parses one line of the signature database.
+
+    Args:
+        line (str): The line to parse.
+        line_number (int): Line number, used in error messages.
+
+    Raises:
+        ValueError: If the line is neither empty, a comment nor a valid signature.
+
+    Returns:
+        Signature | None: The parsed signature, None for empty lines and comments.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    match = MATCH_LINE_REGEX.match(line)
+    if not match:
+        raise ValueError(f"Invalid signature on line {line_number}: {line}")
+    pattern, separator, rest = match.group("rest").partition(match.group("delimiter"))
+    if not separator:
+        raise ValueError(f"Unterminated signature regex on line {line_number}: {line}")
+    flags, _, rest = rest.partition(" ")
+    if set(flags) - set(REGEX_FLAGS):
+        raise ValueError(f"Invalid signature flags {flags} on line {line_number}")
+    fields = dict(TEMPLATE_FIELD_REGEX.findall(rest))
+    return Signature(
+        match.group("service"), pattern, flags, fields.get("p", ""), fields.get("v", ""), fields.get("i", "")
+    )
+
+
+def regex_flags(flags: str) -> int:
+    """
+    Converts signature flags like "is" to re module flags.
+    """
+    value = 0
+    for flag in flags:
+        value |= REGEX_FLAGS[flag]
+    return value
+
+
+def fill_template(template: str, match: re.Match) -> str:
+    """
+    Replaces $1, $2, ... in a template with the capture groups of the match.
+    """
+    return re.sub(r"\$(\d)", lambda group: match.group(int(group.group(1))) or "", template).strip()
+
+
+class SignatureMatcher:
+    """
+    Matches banners against the whole signature database in a single regex pass.
+
+    All signatures are combined into one alternation where signature N is wrapped into the
+    named group _N, so one search finds the signature matching earliest in the banner.
+    Signatures come first in file order, as if they were tried one by one: only the signatures before
+    the one found are then tried on their own, up to the one found, which extracts its version capture groups.
+    Signatures using backreferences can not be combined, as their group numbers would shift,
+    and are tried one by one if the combined pass found no signature.
+
+    Usage example:
+        matcher = SignatureMatcher.load("service-signatures.txt")
+        matcher.match("SSH-2.0-OpenSSH_9.6")  # ServiceMatch(service="ssh", product="OpenSSH", version="9.6", ...)
+    """
+
+    def __init__(self, signatures: list[Signature]):
+        """
+        Args:
+            signatures (list[Signature]): Parsed signature database.
+        """
+        self.signatures = signatures
+        self.combined_indexes = [i for i, s in enumerate(signatures) if not BACKREFERENCE_REGEX.search(s.pattern)]
+        self.fallback_indexes = [i for i, s in enumerate(signatures) if BACKREFERENCE_REGEX.search(s.pattern)]
+        self.combined_source = "|".join(
+            f"(?P<_{i}>(?{signatures[i].flags or '-i'}:{signatures[i].pattern}))" for i in self.combined_indexes
+        )
+        self.combined = re.compile(self.combined_source) if self.combined_indexes else None
+        self._patterns: dict[int, re.Pattern] = {}
+
+    def pattern(self, index: int) -> re.Pattern:
+        """
+        Returns the compiled regex of a single signature, compiled on first use.
+        """
+        if index not in self._patterns:
+            signature = self.signatures[index]
+            self._patterns[index] = re.compile(signature.pattern, regex_flags(signature.flags))
+        return self._patterns[index]
+
+    def match(self, banner: str) -> ServiceMatch | None:
+        """
+        Matches a banner against the signature database.
+
+        Args:
+            banner (str): Received banner.
+
+        Returns:
+            ServiceMatch | None: The identified service, None if no signature matched.
+        """
+        candidates = self.fallback_indexes
+        if self.combined is not None:
+            combined_match = self.combined.search(banner)
+            if combined_match:
+                # Signatures before the one found take precedence, signatures after it are never reached
+                candidates = range(int(combined_match.lastgroup[1:]) + 1)
+
+        for index in candidates:
+            match = self.pattern(index).search(banner)
+            if match:
+                signature = self.signatures[index]
+                return ServiceMatch(
+                    signature.service,
+                    fill_template(signature.product, match),
+                    fill_template(signature.version, match),
+                    fill_template(signature.info, match),
+                )
+        return None
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_DATABASE, use_cache: bool = True) -> "SignatureMatcher":
+        """
+        Loads and compiles a signature database file.
+
+        The parsed and validated signatures are cached on disk as JSON, keyed by the database path, its size and
+        modification time and the Python version, so later runs skip parsing and compiling every signature
+        on its own. The combined regex is compiled at every start: Python can only load compiled regex code
+        through its private compiler internals and pickle, which crash or run code on a stale or tampered cache.
+
+        Args:
+            path (str): Path of the signature database.
+            use_cache (bool): If the disk cache should be read and written.
+
+        Raises:
+            ValueError: If the database contains an invalid signature.
+
+        Returns:
+            SignatureMatcher: The compiled matcher.
+        """
+        stat = os.stat(path)
+        key = {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime_ns, "python": sys.version}
+        cache_path = os.path.join(CACHE_DIR, f"signatures-{hashlib.sha256(key['path'].encode()).hexdigest()[:16]}.json")
+
+        if use_cache and os.path.exists(cache_path):
+            try:
+                with open(cache_path, "r", encoding="utf-8") as file:
+                    cached = json.load(file)
+                if cached["key"] == key:
+                    signatures = [Signature(*signature) for signature in cached["signatures"]]
+                    log_msg(f"Loaded {len(signatures)} service signatures from cache {cache_path}", "DEBUG")
+                    return cls(signatures)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                log_msg(f"Ignoring broken signature cache {cache_path}: {e}", "WARNING")
+
+        signatures = []
+        with open(path, "r", encoding="utf-8") as file:
+            for line_number, line in enumerate(file, start=1):
+                signature = parse_signature_line(line, line_number)
+                if signature:
+                    re.compile(signature.pattern, regex_flags(signature.flags))
+                    signatures.append(signature)
+        log_msg(f"Compiled {len(signatures)} service signatures from {path}", "DEBUG")
+
+        if use_cache:
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(temporary_path, "w", encoding="utf-8") as file:
+                    json.dump({"key": key, "signatures": signatures}, file)
+                os.replace(temporary_path, cache_path)
+            except OSError as e:
+                log_msg(f"Could not write signature cache {cache_path}: {e}", "DEBUG")
+        return cls(signatures)
+
+
+Matcher: SignatureMatcher | None = None
+
+
+def init_signatures(args: argparse.Namespace):
+    """
+    Loads and compiles the signature database given by the --service-db argument.
+    """
+    global Matcher
+    Matcher = SignatureMatcher.load(args.service_db)
+
+
+def match_signature(banner: str) -> ServiceMatch | None:
+    """
+    Matches a banner against the loaded signature database, loading the bundled one on first use.
+    """
+    global Matcher
+    if Matcher is None:
+        Matcher = SignatureMatcher.load()
+    return Matcher.match(banner)
@@ -0,0 +1,189 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+from typing import Iterable
+from logger import log_msg
+from results import ResultWriter, ScanResult, Writers
+from timing import record_rtt
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS port_states (
+    host TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    technique TEXT NOT NULL,
+    state TEXT NOT NULL,
+    rtt REAL,
+    service TEXT,
+    scanned_at REAL NOT NULL,
+    PRIMARY KEY (host, port, technique)
+);
+CREATE INDEX IF NOT EXISTS port_states_by_state ON port_states (state, host);
+CREATE INDEX IF NOT EXISTS port_states_by_age ON port_states (scanned_at);
+"""
+
+# Common port state of the technique results that name it differently, the other results are port states already
+PORT_STATES: dict[str, str] = {
+    "Filtered or Dropped": "Filtered",
+    "Filtered or No Response": "Filtered",
+    "Filtered or No response": "Filtered",
+    "Filtered or Unexpected Response": "Filtered",
+    "Unexpected TCP Flags": "Unknown",
+}
+
+
+def port_state(result: str) -> str:
+    """
+    Returns the common port state of a technique result, so results of different techniques compare.
+    """
+    return PORT_STATES.get(result, result)
+
+
+class StateCache(ResultWriter):
+    """
+    SQLite cache of the port states of previous scans, keyed by (host, port, technique).
+
+    Every recorded result is upserted into the cache. Entries older than the TTL are purged when the cache
+    is opened, so only recent states are trusted. Before overwriting a state, the previous port state
+    is compared with the new one, each change is logged and streamed to the diff file as soon as it is found.
+
+    Usage example:
+        cache = StateCache("scans.db", ttl=3600)
+        cache.known_open_ports(["192.168.1.1"])  # [("192.168.1.1", 22), ...]
+        # Logs "Host 192.168.1.1 Port 22: Open -> Closed"
+        cache.write(ScanResult("192.168.1.1", 22, "half_open", "Closed"))
+        cache.close()
+    """
+
+    COMMIT_INTERVAL = 100
+
+    def __init__(self, path: str, ttl: float, diff_path: str | None = None):
+        self.path = path
+        self.ttl = ttl
+        self.diff_path = diff_path
+        self.diff_file = open(diff_path, "w", encoding="utf-8") if diff_path else None
+        self.change_count = 0
+        self._pending = 0
+        # Results are written by the scan threads, record_result serializes the writes
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        expired = self.connection.execute("DELETE FROM port_states WHERE scanned_at < ?", (time.time() - ttl,))
+        self.connection.commit()
+        log_msg(f"State cache {path}: purged {expired.rowcount} expired state(s)", "DEBUG")
+
+    def previous_state(self, result: ScanResult) -> tuple[str, str | None] | None:
+        """
+        Returns the cached (state, service) of the port of a result, None if the port is not cached.
+        Port states are compared across techniques through their common port state, the most recent one wins.
+        """
+        if result.technique == "service":
+            query = "SELECT state, service FROM port_states WHERE host = ? AND port = ? AND technique = 'service'"
+        else:
+            query = (
+                "SELECT state, service FROM port_states WHERE host = ? AND port = ? AND technique != 'service' "
+                "ORDER BY scanned_at DESC LIMIT 1"
+            )
+        return self.connection.execute(query, (result.host, result.port)).fetchone()
+
+    def known_open_ports(self, hosts: Iterable[str]) -> list[tuple[str, int]]:
+        """
+        Returns the (host, port) pairs of the given hosts whose most recent cached state is Open.
+        """
+        hosts = set(hosts)
+        rows = self.connection.execute(
+            "SELECT host, port FROM port_states AS latest WHERE state = 'Open' AND technique != 'service' "
+            "AND scanned_at = (SELECT MAX(scanned_at) FROM port_states WHERE host = latest.host "
+            "AND port = latest.port AND technique != 'service') ORDER BY host, port"
+        )
+        return [(host, port) for host, port in rows if host in hosts]
+
+    def cached_rtts(self) -> dict[str, float]:
+        """
+        Returns the most recent smoothed RTT of every cached host.
+        """
+        # SQLite takes the bare rtt column from the row holding MAX(scanned_at)
+        rows = self.connection.execute(
+            "SELECT host, rtt, MAX(scanned_at) FROM port_states WHERE rtt IS NOT NULL GROUP BY host"
+        )
+        return {host: rtt for host, rtt, _ in rows}
+
+    def write(self, result: ScanResult):
+        previous = self.previous_state(result)
+        if result.technique == "service":
+            changed = previous is None or previous[1] != result.service
+            change = (None if previous is None else previous[1], result.service)
+        else:
+            changed = port_state(result.state) != (None if previous is None else port_state(previous[0]))
+            change = (None if previous is None else port_state(previous[0]), port_state(result.state))
+        if changed and (previous is not None or result.state == "Open"):
+            self.write_change(result, *change)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO port_states VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (result.host, result.port, result.technique, result.state, result.rtt, result.service, time.time()),
+        )
+        self._pending += 1
+        if self._pending >= self.COMMIT_INTERVAL:
+            self.connection.commit()
+            self._pending = 0
+
+    def write_change(self, result: ScanResult, previous: str | None, current: str | None):
+        """
+        Logs a state change and writes it as a JSON line to the diff file, if one is given.
+        """
+        self.change_count += 1
+        label = "Service" if result.technique == "service" else "Port"
+        log_msg(f"Host {result.host} {label} {result.port}: {previous} -> {current}")
+        if self.diff_file:
+            change = {
+                "host": result.host,
+                "port": result.port,
+                "technique": result.technique,
+                "previous": previous,
+                "current": current,
+            }
+            self.diff_file.write(json.dumps(change) + "\n")
+            self.diff_file.flush()
+
+    def close(self):
+        """
+        Commits the cache and closes the diff file.
+        """
+        self.connection.commit()
+        self.connection.close()
+        if self.diff_file:
+            self.diff_file.close()
+        log_msg(f"{self.change_count} state change(s) since the last scan")
+
+
+Cache: StateCache | None = None
+
+
+def init_state_cache(args: argparse.Namespace):
+    """
+    Opens the state cache given by --cache and seeds the RTT estimates with the cached RTTs,
+    so the first probes of known hosts already use adaptive timeouts.
+    """
+    global Cache
+    if not args.cache:
+        return
+    Cache = StateCache(args.cache, args.cache_ttl, args.diff_output)
+    for host, rtt in Cache.cached_rtts().items():
+        record_rtt(host, rtt)
+    Writers.append(Cache)
+
+
+def known_open_ports(hosts: Iterable[str], ports: Iterable[int]) -> list[tuple[str, int]]:
+    """
+    Returns the cached opened (host, port) pairs among the hosts and ports to scan, empty if no cache is open.
+    """
+    if Cache is None:
+        return []
+    return [(host, port) for host, port in Cache.known_open_ports(hosts) if port in ports]
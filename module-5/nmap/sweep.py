@@ -0,0 +1,237 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+from collections import deque
+import hashlib
+import os
+import random
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Iterable, Iterator, NamedTuple
+from scapy.config import conf
+from scapy.layers.inet import IP, TCP, IPerror, TCPerror
+from scapy.sendrecv import AsyncSniffer
+from logger import log_msg
+from timing import get_probe_timeout
+import rate_limiter
+from metrics import Metrics
+from scapy_utils import SYN_OPTIONS
+from udp_sweep import UdpSweepEngine
+from scans import (
+    classify_half_open_response,
+    classify_tcp_fin_response,
+    classify_tcp_null_response,
+    classify_tcp_xmas_response,
+)
+
+
+class BatchTechnique(NamedTuple):
+    """
+    Describes a scan technique the sweep engine can run.
+
+    Attributes:
+        flags (str): TCP flags of the probe.
+        classify (Callable): Classifier from scans.py turning a reply (or None) into a port state.
+    """
+
+    flags: str
+    classify: Callable
+
+
+BATCH_TECHNIQUES: dict[str, BatchTechnique] = {
+    "half_open": BatchTechnique("S", classify_half_open_response),
+    "fin": BatchTechnique("F", classify_tcp_fin_response),
+    "null": BatchTechnique("", classify_tcp_null_response),
+    "xmas": BatchTechnique("FPU", classify_tcp_xmas_response),
+}
+
+# Seconds between two checks for replies and timed out probes once all probes are sent
+POLL_INTERVAL = 0.05
+
+
+class SweepEngine:
+    """
+    Stateless batched TCP scan engine.
+
+    A single sender loop writes one probe per (host, port) pair through one layer 3 socket,
+    while a single sniffer collects the replies. Probes carry a sequence number cookie derived
+    from (dst, sport, dport) and a per-sweep secret, so replies are validated from their own
+    headers without waiting on each probe like sr1() does. Only the probes in flight are kept in memory,
+    each target is yielded as soon as its reply arrives or its probe timed out.
+
+    Usage example:
+        engine = SweepEngine("half_open")
+        for target, state in engine.run([("192.168.1.1", 22), ("192.168.1.1", 80)]):
+            print(target, state)
+        # ("192.168.1.1", 80) Closed
+        # ("192.168.1.1", 22) Open
+    """
+
+    def __init__(self, technique: str, timeout: float | None = None, src_port: int | None = None):
+        """
+        Args:
+            technique (str): One of the BATCH_TECHNIQUES keys.
+            timeout (float, optional): Seconds to wait for the reply of each probe.
+            Defaults to the adaptive probe timeout of the probed host.
+            src_port (int, optional): Source port of all probes. Random ephemeral port if not given.
+        """
+        if technique not in BATCH_TECHNIQUES:
+            raise ValueError(f"Invalid sweep technique: {technique}. Allowed are {list(BATCH_TECHNIQUES)}.")
+        self.technique = technique
+        self.flags, self.classify = BATCH_TECHNIQUES[technique]
+        self.timeout = timeout
+        self.src_port = src_port or random.randint(32768, 60999)
+        # SYN and FIN consume one sequence number, so the reply acknowledges cookie + 1
+        self.ack_offset = 1 if ("S" in self.flags or "F" in self.flags) else 0
+        self._secret = os.urandom(16)
+        # Send time and target hosts of each probe awaiting its reply, by (IP, port), and the replies not yielded yet
+        self._in_flight: dict[tuple[str, int], tuple[float, tuple[str, ...]]] = {}
+        self._replies: dict[tuple[str, int], object] = {}
+        self._lock = threading.Lock()
+
+    def _cookie(self, dst_ip: str, dst_port: int) -> int:
+        """
+        Returns the 32 bit sequence number cookie for a probe.
+        """
+        digest = hashlib.blake2b(
+            f"{dst_ip}:{self.src_port}:{dst_port}".encode(), digest_size=4, key=self._secret
+        ).digest()
+        return struct.unpack("!I", digest)[0]
+
+    def _is_reply(self, packet) -> bool:
+        """
+        Cheap pre-filter for the sniffer, keeps only packets addressed to our source port.
+        """
+        if packet.haslayer(TCP):
+            return packet[TCP].dport == self.src_port
+        return packet.haslayer(TCPerror) and packet[TCPerror].sport == self.src_port
+
+    def _on_reply(self, packet):
+        """
+        Matches a sniffed reply to its probe by (dst, sport, dport, seq cookie).
+        """
+        if packet.haslayer(TCPerror) and packet.haslayer(IPerror):
+            # ICMP error quoting our probe: the quoted header carries the original cookie
+            dst_ip, dst_port = packet[IPerror].dst, packet[TCPerror].dport
+            valid = packet[TCPerror].seq == self._cookie(dst_ip, dst_port)
+        elif packet.haslayer(TCP):
+            dst_ip, dst_port = packet[IP].src, packet[TCP].sport
+            expected_ack = (self._cookie(dst_ip, dst_port) + self.ack_offset) & 0xFFFFFFFF
+            valid = packet[TCP].ack == expected_ack
+        else:
+            return
+
+        if not valid:
+            log_msg(f"Dropped reply with invalid cookie from {dst_ip}:{dst_port}", "DEBUG")
+            return
+
+        with self._lock:
+            # Replies to probes already decided, e.g. retransmitted SYN+ACKs, are dropped
+            if (dst_ip, dst_port) in self._in_flight:
+                self._replies.setdefault((dst_ip, dst_port), packet)
+
+    def _decide(self, deadlines: deque[tuple[float, tuple[str, int]]]) -> Iterator[tuple[tuple[str, int], str]]:
+        """
+        Yields the targets answered since the last call, then the targets whose probe timed out.
+        The targets are yielded with the host given by the caller, e.g. a hostname, not the probed IP.
+
+        Args:
+            deadlines (deque[tuple[float, tuple[str, int]]]): Monotonic reply deadline of each probe, in send order.
+        """
+        now = time.monotonic()
+        if not self._replies and not (deadlines and deadlines[0][0] <= now):
+            return
+        with self._lock:
+            replies, self._replies = self._replies, {}
+            probes = {target: self._in_flight.pop(target) for target in replies}
+        for (dst_ip, port), reply in replies.items():
+            sent_at, hosts = probes[dst_ip, port]
+            Metrics.probe_answered(self.technique, max(0.0, float(reply.time) - sent_at))
+            rate_limiter.record_probe(True)
+            for host in hosts:
+                yield (host, port), self.classify(host, port, reply)
+
+        while deadlines and deadlines[0][0] <= now:
+            _, (dst_ip, port) = deadlines.popleft()
+            with self._lock:
+                _, hosts = self._in_flight.pop((dst_ip, port), (None, ()))
+            if hosts:
+                Metrics.probe_timed_out(self.technique)
+                rate_limiter.record_probe(False)
+            for host in hosts:
+                yield (host, port), self.classify(host, port, None)
+
+    def run(self, targets: Iterable[tuple[str, int]]) -> Iterator[tuple[tuple[str, int], str]]:
+        """
+        Sends one probe for each target and yields the port state of each target as soon as it is decided,
+        while the next probes are being sent.
+
+        Args:
+            targets (Iterable[tuple[str, int]]): (host, port) pairs to probe.
+
+        Yields:
+            tuple[tuple[str, int], str]: (host, port) pair as given in targets and its port state.
+        """
+        sniffing = threading.Event()
+        sniffer = AsyncSniffer(
+            lfilter=self._is_reply, prn=self._on_reply, store=False, started_callback=sniffing.set
+        )
+        sniffer.start()
+        sniffing.wait(2)
+        deadlines: deque[tuple[float, tuple[str, int]]] = deque()
+        resolved: dict[str, str] = {}
+        options = SYN_OPTIONS if self.flags == "S" else []
+        template = IP() / TCP(sport=self.src_port, flags=self.flags, options=options)
+        sock = conf.L3socket()
+        start = time.monotonic()
+        sent = 0
+        try:
+            for host, port in targets:
+                if host not in resolved:
+                    resolved[host] = socket.gethostbyname(host)
+                dst_ip = resolved[host]
+                template[IP].dst = dst_ip
+                template[TCP].dport = port
+                template[TCP].seq = self._cookie(dst_ip, port)
+                rate_limiter.acquire()
+                with self._lock:
+                    # Hostnames resolving to the same IP share the probe
+                    _, hosts = self._in_flight.get((dst_ip, port), (None, ()))
+                    self._in_flight[dst_ip, port] = (time.time(), hosts + (host,))
+                sock.send(template)
+                sent += 1
+                Metrics.probe_sent(self.technique)
+                timeout = self.timeout if self.timeout is not None else get_probe_timeout(dst_ip)
+                deadlines.append((time.monotonic() + timeout, (dst_ip, port)))
+                yield from self._decide(deadlines)
+            sent_in = time.monotonic() - start
+            log_msg(f"Sent {sent} {self.technique} probes in {sent_in:.2f}s", "DEBUG")
+            log_msg(rate_limiter.rate_status(), "DEBUG")
+            while self._in_flight:
+                time.sleep(min(POLL_INTERVAL, max(0.0, deadlines[0][0] - time.monotonic())))
+                yield from self._decide(deadlines)
+        finally:
+            sock.close()
+            sniffer.stop()
+
+
+def sweep_scan(targets: Iterable[tuple[str, int]], technique: str) -> Iterator[tuple[tuple[str, int], str]]:
+    """
+    Scans all given (host, port) pairs through the batched sweep engine, in the order they are given.
+
+    Args:
+        targets (Iterable[tuple[str, int]]): (host, port) pairs to scan, usually interleaved across the hosts.
+        technique (str): One of the BATCH_TECHNIQUES keys, or udp for the UDP sweep engine.
+
+    Yields:
+        tuple[tuple[str, int], str]: (host, port) pair as given in targets and its port state, as soon as it is decided.
+    """
+    log_msg(f"Sweeping ports with {technique} technique...")
+    engine = UdpSweepEngine() if technique == "udp" else SweepEngine(technique)
+    return engine.run(targets)
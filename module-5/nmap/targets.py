@@ -0,0 +1,145 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+import ipaddress
+import re
+from typing import Iterable, Iterator
+from logger import log_msg
+
+
+# 10.0.0.1-50 (last octet range) or 10.0.0.1-10.0.0.50 (full address range)
+IP_RANGE_REGEX = re.compile(r"^(\d{1,3}(?:\.\d{1,3}){3})-(\d{1,3}|\d{1,3}(?:\.\d{1,3}){3})$")
+HOSTNAME_LABEL = r"[A-Za-z0-9](?:[A-Za-z0-9-]{0,62}[A-Za-z0-9])?"
+# The top level label is never all-numeric (RFC 3696), so a mistyped IP like 10.0.0.999 is no hostname
+HOSTNAME_REGEX = re.compile(rf"^(?:{HOSTNAME_LABEL}\.)*(?![0-9]+\.?$){HOSTNAME_LABEL}\.?$")
+
+
+def parse_ip_range(expression: str) -> tuple[ipaddress.IPv4Address, ipaddress.IPv4Address] | None:
+    """
+    Parses an IP range expression into its first and last address.
+
+    Args:
+        expression (str): Range like 10.0.0.1-50 or 10.0.0.1-10.0.0.50.
+
+    Raises:
+        ValueError: If the range is not valid.
+
+    Returns:
+        tuple | None: First and last address, None if the expression is no range.
+    """
+    match = IP_RANGE_REGEX.match(expression)
+    if not match:
+        return None
+    first = ipaddress.IPv4Address(match.group(1))
+    end = match.group(2)
+    if "." not in end:
+        end = f"{match.group(1).rsplit('.', 1)[0]}.{end}"
+    last = ipaddress.IPv4Address(end)
+    if first > last:
+        raise ValueError(f"Invalid IP range: Start address {first} can not be greater then end address {last}")
+    return first, last
+
+
+def validate_target_expression(expression: str) -> str:
+    """
+    Validates a target expression without expanding it.
+
+    Accepted formats:
+        - IP address. Ex.: 192.168.1.1
+        - CIDR network. Ex.: 192.168.1.0/24
+        - IP range. Ex.: 192.168.1.1-50, 192.168.1.1-192.168.2.50
+        - DNS name. Ex.: your-domain.com
+
+    Args:
+        expression (str): Target expression to validate.
+
+    Raises:
+        argparse.ArgumentTypeError: If validation fails.
+
+    Returns:
+        str: The validated expression.
+    """
+    try:
+        if "/" in expression:
+            ipaddress.ip_network(expression, strict=False)
+        elif parse_ip_range(expression) is None and not HOSTNAME_REGEX.match(expression):
+            try:
+                # Addresses are no hostnames, their top level label is numeric
+                ipaddress.IPv4Address(expression)
+            except ValueError:
+                raise ValueError(f"Invalid target: {expression} is no IP address, network, IP range or DNS name")
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return expression
+
+
+def expand_target_expression(expression: str) -> Iterator[str]:
+    """
+    Lazily expands a target expression into single hosts.
+
+    Args:
+        expression (str): IP address, CIDR network, IP range or DNS name.
+
+    Yields:
+        str: One host (IP- or DNS-Address) at a time.
+    """
+    if "/" in expression:
+        network = ipaddress.ip_network(expression, strict=False)
+        # hosts() skips network and broadcast address, but a /32 or /31 has no such addresses
+        hosts = network.hosts() if network.num_addresses > 2 else iter(network)
+        for address in hosts:
+            yield str(address)
+        return
+
+    ip_range = parse_ip_range(expression)
+    if ip_range:
+        first, last = ip_range
+        for address in range(int(first), int(last) + 1):
+            yield str(ipaddress.IPv4Address(address))
+        return
+
+    yield expression
+
+
+def read_targets_file(path: str) -> Iterator[str]:
+    """
+    Lazily reads target expressions from a file, one or more per line separated by whitespace or commas.
+    Empty lines and lines starting with # are ignored.
+
+    Args:
+        path (str): Path of the targets file.
+
+    Yields:
+        str: One target expression at a time.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.split("#", 1)[0]
+            for expression in re.split(r"[\s,]+", line.strip()):
+                if expression:
+                    yield validate_target_expression(expression)
+
+
+def iter_targets(expressions: Iterable[str], input_file: str | None = None) -> Iterator[str]:
+    """
+    Lazily expands all target expressions given on the command line and in the targets file.
+
+    Args:
+        expressions (Iterable[str]): Target expressions, each may hold several separated by commas.
+        input_file (str, optional): Path of a targets file.
+
+    Yields:
+        str: One host (IP- or DNS-Address) at a time.
+    """
+    for expression in expressions:
+        for part in filter(None, expression.split(",")):
+            yield from expand_target_expression(part)
+    if input_file:
+        log_msg(f"Reading targets from {input_file}", "DEBUG")
+        for expression in read_targets_file(input_file):
+            yield from expand_target_expression(expression)
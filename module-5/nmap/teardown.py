@@ -0,0 +1,142 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, NamedTuple
+from logger import log_msg
+
+# Seconds a teardown may wait in the queue for others to be sent together with it
+TEARDOWN_DELAY = 0.05
+# Most teardowns sent together through one socket
+TEARDOWN_BATCH_SIZE = 64
+
+
+class Teardown(NamedTuple):
+    """
+    Closes one connection a scan opened on the target.
+
+    Attributes:
+        dst_ip (str): The target IP address.
+        dst_port (int): The target port number.
+        src_port (int): Source port of the probe the target answered.
+        seq (int): Sequence number the target expects next, the acknowledgment number of its SYN+ACK.
+        ack (int): Sequence number of the SYN+ACK plus one.
+        handshake (bool): Completes the handshake with an ACK before the RST, as a full TCP connect does.
+    """
+
+    dst_ip: str
+    dst_port: int
+    src_port: int
+    seq: int
+    ack: int
+    handshake: bool = False
+
+
+class TeardownQueue:
+    """
+    Sends the teardowns of opened connections in the background, so the scan workers go straight on
+    to the next probe instead of waiting for their RST to be sent.
+
+    A single sender thread collects the queued teardowns for up to TEARDOWN_DELAY seconds
+    or TEARDOWN_BATCH_SIZE teardowns and sends each batch at once.
+
+    Usage example:
+        teardowns = TeardownQueue(send_teardowns)
+        teardowns.put(Teardown("192.168.1.1", 80, 40000, seq=1001, ack=5001))
+        teardowns.flush()
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[list[Teardown]], None],
+        delay: float = TEARDOWN_DELAY,
+        batch_size: int = TEARDOWN_BATCH_SIZE,
+    ):
+        """
+        Args:
+            send_batch (Callable[[list[Teardown]], None]): Sends the segments of a batch of teardowns.
+            delay (float): Seconds a teardown may wait for others to be sent together with it.
+            batch_size (int): Most teardowns sent together.
+        """
+        self.send_batch = send_batch
+        self.delay = delay
+        self.batch_size = batch_size
+        self.sent = 0
+        self._queue: queue.Queue[Teardown] = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def put(self, teardown: Teardown):
+        """
+        Queues a teardown without blocking.
+        """
+        self._queue.put(teardown)
+
+    def flush(self):
+        """
+        Blocks until all queued teardowns are sent.
+        """
+        self._queue.join()
+
+    def _next_batch(self) -> list[Teardown]:
+        """
+        Waits for a teardown, then collects the teardowns queued within the delay, up to the batch size.
+        """
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.delay
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """
+        Sender loop, sends one batch at a time.
+        """
+        while True:
+            batch = self._next_batch()
+            try:
+                self.send_batch(batch)
+                self.sent += len(batch)
+                log_msg(f"Sent {len(batch)} connection teardowns", "DEBUG")
+            except Exception as e:
+                log_msg(f"Sending {len(batch)} connection teardowns failed: {e}", "ERROR")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+Teardowns: TeardownQueue | None = None
+_lock = threading.Lock()
+
+
+def queue_teardown(teardown: Teardown):
+    """
+    Queues a teardown on the teardown queue, starting its sender thread on first use.
+    """
+    global Teardowns
+    with _lock:
+        if Teardowns is None:
+            # The packet backends import scapy, loaded once the first connection is torn down
+            from scapy_utils import send_teardowns
+
+            Teardowns = TeardownQueue(send_teardowns)
+    Teardowns.put(teardown)
+
+
+def flush_teardowns():
+    """
+    Blocks until all queued teardowns are sent, e.g. before the scan exits.
+    """
+    if Teardowns is not None:
+        Teardowns.flush()
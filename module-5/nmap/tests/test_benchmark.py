@@ -0,0 +1,38 @@
+import unittest
+from benchmarks.benchmark import main, parse_args, possible_states, run_benchmark
+from benchmarks import startup
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_possible_states(self):
+        # Test ambiguous results being consistent with several ground truth states
+        self.assertEqual(possible_states("Open"), {"open"})
+        self.assertEqual(possible_states("Open or Filtered"), {"open", "filtered"})
+        self.assertEqual(possible_states("Unfiltered"), {"open", "closed"})
+        self.assertEqual(possible_states("Filtered or Dropped"), {"filtered"})
+        self.assertEqual(possible_states("Closed or Filtered"), {"closed", "filtered"})
+        self.assertEqual(possible_states(False), {"closed", "filtered"})
+
+    def test_simulated_network(self):
+        # Test the decided port states against the ground truth of the simulated network
+        techniques = ["ack", "null", "is_port_opened", "joint"]
+        args = parse_args(["--hosts", "1", "--ports", "40", "-T", "5", "--techniques", *techniques])
+        results = {result.technique: result for result in run_benchmark(args)}
+        self.assertEqual(results["is_port_opened"].accuracy, 1.0)
+        self.assertEqual(results["null"].accuracy, 1.0)
+        self.assertEqual(results["joint"].accuracy, 1.0)
+        self.assertEqual(results["ack"].packets_per_port, 1.0)
+        self.assertGreater(results["ack"].ports_per_second, 0)
+
+    def test_raw_backend(self):
+        # Test the raw socket backend exchanging its byte templates with the simulated network
+        self.assertEqual(main(["--hosts", "1", "--ports", "20", "--backend", "raw", "--techniques", "fin"]), 0)
+
+    def test_startup(self):
+        # Test the argument validation answering without loading scapy, the budget is generous for slow CI machines
+        self.assertFalse(any(module.startswith("scapy") for module in startup.startup_modules()))
+        self.assertEqual(startup.main(["--runs", "1", "--budget", "5"]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
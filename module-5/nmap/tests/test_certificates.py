@@ -0,0 +1,69 @@
+import unittest
+from certificates import CertificateNames, parse_alt_names, parse_certificate_names
+
+
+def der(tag: int, *values: bytes) -> bytes:
+    # Encodes a DER element, with the long form length for values of 128 bytes and more
+    value = b"".join(values)
+    if len(value) < 0x80:
+        return bytes([tag, len(value)]) + value
+    length = len(value).to_bytes((len(value).bit_length() + 7) // 8, "big")
+    return bytes([tag, 0x80 | len(length)]) + length + value
+
+
+def name(common_name: str) -> bytes:
+    # Name with a single common name attribute
+    return der(0x30, der(0x31, der(0x30, der(0x06, bytes.fromhex("550403")), der(0x0C, common_name.encode()))))
+
+
+def certificate(subject: str, issuer: str, alt_names: bytes) -> bytes:
+    extension = der(0x30, der(0x06, bytes.fromhex("551d11")), der(0x04, der(0x30, alt_names)))
+    tbs_certificate = der(
+        0x30,
+        der(0xA0, der(0x02, b"\x02")),  # version v3
+        der(0x02, b"\x01"),  # serial number
+        der(0x30, der(0x06, bytes.fromhex("2a864886f70d01010b"))),  # sha256WithRSAEncryption
+        name(issuer),
+        der(0x30),  # validity
+        name(subject),
+        der(0x30),  # subject public key info
+        der(0xA3, der(0x30, extension)),
+    )
+    return der(0x30, tbs_certificate, der(0x30), der(0x03, b"\x00"))
+
+
+class TestCertificates(unittest.TestCase):
+    def test_certificate_names(self):
+        # Test the subject, issuer and subject alternative names of a well-formed certificate
+        alt_names = der(0x82, b"scanme.test") + der(0x87, bytes([127, 0, 0, 1])) + der(0x82, b"a" * 200)
+        names = parse_certificate_names(certificate("scanme.test", "Test CA", alt_names))
+        self.assertEqual(names, CertificateNames("scanme.test", "Test CA", ("scanme.test", "127.0.0.1", "a" * 200)))
+
+    def test_malformed_certificates(self):
+        # Test every malformed certificate raising ValueError, the only error service detection handles
+        valid = certificate("scanme.test", "Test CA", der(0x82, b"scanme.test"))
+        malformed = [
+            b"",
+            valid[:-1],
+            valid[:40],
+            der(0x30, der(0x30)),
+            der(0x30, der(0x30, der(0x02, b"\x01"))),
+            b"\x30\x80" + valid[2:],  # indefinite length
+            certificate("scanme.test", "Test CA", b"\x82\x05abc"),
+            valid.replace(name("Test CA"), der(0x30, der(0x31, der(0x30, der(0x06, bytes.fromhex("550403")))))),
+        ]
+        for data in malformed:
+            with self.assertRaises(ValueError):
+                parse_certificate_names(data)
+
+    def test_malformed_extensions(self):
+        # Test an empty Extension SEQUENCE and an extension without a value
+        with self.assertRaises(ValueError):
+            parse_alt_names(bytes([0x30, 0x02, 0x30, 0x00]))
+        with self.assertRaises(ValueError):
+            parse_alt_names(der(0x30, der(0x30, der(0x06, bytes.fromhex("551d11")))))
+        self.assertEqual(parse_alt_names(der(0x30)), ())
+
+
+if __name__ == "__main__":
+    unittest.main()
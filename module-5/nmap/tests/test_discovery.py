@@ -0,0 +1,46 @@
+import unittest
+from array import array
+from unittest.mock import patch
+from discovery import HostDiscoveryEngine, LiveHostBitmap
+from metrics import ScanMetrics
+
+
+class TestDiscoveryMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = ScanMetrics()
+        patcher = patch("discovery.Metrics", self.metrics)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.engine = HostDiscoveryEngine()
+        self.engine.addresses = ["10.0.0.1", "10.0.0.2"]
+        self.engine.live = LiveHostBitmap(2)
+        self.engine._index = {"10.0.0.1": 0, "10.0.0.2": 1}
+        self.engine._sent_at = array("d", bytes(16))
+
+    def send_round(self):
+        with patch.object(HostDiscoveryEngine, "_send_icmp", return_value=True):
+            self.engine._send_round(None, {}, {})
+
+    def test_one_outcome_per_probe(self):
+        # Test duplicate and late replies being ignored and the unanswered probes timing out once
+        self.send_round()
+        self.engine._mark("10.0.0.1", "ping", 0.0)
+        self.engine._mark("10.0.0.1", "ping", 0.0)
+        self.engine._time_out_pending()
+        self.engine._mark("10.0.0.1", "timestamp", 0.0)
+
+        self.engine._round = 1
+        self.send_round()
+        self.engine._mark("10.0.0.2", "timestamp", 0.0)
+        self.engine._time_out_pending()
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["probes"], {"ping": 3, "timestamp": 3})
+        self.assertEqual(snapshot["replies"], {"ping": 1, "timestamp": 1})
+        self.assertEqual(snapshot["timeouts"], {"ping": 2, "timestamp": 2})
+        self.assertEqual(snapshot["in_flight"], 0)
+        self.assertEqual(list(self.engine.live), [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
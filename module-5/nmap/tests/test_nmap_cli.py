@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from init import init
+from port_set import PortsByFrequency
+
+
+class TestNmapCLI(unittest.TestCase):
+    @patch("sys.argv", ["nmap.py", "-p", "20-25,80", "-a", "127.0.0.1"])
+    def test_port_list(self):
+        # Test comma separated ports and ranges, iterated in probability order
+        args = init()
+        self.assertEqual(len(args.port_set), 7)
+        self.assertIn(22, args.port_set)
+        self.assertNotIn(26, args.port_set)
+        self.assertEqual(list(args.port_set), [80, 23, 21, 22, 25, 20, 24])
+
+    @patch("sys.argv", ["nmap.py", "-p", "-", "--exclude-ports", "0-1023", "-a", "127.0.0.1"])
+    def test_exclude_ports(self):
+        # Test excluding the well-known ports from all ports
+        args = init()
+        self.assertEqual(len(args.port_set), 65536 - 1024)
+        self.assertNotIn(80, args.port_set)
+        self.assertEqual(next(iter(args.port_set)), 3389)
+
+    @patch("sys.argv", ["nmap.py", "--top-ports", "3", "-a", "127.0.0.1"])
+    def test_top_ports(self):
+        # Test the most frequently open ports, without a port specification
+        args = init()
+        self.assertEqual(list(args.port_set), [80, 23, 443])
+
+    @patch("sys.argv", ["nmap.py", "-p", "1-1000", "--top-ports", "2", "--exclude-ports", "80", "-a", "127.0.0.1"])
+    def test_top_ports_of_port_list(self):
+        # Test the most frequently open ports among the specified and not excluded ports
+        args = init()
+        self.assertEqual(list(args.port_set), [23, 443])
+
+    @patch("sys.argv", ["nmap.py", "--top-ports", "100000", "-a", "127.0.0.1"])
+    def test_top_ports_beyond_frequency_table(self):
+        # Test the top ports capped at the ports of the frequency table
+        args = init()
+        self.assertEqual(len(args.port_set), len(PortsByFrequency))
+
+    @patch("sys.argv", ["nmap.py", "-p", "80", "--exclude-ports", "80", "-a", "127.0.0.1"])
+    def test_no_ports_left(self):
+        with self.assertRaises(SystemExit):  # parser.error causes SystemExit
+            init()
+
+    def test_invalid_arguments_keep_outputs(self):
+        # Test an invalid command line leaving the outputs of an earlier scan untouched
+        with tempfile.TemporaryDirectory() as directory:
+            outputs = {
+                option: os.path.join(directory, name)
+                for option, name in [
+                    ("-oJ", "out.jsonl"),
+                    ("-oC", "out.csv"),
+                    ("-oX", "out.xml"),
+                    ("--checkpoint", "scan.checkpoint"),
+                    ("--diff-output", "changes.jsonl"),
+                ]
+            }
+            paths = list(outputs.values()) + [f"{outputs['--checkpoint']}.results"]
+            for path in paths:
+                with open(path, "w", encoding="utf-8") as file:
+                    file.write("precious")
+            argv = ["nmap.py", "-p", "80", "--exclude-ports", "80", "-a", "127.0.0.1", "--cache", ":memory:"]
+            argv += [value for option, path in outputs.items() for value in (option, path)]
+            with patch("sys.argv", argv), self.assertRaises(SystemExit):
+                init()
+            for path in paths:
+                with open(path, encoding="utf-8") as file:
+                    self.assertEqual(file.read(), "precious")
+
+    @patch("sys.argv", ["nmap.py", "-p", "80,70000", "-a", "127.0.0.1"])
+    def test_invalid_port(self):
+        with self.assertRaises(SystemExit):  # argparse type errors cause SystemExit
+            init()
+
+    @patch("sys.argv", ["nmap.py", "-p", "80", "-a", "10.0.0.999"])
+    def test_mistyped_ip(self):
+        with self.assertRaises(SystemExit):  # an all-numeric name is no hostname
+            init()
+
+    @patch("sys.argv", ["nmap.py", "-a", "127.0.0.1"])
+    def test_missing_ports(self):
+        with self.assertRaises(SystemExit):  # parser.error causes SystemExit
+            init()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+from planner import classify_jointly
+
+
+class TestClassifyJointly(unittest.TestCase):
+    def test_answered_probe_outweighs_missing_reply(self):
+        # Test an unanswered SYN being taken as lost when another probe is answered
+        self.assertEqual(classify_jointly({"half_open": "Filtered or Dropped", "ack": "Unfiltered"}), "Unfiltered")
+        self.assertEqual(classify_jointly({"half_open": "Filtered or Dropped", "fin": "Closed"}), "Closed")
+        self.assertEqual(classify_jointly({"connect": "Filtered or Dropped", "window": "Open"}), "Open")
+
+    def test_missing_replies_combined(self):
+        # Test unanswered probes only narrowing the states of the answered ones
+        unanswered = {"half_open": "Filtered or Dropped", "ack": "Filtered or No Response"}
+        self.assertEqual(classify_jointly(unanswered), "Filtered")
+        self.assertEqual(classify_jointly({"ack": "Unfiltered", "fin": "Open or Filtered"}), "Open")
+        self.assertEqual(classify_jointly({"half_open": "Filtered or Dropped", "ack": "Filtered"}), "Filtered")
+
+    def test_reliability_order(self):
+        # Test a contradicting reply of a less reliable technique being ignored
+        self.assertEqual(classify_jointly({"half_open": "Open", "fin": "Closed"}), "Open")
+        self.assertEqual(classify_jointly({"half_open": "Closed", "ack": "Unfiltered"}), "Closed")
+
+    def test_pending_techniques(self):
+        # Test the state being final once more reliable replies settle it, whatever the pending techniques
+        self.assertEqual(classify_jointly({"half_open": "Open"}, pending=["ack"]), "Open")
+        self.assertIsNone(classify_jointly({"half_open": "Filtered or Dropped"}, pending=["ack"]))
+        self.assertIsNone(classify_jointly({"ack": "Unfiltered"}, pending=["half_open"]))
+        self.assertIsNone(classify_jointly({"fin": "Closed"}, pending=["half_open"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,15 @@
+import unittest
+from port_set import PortSet
+
+
+class TestPortSet(unittest.TestCase):
+    def test_intersection_size(self):
+        # Test counting the finished ports of a resumed run that belong to the port set of this run
+        finished = PortSet.parse("1-50")
+        self.assertEqual(finished.intersection_size(PortSet.parse("40-60")), 11)
+        self.assertEqual(finished.intersection_size(PortSet.parse("100-200")), 0)
+        self.assertEqual(finished.intersection_size(PortSet.parse("-")), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+from progress import ProgressReporter
+
+
+class TestProgressReporter(unittest.TestCase):
+    @patch("progress.time.monotonic")
+    def test_snapshot(self, monotonic):
+        # Test the remaining ports, the rate over the recent window and the ETA following it
+        monotonic.return_value = 100.0
+        progress = ProgressReporter(total=1000, completed=100)
+        monotonic.return_value = 104.0
+        progress.advance(200, opened=3)
+        snapshot = progress.snapshot()
+        self.assertEqual(snapshot["completed"], 300)
+        self.assertEqual(snapshot["remaining"], 700)
+        self.assertEqual(snapshot["percent"], 30.0)
+        self.assertEqual(snapshot["rate"], 50.0)
+        self.assertEqual(snapshot["eta"], 14.0)
+        self.assertEqual(snapshot["opened"], 3)
+
+        # The ports scanned before the rate window are left out of the rate
+        monotonic.return_value = 120.0
+        progress.advance(100)
+        snapshot = progress.snapshot()
+        self.assertEqual(snapshot["remaining"], 600)
+        self.assertEqual(snapshot["rate"], 6.2)
+        self.assertEqual(snapshot["eta"], 96.0)
+
+    @patch("progress.time.monotonic", return_value=50.0)
+    def test_snapshot_without_progress(self, monotonic):
+        # Test the ETA being unknown until a port is scanned, and a finished scan
+        progress = ProgressReporter(total=10)
+        self.assertIsNone(progress.snapshot()["eta"])
+        progress.advance(10)
+        monotonic.return_value = 52.0
+        snapshot = progress.snapshot()
+        self.assertEqual(snapshot["remaining"], 0)
+        self.assertEqual(snapshot["eta"], 0.0)
+
+    def test_json_report(self):
+        # Test one JSON object per report in json mode
+        stream = io.StringIO()
+        progress = ProgressReporter(total=4, completed=1, mode="json", stream=stream)
+        progress.report()
+        self.assertEqual(json.loads(stream.getvalue())["remaining"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from signatures import Signature, SignatureMatcher
+
+DATABASE = """
+match http m|^HTTP/1\\.[01] \\d+.*Server: ([\\w-]+)|s p/$1/
+match mongodb m|access MongoDB over HTTP| p/MongoDB/
+match echo m|^(\\w+) \\1$| p/Echo/
+match generic m|^\\w+| p/Generic/
+"""
+
+
+class TestSignatureMatcher(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.database = os.path.join(directory.name, "signatures.txt")
+        with open(self.database, "w", encoding="utf-8") as file:
+            file.write(DATABASE)
+        patcher = patch("signatures.CACHE_DIR", os.path.join(directory.name, "cache"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_file_order_precedence(self):
+        # Test the first signature of the file winning, not the one matching earliest in the banner
+        matcher = SignatureMatcher.load(self.database, use_cache=False)
+        banner = "Welcome, access MongoDB over HTTP"
+        self.assertEqual(matcher.match(banner).service, "mongodb")
+        banner = "HTTP/1.1 200 OK\r\nServer: nginx\r\n\r\naccess MongoDB over HTTP"
+        self.assertEqual(matcher.match(banner).product, "nginx")
+        self.assertEqual(matcher.match("ping ping").service, "echo")
+        self.assertEqual(matcher.match("ping pong").service, "generic")
+        self.assertIsNone(matcher.match("!!"))
+
+    def test_backreference_signatures(self):
+        # Test signatures with backreferences being tried one by one when the combined pass finds nothing
+        matcher = SignatureMatcher([Signature("echo", r"^(\w+) \1$", "", "Echo", "", "")])
+        self.assertEqual(matcher.match("ping ping").product, "Echo")
+        self.assertIsNone(matcher.match("ping pong"))
+
+    def test_cache(self):
+        # Test the parsed signatures being loaded from the cache until the database changes
+        signatures = SignatureMatcher.load(self.database).signatures
+        with patch("signatures.parse_signature_line") as parse:
+            self.assertEqual(SignatureMatcher.load(self.database).signatures, signatures)
+            parse.assert_not_called()
+
+        with open(self.database, "a", encoding="utf-8") as file:
+            file.write("match ftp m|^220| p/FTP/\n")
+        self.assertEqual(len(SignatureMatcher.load(self.database).signatures), len(signatures) + 1)
+
+    def test_broken_cache(self):
+        # Test a broken cache being ignored and rewritten
+        SignatureMatcher.load(self.database)
+        cache_dir = os.path.join(os.path.dirname(self.database), "cache")
+        (cache_file,) = os.listdir(cache_dir)
+        with open(os.path.join(cache_dir, cache_file), "w", encoding="utf-8") as file:
+            file.write("{not json")
+        self.assertEqual(len(SignatureMatcher.load(self.database).signatures), 4)
+        with open(os.path.join(cache_dir, cache_file), encoding="utf-8") as file:
+            self.assertEqual(len(json.load(file)["signatures"]), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+import unittest
+from results import ScanResult
+from state_cache import StateCache
+
+
+class TestStateCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache_path = os.path.join(directory.name, "scans.db")
+        self.diff_path = os.path.join(directory.name, "changes.jsonl")
+
+    def scan(self, *results: ScanResult) -> list[dict]:
+        cache = StateCache(self.cache_path, ttl=3600, diff_path=self.diff_path)
+        for result in results:
+            cache.write(result)
+        cache.close()
+        with open(self.diff_path, encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+
+    def test_technique_change(self):
+        # Test the same port state reported by another technique being no change
+        self.scan(
+            ScanResult("10.0.0.1", 22, "half_open", "Open"),
+            ScanResult("10.0.0.1", 23, "half_open", "Filtered or Dropped"),
+        )
+        changes = self.scan(ScanResult("10.0.0.1", 22, "joint", "Open"), ScanResult("10.0.0.1", 23, "ack", "Filtered"))
+        self.assertEqual(changes, [])
+
+    def test_state_changes(self):
+        # Test new opened ports and changed port states being streamed to the diff file
+        first = self.scan(
+            ScanResult("10.0.0.1", 22, "half_open", "Open"), ScanResult("10.0.0.1", 23, "half_open", "Closed")
+        )
+        self.assertEqual(
+            first, [{"host": "10.0.0.1", "port": 22, "technique": "half_open", "previous": None, "current": "Open"}]
+        )
+        changes = self.scan(ScanResult("10.0.0.1", 22, "ack", "Filtered or No Response"))
+        self.assertEqual(
+            changes, [{"host": "10.0.0.1", "port": 22, "technique": "ack", "previous": "Open", "current": "Filtered"}]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
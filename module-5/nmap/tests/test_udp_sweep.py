@@ -0,0 +1,72 @@
+import unittest
+from udp_sweep import MAX_PROBE_INTERVAL, MIN_PROBE_INTERVAL, HostPacer
+
+E, R = "error", "reply"
+
+
+class TestHostPacer(unittest.TestCase):
+    def test_slow_down(self):
+        # Test the probes being spaced by the interval between two errors, doubled while errors are still dropped
+        pacer = HostPacer()
+        pacer.slow_down(errors=6, seconds=3.0)
+        self.assertEqual(pacer.interval, 0.5)
+        pacer.slow_down(errors=6, seconds=0.6)
+        self.assertEqual(pacer.interval, MAX_PROBE_INTERVAL)
+
+    def test_interval_bounds(self):
+        # Test the interval staying within its bounds, without errors to measure it from
+        pacer = HostPacer()
+        pacer.slow_down(errors=1000, seconds=0.001)
+        self.assertEqual(pacer.interval, MIN_PROBE_INTERVAL)
+        pacer = HostPacer()
+        pacer.slow_down(errors=0, seconds=1.0)
+        self.assertEqual(pacer.interval, MAX_PROBE_INTERVAL)
+
+    def test_sent(self):
+        # Test the next probe waiting for the interval, immediately before rate limiting was detected
+        pacer = HostPacer()
+        pacer.sent(10.0)
+        self.assertEqual(pacer.next_send_at, 10.0)
+        pacer.interval = 0.25
+        pacer.sent(10.0)
+        self.assertEqual(pacer.next_send_at, 10.25)
+
+
+class TestRateLimitDetection(unittest.TestCase):
+    def test_burst_then_silence_then_errors(self):
+        # Test errors stopping after a burst and resuming within the round
+        self.assertTrue(HostPacer().is_rate_limited([E] * 6 + [None] * 20 + [E] + [None] * 5))
+        self.assertTrue(HostPacer().is_rate_limited([E, R, E, E] + [None] * 3 + [E]))
+
+    def test_errors_resumed_in_retry_round(self):
+        # Test a retry round answering ports left silent after a burst with errors again
+        pacer = HostPacer()
+        self.assertFalse(pacer.is_rate_limited([E] * 6 + [None] * 50))
+        self.assertTrue(pacer.is_rate_limited([E] + [None] * 49))
+
+    def test_paced_host(self):
+        # Test a paced host answering every probe staying at its pace, and slowed down again once errors stop
+        pacer = HostPacer()
+        pacer.interval = 0.5
+        self.assertFalse(pacer.is_rate_limited([E] * 10))
+        self.assertFalse(pacer.is_rate_limited([E] * 10))
+        self.assertFalse(pacer.is_rate_limited([E] + [None] * 9))
+        self.assertTrue(pacer.is_rate_limited([E] * 9))
+
+    def test_closed_port_among_filtered_ports(self):
+        # Test the common host profiles without rate limiting
+        profiles = [
+            [[E] + [None] * 100, [None] * 100],
+            [[None] * 50 + [E] + [None] * 50, [None] * 100],
+            [[E] * 3 + [None] * 100, [None] * 100, [None] * 100],
+            [[E] * 6 + [None, None, E]],
+            [[E, E] + [None] * 100, [E] + [None] * 99],
+            [[], []],
+        ]
+        for rounds in profiles:
+            pacer = HostPacer()
+            self.assertEqual([pacer.is_rate_limited(outcomes) for outcomes in rounds], [False] * len(rounds))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+import argparse
+import threading
+import time
+from typing import NamedTuple
+from logger import log_msg
+
+
+class TimingTemplate(NamedTuple):
+    """
+    Bounds of the probe timeout, modelled after the nmap timing templates (-T0 .. -T5).
+
+    Attributes:
+        name (str): Template name.
+        initial_rtt_timeout (float): Probe timeout in seconds until the first RTT sample of a host.
+        min_rtt_timeout (float): Lower bound of the probe timeout in seconds.
+        max_rtt_timeout (float): Upper bound of the probe timeout in seconds.
+        scan_delay (float): Minimal delay in seconds between two probes.
+        max_retries (int): Retransmits of an unanswered probe before it counts as timed out.
+    """
+
+    name: str
+    initial_rtt_timeout: float
+    min_rtt_timeout: float
+    max_rtt_timeout: float
+    scan_delay: float
+    max_retries: int
+
+
+TIMING_TEMPLATES = {
+    0: TimingTemplate("paranoid", 300.0, 0.1, 300.0, 300.0, 2),
+    1: TimingTemplate("sneaky", 15.0, 0.1, 15.0, 15.0, 2),
+    2: TimingTemplate("polite", 1.0, 0.1, 10.0, 0.4, 2),
+    3: TimingTemplate("normal", 1.0, 0.1, 10.0, 0.0, 1),
+    4: TimingTemplate("aggressive", 0.5, 0.1, 1.25, 0.0, 1),
+    5: TimingTemplate("insane", 0.25, 0.05, 0.3, 0.0, 0),
+}
+
+Template = TIMING_TEMPLATES[3]
+
+
+class RttEstimator:
+    """
+    Smoothed RTT and RTT variance of one host, as described in RFC 6298.
+
+    The probe timeout is srtt + 4 * rttvar, clamped to the bounds of the active timing template.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+
+    def __init__(self):
+        self.srtt: float | None = None
+        self.rttvar: float | None = None
+        self.samples = 0
+
+    def update(self, rtt: float):
+        """
+        Feeds a new RTT sample in seconds into the estimator.
+        """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.samples += 1
+
+    def timeout(self) -> float:
+        """
+        Returns the probe timeout in seconds derived from the current estimates.
+        """
+        if self.srtt is None:
+            return Template.initial_rtt_timeout
+        timeout = self.srtt + 4 * self.rttvar
+        return min(max(timeout, Template.min_rtt_timeout), Template.max_rtt_timeout)
+
+
+HostTimings: dict[str, RttEstimator] = {}
+_lock = threading.Lock()
+_last_probe_at = 0.0
+
+
+def init_timing(args: argparse.Namespace):
+    """
+    Activates the timing template chosen by the -T argument.
+    """
+    global Template
+    Template = TIMING_TEMPLATES[args.timing]
+    log_msg(f"Timing template: T{args.timing} ({Template.name})", "DEBUG")
+
+
+def get_max_retries() -> int:
+    """
+    Returns the retransmits of an unanswered probe.
+    """
+    return Template.max_retries
+
+
+def get_probe_timeout(dst_ip: str) -> float:
+    """
+    Returns the probe timeout in seconds for a host.
+    """
+    with _lock:
+        estimator = HostTimings.get(dst_ip)
+        return estimator.timeout() if estimator else Template.initial_rtt_timeout
+
+
+def record_rtt(dst_ip: str, rtt: float):
+    """
+    Records a measured round trip time in seconds for a host.
+    """
+    with _lock:
+        HostTimings.setdefault(dst_ip, RttEstimator()).update(rtt)
+
+
+def get_srtt(dst_ip: str) -> float | None:
+    """
+    Returns the smoothed RTT in seconds of a host, None if it never answered.
+    """
+    with _lock:
+        estimator = HostTimings.get(dst_ip)
+        return estimator.srtt if estimator else None
+
+
+def wait_scan_delay():
+    """
+    Blocks until the scan delay of the timing template has passed since the previous probe.
+    """
+    global _last_probe_at
+    if not Template.scan_delay:
+        return
+    with _lock:
+        send_at = max(time.monotonic(), _last_probe_at + Template.scan_delay)
+        _last_probe_at = send_at
+    time.sleep(max(0.0, send_at - time.monotonic()))
+
+
+def log_rtt_estimates():
+    """
+    Logs the final RTT estimates of every host that answered.
+    """
+    with _lock:
+        for dst_ip, estimator in HostTimings.items():
+            log_msg(
+                f"Host {dst_ip}: srtt {estimator.srtt * 1000:.1f}ms, rttvar {estimator.rttvar * 1000:.1f}ms, "
+                f"timeout {estimator.timeout() * 1000:.1f}ms ({estimator.samples} samples)"
+            )
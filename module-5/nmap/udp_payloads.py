@@ -0,0 +1,39 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+# Most UDP services silently drop datagrams they can not parse, so an empty probe leaves an opened port
+# indistinguishable from a filtered one. These requests make the common services answer.
+UDP_PAYLOADS: dict[int, bytes] = {
+    # Echo and chargen answer anything
+    7: b"\r\n",
+    19: b"\r\n",
+    # DNS: version.bind TXT query in the CHAOS class
+    53: bytes.fromhex("0006010000010000000000000776657273696f6e0462696e640000100003"),
+    # TFTP: read request
+    69: b"\x00\x01r7tftp.txt\x00octet\x00",
+    # Portmapper: RPC NULL call of program 100000 version 2
+    111: bytes.fromhex("72fe1d130000000000000002000186a0000000020000000000000000000000000000000000000000"),
+    # NTP: version 4 client request
+    123: b"\xe3" + b"\x00" * 47,
+    # NetBIOS name service: node status request for the wildcard name
+    137: bytes.fromhex("80f00010000100000000000020") + b"CK" + b"A" * 30 + bytes.fromhex("0000210001"),
+    # SNMP: v2c GetRequest of sysDescr.0 with the public community
+    161: bytes.fromhex("302602010104067075626c6963a019020100020100020100300e300c06082b060102010101000500"),
+    # SSDP: discovery of all devices
+    1900: b'M-SEARCH * HTTP/1.1\r\nHOST: 239.255.255.250:1900\r\nMAN: "ssdp:discover"\r\nMX: 1\r\nST: ssdp:all\r\n\r\n',
+    # mDNS: DNS-SD service enumeration
+    5353: bytes.fromhex("000000000001000000000000095f7365727669636573075f646e732d7364045f756470056c6f63616c00000c0001"),
+    # Memcached: stats command with the UDP frame header
+    11211: b"\x00\x01\x00\x00\x00\x01\x00\x00stats\r\n",
+}
+
+
+def get_udp_payload(port: int) -> bytes:
+    """
+    Returns the protocol specific probe payload of a UDP port, empty for unknown services.
+    """
+    return UDP_PAYLOADS.get(port, b"")
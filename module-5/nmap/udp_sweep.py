@@ -0,0 +1,317 @@
+"""
+This script is intended solely for educational purposes as an exercise in imitation.
+Any practical use of this script outside of educational or supervised demonstration scenarios is strictly prohibited.
+
+Author: Mihai-Andrei Neacsu
+"""
+
+from collections import deque
+import hashlib
+import os
+import random
+import socket
+from itertools import islice
+import struct
+import threading
+import time
+from typing import Iterable, Iterator
+from scapy.config import conf
+from scapy.layers.inet import IP, UDP, ICMP, IPerror, UDPerror
+from scapy.packet import Raw
+from scapy.sendrecv import AsyncSniffer
+from logger import log_msg
+from timing import get_max_retries, get_probe_timeout
+import rate_limiter
+from metrics import Metrics
+from scans import classify_udp_response
+from udp_payloads import get_udp_payload
+
+# Delay bounds between two probes of a rate limited host, Linux sends one error per second once its burst is spent
+MIN_PROBE_INTERVAL = 0.005
+MAX_PROBE_INTERVAL = 1.0
+# ICMP errors a host must send in a burst, then unanswered probes after the burst,
+# before the silence is blamed on ICMP rate limiting
+MIN_BURST_ERRORS = 3
+MIN_DROPPED_ERRORS = 3
+# Targets probed together in rounds, only the targets of the current window are kept in memory
+WINDOW_SIZE = 8192
+
+
+class HostPacer:
+    """
+    Paces the UDP probes of one host.
+
+    Hosts limit the ICMP port unreachable errors they send, Linux to one per second after a burst of six.
+    Probes sent faster get no error, so their closed ports look Open or Filtered. A host whose errors stop
+    after a burst and resume after a while is rate limited: its unanswered ports are retried with the probes
+    spaced by the interval the host sent its errors at, as long as errors come.
+
+    Attributes:
+        interval (float): Seconds between two probes of the host, 0 until rate limiting is detected.
+        next_send_at (float): Monotonic time the next probe of the host may be sent at.
+        retries (int): Rounds the unanswered ports of the host were retried in.
+        silenced (bool): If the errors of the host stopped after a burst in the last round.
+    """
+
+    def __init__(self):
+        self.interval = 0.0
+        self.next_send_at = 0.0
+        self.retries = 0
+        self.silenced = False
+
+    def sent(self, now: float):
+        self.next_send_at = now + self.interval
+
+    def slow_down(self, errors: int, seconds: float):
+        """
+        Spaces the probes by the measured interval between two ICMP errors of the host,
+        at least twice the previous interval as the host still dropped errors at that pace.
+
+        Args:
+            errors (int): ICMP errors received from the host in the last round.
+            seconds (float): Seconds from the first probe of the last round until the end of the round.
+        """
+        measured = seconds / errors if errors else MAX_PROBE_INTERVAL
+        self.interval = min(max(self.interval * 2, measured, MIN_PROBE_INTERVAL), MAX_PROBE_INTERVAL)
+
+    def is_rate_limited(self, outcomes: list[str | None]) -> bool:
+        """
+        Tells if the probes of one round show ICMP error rate limiting: the errors stopped after a burst
+        and resumed, later in the same round or in the next round, which only retries ports left unanswered.
+        A closed port followed by filtered ports, or a few closed ports before filtered ones, shows no resumption.
+        Once a host is paced, a single error before the silence counts as a burst, as its tokens refill slowly.
+
+        Args:
+            outcomes (list[str | None]): Outcome of each probe in send order: "error", "reply" or None if unanswered.
+
+        Returns:
+            bool: True if the host rate limits its ICMP errors.
+        """
+        resumed = self.silenced and "error" in outcomes
+        burst = 0
+        index = 0
+        # UDP replies spend no ICMP error tokens, they neither end nor extend the burst
+        while index < len(outcomes) and outcomes[index] is not None:
+            burst += outcomes[index] == "error"
+            index += 1
+        silent = 0
+        self.silenced = False
+        if burst >= (1 if self.interval else MIN_BURST_ERRORS):
+            for outcome in outcomes[index:]:
+                if outcome is None:
+                    silent += 1
+                elif outcome == "error" and silent >= MIN_DROPPED_ERRORS:
+                    resumed = True
+            self.silenced = silent >= MIN_DROPPED_ERRORS
+        return resumed
+
+
+class UdpSweepEngine:
+    """
+    Batched UDP scan engine.
+
+    Probes are sent in rounds, interleaved across the hosts from one sender loop through one layer 3 socket,
+    while a single sniffer collects the replies. Each probe carries the payload of the service usually listening
+    on its port and an IP ID cookie derived from (dst, dport) and a per-sweep secret, which ICMP errors quote back.
+    Unanswered ports are retried in the next round, at the pace each host answers with.
+    A sweep therefore takes about as long as the slowest host needs to report its closed ports,
+    instead of one timeout per port. The targets are probed in windows of WINDOW_SIZE targets,
+    each target is yielded as soon as its round decided it.
+
+    Usage example:
+        engine = UdpSweepEngine()
+        for target, state in engine.run([("192.168.1.1", 53), ("192.168.1.1", 161)]):
+            print(target, state)
+        # ("192.168.1.1", 161) Closed
+        # ("192.168.1.1", 53) Open
+    """
+
+    def __init__(self, src_port: int | None = None):
+        """
+        Args:
+            src_port (int, optional): Source port of all probes. Random ephemeral port if not given.
+        """
+        self.technique = "udp"
+        self.src_port = src_port or random.randint(32768, 60999)
+        self._secret = os.urandom(16)
+        self._replies: dict[tuple[str, int], object] = {}
+        self._sent_at: dict[tuple[str, int], float] = {}
+        self._lock = threading.Lock()
+
+    def _cookie(self, dst_ip: str, dst_port: int) -> int:
+        """
+        Returns the 16 bit IP ID cookie for a probe.
+        """
+        digest = hashlib.blake2b(f"{dst_ip}:{dst_port}".encode(), digest_size=2, key=self._secret).digest()
+        return struct.unpack("!H", digest)[0]
+
+    def _is_reply(self, packet) -> bool:
+        """
+        Cheap pre-filter for the sniffer, keeps only packets addressed to our source port.
+        """
+        if packet.haslayer(UDPerror):
+            return packet[UDPerror].sport == self.src_port
+        return packet.haslayer(UDP) and packet[UDP].dport == self.src_port
+
+    def _on_reply(self, packet):
+        """
+        Matches a sniffed reply to its probe, by the IP ID cookie for ICMP errors and by address for UDP replies.
+        """
+        if packet.haslayer(UDPerror) and packet.haslayer(IPerror):
+            dst_ip, dst_port = packet[IPerror].dst, packet[UDPerror].dport
+            valid = packet[IPerror].id == self._cookie(dst_ip, dst_port)
+        elif packet.haslayer(UDP):
+            dst_ip, dst_port = packet[IP].src, packet[UDP].sport
+            valid = (dst_ip, dst_port) in self._sent_at
+        else:
+            return
+
+        if not valid:
+            log_msg(f"Dropped reply with invalid cookie from {dst_ip}:{dst_port}", "DEBUG")
+            return
+
+        with self._lock:
+            # Late replies to the probes of a previous window are dropped
+            if (dst_ip, dst_port) in self._sent_at:
+                self._replies.setdefault((dst_ip, dst_port), packet)
+
+    def _send_round(self, sock, pending: dict[str, deque[int]], pacers: dict[str, HostPacer], retry: bool):
+        """
+        Sends one probe for each pending port, one host after the other, each host at its own pace.
+
+        Returns:
+            dict[str, float]: Time of the first probe sent to each host.
+        """
+        first_sent_at: dict[str, float] = {}
+        while any(pending.values()):
+            now = time.monotonic()
+            waiting = [host for host, ports in pending.items() if ports]
+            ready = [host for host in waiting if pacers[host].next_send_at <= now]
+            if not ready:
+                time.sleep(max(0.0, min(pacers[host].next_send_at for host in waiting) - now))
+                continue
+            for dst_ip in ready:
+                dst_port = pending[dst_ip].popleft()
+                packet = (
+                    IP(dst=dst_ip, id=self._cookie(dst_ip, dst_port))
+                    / UDP(sport=self.src_port, dport=dst_port)
+                    / Raw(get_udp_payload(dst_port))
+                )
+                rate_limiter.acquire()
+                sent_at = time.time()
+                with self._lock:
+                    self._sent_at[dst_ip, dst_port] = sent_at
+                first_sent_at.setdefault(dst_ip, sent_at)
+                sock.send(packet)
+                Metrics.probe_sent(self.technique, retransmit=retry)
+                pacers[dst_ip].sent(time.monotonic())
+        return first_sent_at
+
+    def run(self, targets: Iterable[tuple[str, int]]) -> Iterator[tuple[tuple[str, int], str]]:
+        """
+        Probes the targets window by window, each target in rounds until its port state is known
+        or its retries are used up. Rate limited hosts keep being retried at their pace
+        as long as their errors keep coming. The pace of each host carries over to the next window.
+
+        Args:
+            targets (Iterable[tuple[str, int]]): (host, port) pairs to probe.
+
+        Yields:
+            tuple[tuple[str, int], str]: (host, port) pair as given in targets and its port state,
+            as soon as it is decided.
+        """
+        targets = iter(targets)
+        resolved: dict[str, str] = {}
+        pacers: dict[str, HostPacer] = {}
+
+        sniffing = threading.Event()
+        sniffer = AsyncSniffer(
+            lfilter=self._is_reply, prn=self._on_reply, store=False, started_callback=sniffing.set
+        )
+        sniffer.start()
+        sniffing.wait(2)
+        sock = conf.L3socket()
+        try:
+            while window := list(islice(targets, WINDOW_SIZE)):
+                pending: dict[str, deque[int]] = {}
+                # Target hosts of each probe, hostnames resolving to the same IP share the probe
+                hosts: dict[tuple[str, int], list[str]] = {}
+                for host, port in window:
+                    if host not in resolved:
+                        resolved[host] = socket.gethostbyname(host)
+                    dst_ip = resolved[host]
+                    if (dst_ip, port) not in hosts:
+                        pending.setdefault(dst_ip, deque()).append(port)
+                    hosts.setdefault((dst_ip, port), []).append(host)
+                for dst_ip in pending:
+                    pacer = pacers.setdefault(dst_ip, HostPacer())
+                    pacer.retries, pacer.silenced = 0, False
+                with self._lock:
+                    self._replies, self._sent_at = {}, {}
+                yield from self._run_window(sock, pending, pacers, hosts)
+        finally:
+            sock.close()
+            sniffer.stop()
+
+    def _run_window(
+        self,
+        sock,
+        pending: dict[str, deque[int]],
+        pacers: dict[str, HostPacer],
+        hosts: dict[tuple[str, int], list[str]],
+    ) -> Iterator[tuple[tuple[str, int], str]]:
+        """
+        Probes the ports of one window in rounds and yields each port once its round decided it,
+        with the target hosts given by the caller, e.g. hostnames, not the probed IPs.
+        """
+        decided = 0
+        round_index = 0
+        while any(pending.values()):
+            probed = {dst_ip: list(ports) for dst_ip, ports in pending.items() if ports}
+            first_sent_at = self._send_round(sock, pending, pacers, retry=round_index > 0)
+            time.sleep(max(get_probe_timeout(dst_ip) for dst_ip in probed))
+
+            round_end = time.time()
+            for dst_ip, ports in probed.items():
+                replies = [self._replies.get((dst_ip, port)) for port in ports]
+                unanswered = []
+                for port, reply in zip(ports, replies):
+                    if round_index == 0:
+                        # Retries only probe the ports left unanswered, their outcomes tell nothing of congestion
+                        rate_limiter.record_probe(reply is not None)
+                    if reply is None:
+                        Metrics.probe_timed_out(self.technique)
+                        unanswered.append(port)
+                        continue
+                    # As in Karn's algorithm, replies to retried probes are no RTT samples
+                    rtt = max(0.0, float(reply.time) - self._sent_at[dst_ip, port]) if round_index == 0 else None
+                    Metrics.probe_answered(self.technique, rtt)
+                    decided += 1
+                    for host in hosts[dst_ip, port]:
+                        yield (host, port), classify_udp_response(host, port, reply)
+
+                # A host whose errors stop after a burst and resume later ran out of error tokens
+                pacer = pacers[dst_ip]
+                outcomes = [
+                    None if reply is None else "error" if reply.haslayer(ICMP) else "reply" for reply in replies
+                ]
+                errors = outcomes.count("error")
+                if pacer.is_rate_limited(outcomes):
+                    pacer.slow_down(errors, round_end - first_sent_at[dst_ip])
+                    log_msg(
+                        f"Host {dst_ip} rate limits ICMP errors, they stopped after a burst and resumed. "
+                        f"Probing every {pacer.interval * 1000:.0f}ms",
+                        "DEBUG",
+                    )
+
+                # A rate limited host is retried as long as its errors keep coming at its pace
+                if pacer.retries < get_max_retries() or (pacer.interval and errors):
+                    pacer.retries += 1
+                    pending[dst_ip].extend(unanswered)
+                else:
+                    for port in unanswered:
+                        decided += 1
+                        for host in hosts[dst_ip, port]:
+                            yield (host, port), classify_udp_response(host, port, None)
+            log_msg(f"UDP round {round_index}: {decided} ports decided, {rate_limiter.rate_status()}", "DEBUG")
+            round_index += 1
@@ -5,89 +5,198 @@ Any practical use of this script outside of educational or supervised demonstrat
 Author: Mihai-Andrei Neacsu
 """
 
-from threading import Thread
 from logger import log_msg
 import argparse
-from scans import (
-    half_open_scan,
-    os_fingerprint,
-    ping_scan,
-    tcp_ack_scan,
-    tcp_connect_scan,
-    tcp_fin_scan,
-    tcp_null_scan,
-    tcp_window_scan,
-    tcp_xmas_scan,
-)
-from scan_application import scan_application
+import time
+from itertools import chain, islice
+from typing import Callable, Iterable, Iterator
+from fingerprint import guess_os
+from discovery import discover_hosts, is_host_alive
+from planner import probe_port
+from scan_application import detect_services
+from sweep import sweep_scan
+from scheduler import ScanJob, ScanScheduler
+from timing import get_srtt, log_rtt_estimates
+from metrics import Metrics
+from results import ScanResult, record_result
+from checkpoint import finished_ports, is_port_done, resumed_opened_ports
+from progress import advance_progress, close_progress, get_progress, start_progress
+from state_cache import known_open_ports
+from shards import scan_sharded
+from targets import iter_targets
 
 
 def is_port_opened(dst_ip: str, dst_port: int) -> bool:
     """
     Scans a specified destination port if is opened using TCP scan technics.
+    The host is pinged only once per scan, then the probe plan runs
+    the cheapest techniques first and stops as soon as the port state is known.
 
     Args:
         dst_ip (str):   The destination IP address to send the TCP packet to.
         dst_port (int): The destination port number to send the TCP packet to.
 
     Returns:
-        True:   If any TCP scan result is "Open"
-        False:  If Ping scan result is not "Alive" or
-                TCP scans result is not "Unfiltered", "Closed" or
+        True:   If a technique of the probe plan found the port open
+        False:  If the host is not alive,
+                a technique of the probe plan found the port closed or filtered or
                 All scans exhausted
     """
-    result = ping_scan(dst_ip)
-    if result != "Alive":
-        return False
-    result = tcp_ack_scan(dst_ip, dst_port)
-    if result != "Unfiltered":
-        return False
-    result = half_open_scan(dst_ip, dst_port)
-    if result == "Open":
-        return True
-    result = tcp_window_scan(dst_ip, dst_port)
-    if result == "Open":
-        return True
-    result = tcp_connect_scan(dst_ip, dst_port)
-    if result == "Open":
-        return True
-    result = tcp_null_scan(dst_ip, dst_port)
-    if result == "Closed":
-        return False
-    result = tcp_xmas_scan(dst_ip, dst_port)
-    if result == "Closed":
-        return False
-    result = tcp_fin_scan(dst_ip, dst_port)
-    if result == "Closed":
-        return False
-    return False
-
-
-def scan_port(dst_ip: str, dst_port: int, os_scan: bool = False):
+    is_open, technique, result = probe_port_state(dst_ip, dst_port)
+    return is_open
+
+
+def probe_port_state(dst_ip: str, dst_port: int) -> tuple[bool, str, str]:
+    """
+    Same as is_port_opened, but also returns which technique decided the port state.
+
+    Returns:
+        tuple: A tuple containing:
+            - bool: True if the port is opened.
+            - str: The technique that decided the port state, "ping" if the host is not alive.
+            - str: The result of that technique.
+    """
+    if not is_host_alive(dst_ip):
+        return False, "ping", "Down or Filtered"
+    return probe_port(dst_ip, dst_port)
+
+
+def scan_port(dst_ip: str, dst_port: int, os_scan: bool = False) -> ScanResult:
     """
-    Scans a specified destination port if is opened.
-    If the destination port is opened and os_scan flag is on, os_fingerprint scan will run
+    Scans a specified destination port if is opened and records the result.
+    If the destination port is opened and os_scan flag is on, the OS is guessed from the replies
+    the scans already received, without extra probes.
 
     Args:
         dst_ip (str): The destination IP address to send the TCP packet to.
         dst_port (int): The destination port number to send the TCP packet to.
-        os_scan (bool): If a os fingerprint and application scan should run for a opened port.
+        os_scan (bool): If a os fingerprint scan should run for a opened port.
+
+    Returns:
+        ScanResult: The result of the scanned port.
     """
-    is_open = is_port_opened(dst_ip, dst_port)
+    started = time.monotonic()
+    is_open, technique, state = probe_port_state(dst_ip, dst_port)
+    Metrics.port_decided(time.monotonic() - started)
+    result = ScanResult(dst_ip, dst_port, technique, "Open" if is_open else state, get_srtt(dst_ip))
     if is_open and os_scan:
-        scan_application(dst_ip, dst_port)
-        os_info = os_fingerprint(dst_ip, dst_port)
-        if os_info["OS"]:
-            log_msg(f"Port {dst_port} runs OS: {os_info['OS']}")
+        result.os = guess_os(dst_ip)
+        if result.os:
+            log_msg(f"Port {dst_port} runs OS: {result.os}")
+    record_result(result)
+    return result
+
+
+def iter_scan_targets(
+    hosts: list[str],
+    ports: Iterable[int],
+    first: list[tuple[str, int]] = (),
+    skip: Callable[[str, int], bool] = is_port_done,
+) -> Iterator[tuple[str, int]]:
+    """
+    Yields the (host, port) pairs to scan, interleaved across the hosts port by port,
+    so a slow host never holds back the scans of the other hosts.
+    The first pairs, e.g. the known opened ports of an incremental scan, are yielded before all others.
+    Pairs already scanned by a resumed run are skipped.
+    """
+    prioritized = set(first)
+    targets = chain(first, ((host, port) for port in ports for host in hosts if (host, port) not in prioritized))
+    for host, port in targets:
+        if not skip(host, port):
+            yield host, port
+
+
+def scan_targets(
+    args: argparse.Namespace,
+    hosts: list[str],
+    first: list[tuple[str, int]] = (),
+    shard: int = 0,
+    workers: int = 1,
+    skip: Callable[[str, int], bool] = is_port_done,
+) -> list[tuple[str, int]]:
+    """
+    Scans the alive hosts for each port in the port set and records each result as soon as it is decided.
+    If a sweep technique is given, all ports are scanned in one batched sweep streaming its results,
+    otherwise the scans run on a bounded worker pool of max_parallelism threads.
+
+    Args:
+        args (argparse.Namespace): Command-line arguments.
+        hosts (list[str]): Alive hosts.
+        first (list[tuple[str, int]]): (host, port) pairs to scan before all others.
+        shard (int): Index of the shard to scan, every workers-th (host, port) pair starting at this index.
+        workers (int): Number of shards the (host, port) pairs are split into.
+        skip (Callable[[str, int], bool]): Returns True for (host, port) pairs already scanned.
+
+    Returns:
+        list[tuple[str, int]]: The opened (host, port) pairs.
+    """
+    targets = islice(iter_scan_targets(hosts, args.port_set, first, skip), shard, None, workers)
+    if args.sweep:
+        opened_ports = []
+        for (host, port), result in sweep_scan(targets, args.sweep):
+            log_msg(f"Host {host} Port {port}: {result}", "INFO" if result.startswith("Open") else "DEBUG")
+            os_name = guess_os(host) if result == "Open" else None
+            record_result(ScanResult(host, port, args.sweep, result, get_srtt(host), os=os_name))
+            advance_progress(opened=result == "Open")
+            if result == "Open":
+                opened_ports.append((host, port))
+        if args.sweep == "udp":
+            # UDP services answered their probe payloads already, the application probes speak TCP
+            return []
+        return opened_ports
+
+    opened_ports = []
+
+    def handle_job(job: ScanJob) -> bool:
+        is_open = scan_port(job.host, job.port, True).state == "Open"
+        if is_open:
+            opened_ports.append((job.host, job.port))
+        return is_open
+
+    scheduler = ScanScheduler(handler=handle_job, max_parallelism=args.max_parallelism, progress=get_progress())
+    scheduler.start()
+    for host, port in targets:
+        scheduler.submit(ScanJob(host, port))
+    scheduler.join()
+    log_rtt_estimates()
+    return opened_ports
 
 
 def find_opened_ports(args: argparse.Namespace):
     """
-    Scans the given address for each port in ports list.
-    Each scan starts in a Thread.
+    Expands the given targets and pings them in batches to find the alive hosts,
+    then scans the alive hosts for each port in the port set, split into shard processes if --workers is given.
+    The progress of the port scan is reported if --progress is enabled.
+    Finally the applications of all opened ports are identified concurrently.
+    Each result is recorded as soon as it is decided, identified applications as additional "service" results.
     """
+    hosts = list(discover_hosts(iter_targets(args.address, args.input_file)))
+    if not hosts:
+        log_msg("No alive hosts found.", "WARNING")
+        return
+    log_msg(f"Found {len(hosts)} alive host(s)")
+
+    first = []
+    if args.incremental:
+        first = known_open_ports(hosts, args.port_set)
+        log_msg(f"Re-verifying {len(first)} known opened port(s) first")
+
     log_msg("Finding opened ports ...")
-    for port in args.ports_list:
-        address = args.address
-        thread = Thread(target=scan_port, args=(address, port, True))
-        thread.start()
+    alive = set(hosts)
+    # A resumed run may scan other ports, only its finished ports of this port set count as done
+    resumed = sum(ports.intersection_size(args.port_set) for host, ports in finished_ports().items() if host in alive)
+    start_progress(len(hosts) * len(args.port_set), resumed)
+    try:
+        if args.workers > 1:
+            opened_ports = scan_sharded(args, hosts, first, scan_targets)
+        else:
+            opened_ports = scan_targets(args, hosts, first)
+    finally:
+        close_progress()
+
+    opened_ports += resumed_opened_ports()
+    if opened_ports:
+        services = detect_services(opened_ports)
+        for (host, port), service in services.items():
+            if service:
+                record_result(ScanResult(host, port, "service", "Open", get_srtt(host), service))